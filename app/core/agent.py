@@ -1,24 +1,20 @@
 import asyncio
 import re
 import datetime
-import tkinter as tk
 import webbrowser
 import os
-import spacy
 from langdetect import detect
 from deep_translator import GoogleTranslator
-from transformers import pipeline
 
 from app.features.weather import handle_weather_query
 from app.features.ai import get_ai_response
-from app.features.image_generate import generate_image
 
 from app.features.greetme import greetMe
 from app.features.google_search import handle_google_search
 from app.features.rag import RAG
 
 from app.features.calendar import set_reminder, show_reminders, delete_reminder
-from app.features.trip_planner import plan_trip
+from app.features.trip_planner import plan_trip, format_itinerary_header, format_itinerary_row
 from app.features.news import get_news
 from app.features.stock import get_stock_price
 from app.database.preferences import get_user_preference, set_user_preference
@@ -26,19 +22,30 @@ from app.database.goals import add_goal, get_active_goals, update_goal_status
 from app.database.tasks import add_task, get_pending_tasks, update_task_status
 from app.database.chat_history import add_last_query, get_last_queries
 from app.core.planner import PlanningEngine
-from app.core.safety import is_content_safe
+from app.core.safety import is_content_safe, SAFETY_POLICY
+from app.core.session import SessionStore
+from app.core.models import models
+from app.core.tracing import trace
 from app.features.web_research import scrape_and_store_url, query_web_content
 
+DEFAULT_TRIP_DAYS = 3
+DEFAULT_TRIP_INTERESTS = ["sightseeing", "food"]
+DEFAULT_TRIP_TYPE = "leisure"
+
+
+def _trip_days(duration):
+    """Number of days from a planner argument like 5, "5" or "5 days"."""
+    match = re.search(r"\d+", str(duration or ""))
+    return int(match.group()) if match else DEFAULT_TRIP_DAYS
+
+
 class AIAgent:
     def __init__(self, app, rag_instance: RAG):
-        self.app = app
+        self.app = app  # default front end for sessions created without a host
         self.rag = rag_instance
-        self.nlp = spacy.load("en_core_web_sm")
         self.ai_brain_context = self.load_ai_brain()
         self.planner = PlanningEngine(self)
-        self.trip_plan_details = {}
-        self.user_preferences = {}
-        self.conversation_context = None
+        self.sessions = SessionStore()
         self.intent_routes = {
             "greet": {
                 "handler": self.handle_greet,
@@ -68,7 +75,8 @@ class AIAgent:
             "google_search": {
                 "handler": self.handle_google_search,
                 "description": "Performs a Google search for a given query.",
-                "args": {"query": "The search query."}
+                "args": {"query": "The search query."},
+                "streaming": True  # writes its answer to the response queue as it arrives
             },
             "show_reminders": {
                 "handler": self.handle_show_reminders,
@@ -88,12 +96,14 @@ class AIAgent:
             "file_query": {
                 "handler": self.handle_file_query,
                 "description": "Queries the content of an uploaded file.",
-                "args": {"query": "The query to ask the file."}
+                "args": {"query": "The query to ask the file."},
+                "streaming": True  # writes its answer to the response queue as it arrives
             },
             "research_and_summarize": {
                 "handler": self.handle_research_and_summarize,
                 "description": "Researches a topic online and provides a summary.",
-                "args": {"topic": "The topic to research."}
+                "args": {"topic": "The topic to research."},
+                "streaming": True  # writes its answer to the response queue as it arrives
             },
             "research_webpage": {
                 "handler": self.handle_research_webpage,
@@ -143,7 +153,13 @@ class AIAgent:
             "plan_trip": {
                 "handler": self.handle_plan_trip,
                 "description": "Plans a trip for the user.",
-                "args": {}
+                "args": {
+                    "destination": "The city or country to visit.",
+                    "duration": "Number of days (optional).",
+                    "interests": "Comma-separated interests (optional).",
+                    "trip_type": "e.g. leisure, business, family (optional)."
+                },
+                "streaming": True
             },
             "set_language": {
                 "handler": self.handle_set_language,
@@ -205,95 +221,110 @@ class AIAgent:
             print("[Warning] ai_brain.md not found.")
             return "You are a helpful AI assistant named Jenny."
 
-    async def process_query(self, query, response_queue):
-        query = query.strip()
-        safe, message = is_content_safe(query)
-        if not safe:
-            response_queue.put(message)
-            response_queue.put(None)
-            return
-
-        if self.app.current_user:
-            add_last_query(self.app.current_user['gmail'], query)
-
-        await self.planner.execute_plan(query, response_queue)
+    @property
+    def nlp(self):
+        return models.get("spacy")
+
+    def get_session(self, session_id, host=None):
+        return self.sessions.get_or_create(session_id, host=host or self.app)
+
+    async def process_query(self, query, response_queue, session=None, safety_checked=False):
+        """
+        Runs one user query. Front ends that already ran process_input pass
+        safety_checked=True so the classifier is evaluated once per request.
+        """
+        if session is None:
+            session = self.get_session("default")
+        session.touch()
+        with trace("agent.process_query", session_id=session.session_id):
+            query = query.strip()
+            if not safety_checked:
+                safe, message = is_content_safe(query)
+                if not safe:
+                    response_queue.put(message)
+                    response_queue.put(None)
+                    return
+
+            if session.current_user:
+                add_last_query(session.current_user['gmail'], query)
+
+            await self.planner.execute_plan(query, response_queue, session)
     
-    def handle_send_email(self, entities):
+    def handle_send_email(self, entities, session):
         # Placeholder for sending email
         recipient = entities.get("recipient")
         if not recipient:
             return "Please specify a recipient for the email."
         return f"I will send an email to {recipient}. What should be the subject and body?"
 
-    def handle_get_stock_price(self, entities):
+    def handle_get_stock_price(self, entities, session):
         symbol = entities.get("symbol")
         if not symbol:
             return "Please specify a stock symbol to get the price for."
         return get_stock_price(symbol)
 
-    def handle_get_news(self, entities):
+    def handle_get_news(self, entities, session):
         topic = entities.get("topic")
         if not topic:
             return "Please specify a topic to get news about."
         return get_news(topic)
 
-    def handle_set_language(self, entities):
+    def handle_set_language(self, entities, session):
         language = entities.get("language")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to set your language."
         if language:
-            set_user_preference(self.app.current_user['gmail'], 'language', language)
-            self.user_preferences['language'] = language
+            set_user_preference(session.current_user['gmail'], 'language', language)
+            session.user_preferences['language'] = language
             return f"Your language has been set to {language}."
         return "I didn't understand the language. Please try again."
 
-    def handle_set_tone(self, entities):
+    def handle_set_tone(self, entities, session):
         tone = entities.get("tone")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to set your tone."
         if tone:
-            set_user_preference(self.app.current_user['gmail'], 'tone', tone)
-            self.user_preferences['tone'] = tone
+            set_user_preference(session.current_user['gmail'], 'tone', tone)
+            session.user_preferences['tone'] = tone
             return f"Your tone has been set to {tone}."
         return "I didn't understand the tone. Please try again."
 
-    def handle_greet(self, entities):
-        return greetMe()
+    def handle_greet(self, entities, session):
+        return greetMe(speak=False)
 
-    def handle_get_time(self, entities):
+    def handle_get_time(self, entities, session):
         time_str = f"The time is {datetime.datetime.now().strftime('%H:%M:%S')}"
         return time_str
 
-    def handle_reset_chat(self, entities):
-        self.app.chat_area.configure(state="normal")
-        self.app.chat_area.delete("1.0", tk.END)
-        self.app.chat_area.configure(state="disabled")
-        self.app.message_history = []
+    def handle_reset_chat(self, entities, session):
+        session.message_history.clear()
+        session.context.reset()
+        session.host.reset_chat()
         return "Chat has been reset."
 
-    def handle_stop_speech(self, entities):
-        self.app.stop_speech()
+    def handle_stop_speech(self, entities, session):
+        session.host.stop_speech()
         return "Speech stopped."
 
-    def handle_weather(self, entities):
+    def handle_weather(self, entities, session):
         city = entities.get("city")
-        if not city and self.app.current_user:
-            city = get_user_preference(self.app.current_user['gmail'], 'default_city')
+        if not city and session.current_user:
+            city = get_user_preference(session.current_user['gmail'], 'default_city')
 
         if not city:
-            self.conversation_context = "AWAITING_CITY_FOR_WEATHER"
+            session.conversation_context = "AWAITING_CITY_FOR_WEATHER"
             return "Which city would you like the weather for?"
 
         weather_response = handle_weather_query(f"weather in {city}")
         return weather_response
 
-    def handle_image_generation(self, entities):
+    async def handle_image_generation(self, entities, session):
         prompt = entities.get("prompt")
         if not prompt:
             return "Please specify what you want to generate."
-        return self.app.handle_image_generation(prompt)
+        return await session.host.handle_image_generation(prompt)
 
-    def handle_open_website(self, entities):
+    def handle_open_website(self, entities, session):
         url = entities.get("url")
         if not url:
             return "Please specify a website to open."
@@ -304,86 +335,79 @@ class AIAgent:
         webbrowser.open(url)
         return f"Opening {url}"
 
-    def handle_close_website(self, entities):
+    def handle_close_website(self, entities, session):
         os.system("taskkill /f /im chrome.exe")
         return "All browser windows closed."
 
-    async def handle_file_query(self, entities, response_queue):
+    async def handle_file_query(self, entities, response_queue, session):
         query = entities.get("query")
         if not query:
             response_queue.put("Please specify what you want to ask about the file.")
-            response_queue.put(None)
             return
         
-        retrieved_chunks = self.rag.retrieve_context(query)
+        retrieved_chunks = await asyncio.to_thread(self.rag.retrieve_context, query)
         if retrieved_chunks:
             context = "\n\n".join(retrieved_chunks)
             rag_context = f"Context from uploaded files:\n{context}"
-            response_generator = get_ai_response(query, self.app.message_history, self.ai_brain_context, stream=True, rag_context=rag_context)
+            response_generator = await get_ai_response(query, session.prompt_history(), self.ai_brain_context, stream=True, rag_context=rag_context, safety=SAFETY_POLICY)
             async for chunk in response_generator:
                 response_queue.put(chunk)
-            response_queue.put(None)
         else:
             response_queue.put("I couldn't find any relevant information in the uploaded files.")
-            response_queue.put(None)
 
-    async def handle_google_search(self, entities, response_queue):
+    async def handle_google_search(self, entities, response_queue, session):
         query = entities.get("query")
         if not query:
             response_queue.put("Please specify what you want to search for.")
-            response_queue.put(None)
             return
         
-        search_results = handle_google_search(query)
+        search_results = await asyncio.to_thread(handle_google_search, query)
         
         prompt = f"Based on the following search results, please answer the user's query: '{query}'\n\nSearch Results:\n{search_results}"
         
-        response_generator = get_ai_response(prompt, self.app.message_history, self.ai_brain_context, stream=True)
+        response_generator = await get_ai_response(prompt, session.prompt_history(), self.ai_brain_context, stream=True, safety=SAFETY_POLICY)
         async for chunk in response_generator:
             response_queue.put(chunk)
-        response_queue.put(None)
 
-    def handle_set_reminder(self, entities):
+    def handle_set_reminder(self, entities, session):
         message = entities.get("message")
         time_str = entities.get("time")
         if message and time_str:
             return set_reminder(message, time_str)
         return "Please provide the reminder message and time."
 
-    def handle_show_reminders(self, entities):
+    def handle_show_reminders(self, entities, session):
         return show_reminders()
 
-    def handle_delete_reminder(self, entities):
+    def handle_delete_reminder(self, entities, session):
         reminder_id = entities.get("reminder_id")
         if reminder_id:
             return delete_reminder(reminder_id)
         return "Please provide the reminder ID to delete."
 
-    async def handle_research_and_summarize(self, entities, response_queue):
+    async def handle_research_and_summarize(self, entities, response_queue, session):
         topic = entities.get("topic")
         if not topic:
             response_queue.put("Please specify a topic to research and summarize.")
-            response_queue.put(None)
             return
 
-        self.app.respond(f"Researching and summarizing: {topic}...")
+        session.host.respond(f"Researching and summarizing: {topic}...")
 
         try:
             # Step 1: Google Search
-            search_results = handle_google_search(query=topic)
+            search_results = await asyncio.to_thread(handle_google_search, query=topic)
             
             if not search_results or not search_results.get('results'):
                 response_queue.put("I couldn't find any information on that topic.")
-                response_queue.put(None)
                 return
 
             # Step 2: Scrape and store the top result
             top_result_url = search_results['results'][0]['link']
-            scrape_result = scrape_and_store_url(top_result_url)
-            self.app.respond(scrape_result) # Inform the user about the scraping result
+            scrape_result = await asyncio.to_thread(scrape_and_store_url, top_result_url)
+            session.host.respond(scrape_result) # Inform the user about the scraping result
 
             # Step 3: Query the scraped content
-            retrieved_content = query_web_content(topic)
+            retrieved_content = await asyncio.to_thread(query_web_content, topic)
             
             summary_prompt = ""
             if "Error" in retrieved_content or "couldn't find" in retrieved_content:
@@ -393,17 +417,15 @@ class AIAgent:
                 # Summarize the retrieved content from our vector store
                 summary_prompt = f"Summarize the following text:\n{retrieved_content}"
             
-            summary_response = await get_ai_response(summary_prompt, self.app.message_history, self.ai_brain_context, stream=False)
+            summary_response = await get_ai_response(summary_prompt, session.prompt_history(), self.ai_brain_context, stream=False, safety=SAFETY_POLICY)
             summary = summary_response.get('text', '')
             response_queue.put(summary)
-            response_queue.put(None)
 
         except Exception as e:
             print(f"[Research Error] {e}")
             response_queue.put("I encountered an error while trying to research and summarize the topic.")
-            response_queue.put(None)
 
-    def handle_research_webpage(self, entities):
+    def handle_research_webpage(self, entities, session):
         url = entities.get("url")
         if not url:
             return "Please provide a URL to research."
@@ -411,60 +433,79 @@ class AIAgent:
         result = scrape_and_store_url(url)
         return result
 
-    def handle_plan_trip(self, entities):
-        if not self.trip_plan_details.get('destination'):
-            self.conversation_context = "AWAITING_TRIP_DESTINATION"
-            return "Where would you like to go?"
-        
-        destination = self.trip_plan_details.get('destination')
-        duration = self.trip_plan_details.get('duration')
-        interests = self.trip_plan_details.get('interests')
-        trip_type = self.trip_plan_details.get('trip_type')
+    async def handle_plan_trip(self, entities, response_queue, session):
+        details = session.trip_plan_details
+        details.update({key: value for key, value in entities.items() if value})
+        if not details.get('destination'):
+            session.conversation_context = "AWAITING_TRIP_DESTINATION"
+            response_queue.put("Where would you like to go?")
+            return
 
-        self.app.respond(f"Planning your {duration}-day {trip_type} trip to {destination} with interests in {', '.join(interests)}...")
-        
-        # Perform the Google search here
-        search_query = f"top attractions, restaurants, and local transportation in {destination} for a {trip_type} trip with interests in {', '.join(interests)}"
-        search_results = self.handle_google_search({"query": search_query}) # Call the agent's handle_google_search
+        # Whatever the user did not say gets a default.
+        destination = details['destination']
+        duration = _trip_days(details.get('duration'))
+        interests = details.get('interests')
+        if not interests and session.current_user:
+            interests = get_user_preference(session.current_user['gmail'], 'interests')
+        if isinstance(interests, str):
+            interests = [interest.strip() for interest in interests.split(",") if interest.strip()]
+        interests = interests or DEFAULT_TRIP_INTERESTS
+        trip_type = details.get('trip_type') or DEFAULT_TRIP_TYPE
+
+        session.host.respond(f"Planning your {duration}-day {trip_type} trip to {destination} with interests in {', '.join(interests)}...")
+
+        # The table is rendered row by row as the model finishes each day.
+        rows_sent = 0
+        def send_day(day_plan):
+            nonlocal rows_sent
+            if not rows_sent:
+                response_queue.put("Here is your trip itinerary:\n\n" + format_itinerary_header())
+            response_queue.put(format_itinerary_row(day_plan))
+            rows_sent += 1
+
+        # Weather, web search and document notes are gathered concurrently inside plan_trip.
+        itinerary = await plan_trip(destination, duration, interests, trip_type, rag=self.rag, on_day=send_day)
         
-        itinerary = plan_trip(destination, duration, interests, trip_type, search_results)
-        
-        self.trip_plan_details = {} # Reset for next time
-        
-        return itinerary
+        session.trip_plan_details = {} # Reset for next time
+
+        if "error" in itinerary:
+            response_queue.put(f"Trip Planner Error: {itinerary['error']}")
+        elif not rows_sent:
+            for day_plan in itinerary.get("itinerary", []):
+                send_day(day_plan)
 
-    def handle_set_default_city(self, entities):
+    def handle_set_default_city(self, entities, session):
         city = entities.get("city")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to set a default city."
         if city:
-            set_user_preference(self.app.current_user['gmail'], 'default_city', city)
+            set_user_preference(session.current_user['gmail'], 'default_city', city)
             return f"Your default city has been set to {city}."
         return "I didn't understand the city name. Please try again."
 
-    def handle_set_interests(self, entities):
+    def handle_set_interests(self, entities, session):
         interests = entities.get("interests")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to set your interests."
         if interests:
-            set_user_preference(self.app.current_user['gmail'], 'interests', interests)
+            set_user_preference(session.current_user['gmail'], 'interests', interests)
             return f"Your interests have been set to {interests}."
         return "I didn't understand your interests. Please try again."
 
-    def handle_set_goal(self, entities):
+    def handle_set_goal(self, entities, session):
         goal_description = entities.get("goal_description")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to set a goal."
         if not goal_description:
             return "Please provide a description for your goal."
         
-        return add_goal(self.app.current_user['gmail'], goal_description)
+        return add_goal(session.current_user['gmail'], goal_description)
 
-    def handle_show_goals(self, entities):
-        if not self.app.current_user:
+    def handle_show_goals(self, entities, session):
+        if not session.current_user:
             return "Please login to view your goals."
         
-        active_goals = get_active_goals(self.app.current_user['gmail'])
+        active_goals = get_active_goals(session.current_user['gmail'])
         if not active_goals:
             return "You have no active goals."
         
@@ -473,38 +514,38 @@ class AIAgent:
             response += f"- ID: {goal_id}, Goal: {desc}\n"
         return response
 
-    def handle_complete_goal(self, entities):
+    def handle_complete_goal(self, entities, session):
         goal_id = entities.get("goal_id")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to manage your goals."
         if not goal_id:
             return "Please provide the ID of the goal to complete."
         
         return update_goal_status(goal_id, 'completed')
 
-    def handle_abandon_goal(self, entities):
+    def handle_abandon_goal(self, entities, session):
         goal_id = entities.get("goal_id")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to manage your goals."
         if not goal_id:
             return "Please provide the ID of the goal to abandon."
         
         return update_goal_status(goal_id, 'abandoned')
 
-    def handle_add_task(self, entities):
+    def handle_add_task(self, entities, session):
         task_description = entities.get("task_description")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to add a task."
         if not task_description:
             return "Please provide a description for your task."
         
-        return add_task(self.app.current_user['gmail'], task_description)
+        return add_task(session.current_user['gmail'], task_description)
 
-    def handle_show_tasks(self, entities):
-        if not self.app.current_user:
+    def handle_show_tasks(self, entities, session):
+        if not session.current_user:
             return "Please login to view your tasks."
         
-        pending_tasks = get_pending_tasks(self.app.current_user['gmail'])
+        pending_tasks = get_pending_tasks(session.current_user['gmail'])
         if not pending_tasks:
             return "You have no pending tasks."
         
@@ -513,26 +554,26 @@ class AIAgent:
             response += f"- ID: {task_id}, Task: {desc}, Due: {due_date or 'N/A'}\n"
         return response
 
-    def handle_complete_task(self, entities):
+    def handle_complete_task(self, entities, session):
         task_id = entities.get("task_id")
-        if not self.app.current_user:
+        if not session.current_user:
             return "Please login to manage your tasks."
         if not task_id:
             return "Please provide the ID of the task to complete."
         
         return update_task_status(task_id, 'completed')
 
-    def load_user_preferences(self, user_gmail):
-        self.user_preferences = {
+    def load_user_preferences(self, session, user_gmail):
+        session.user_preferences = {
             'language': get_user_preference(user_gmail, 'language') or 'en',
             'tone': get_user_preference(user_gmail, 'tone') or 'neutral',
         }
 
-    def handle_get_user_details(self, entities):
-        if not self.app.current_user:
+    def handle_get_user_details(self, entities, session):
+        if not session.current_user:
             return "You are not logged in. Please log in to see your details."
         
-        user_details = self.app.current_user
+        user_details = session.current_user
         response = f"Here are your details:\n"
         response += f"- First Name: {user_details.get('first_name')}\n"
         response += f"- Last Name: {user_details.get('last_name')}\n"
@@ -0,0 +1,139 @@
+# app/core/context_window.py
+"""
+Keeps prompts to a fixed token budget however long a conversation runs.
+
+Each session has a ContextWindow. `view(history)` returns the most recent turns
+verbatim (up to HISTORY_TOKEN_BUDGET) preceded by a running summary of everything
+older. When turns fall out of the recent window they are folded into the summary by
+a background LLM call, so no request waits for summarization; until it finishes the
+oldest turns are simply left out. `fit_messages` is the hard cap applied to the
+final prompt in get_ai_response.
+"""
+import asyncio
+import os
+import threading
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("JENNY_CONTEXT_TOKENS", "3000"))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("JENNY_HISTORY_TOKENS", "1200"))
+MIN_RECENT_MESSAGES = 2
+SUMMARY_MAX_WORDS = 150
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English) without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    return estimate_tokens(message.get("content") or "") + 4  # role and separators
+
+
+def fit_messages(messages, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Drops the oldest conversation turns until the messages fit the budget. The system
+    message, the running summary and the final (current) message are always kept.
+    """
+    total = sum(message_tokens(m) for m in messages)
+    if total <= budget:
+        return messages
+    pinned = {0, len(messages) - 1}
+    pinned.update(i for i, m in enumerate(messages) if m.get("summary"))
+    kept = list(range(len(messages)))
+    for i in range(len(messages)):
+        if total <= budget:
+            break
+        if i not in pinned:
+            total -= message_tokens(messages[i])
+            kept.remove(i)
+    return [messages[i] for i in kept]
+
+
+async def summarize_with_llm(summary, messages):
+    # Imported here: app.features.ai uses this module to size its prompts.
+    from app.features.ai import get_ai_response
+    from app.core.safety import SAFETY_CHECKED
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = f"""Update the running summary of a conversation between a user and an assistant.
+
+Current summary:
+{summary or "(none)"}
+
+New messages:
+{transcript}
+
+Write the updated summary in at most {SUMMARY_MAX_WORDS} words. Keep names, facts, preferences, decisions and open requests; drop small talk. Return only the summary."""
+    # Messages in the history already passed the safety check when they were sent.
+    response = await get_ai_response(prompt, [], "You summarize conversations.", safety=SAFETY_CHECKED)
+    return response.get("text", "").strip()
+
+
+class ContextWindow:
+    def __init__(self, history_budget=HISTORY_TOKEN_BUDGET, summarize=summarize_with_llm):
+        self.history_budget = history_budget
+        self.summarize = summarize
+        self.summary = ""
+        self.summarized_upto = 0  # history[:summarized_upto] is covered by the summary
+        self._generation = 0  # bumped on reset so late summaries of a cleared chat are dropped
+        self._task = None
+        self._lock = threading.Lock()
+
+    def view(self, history):
+        """Summary message (if any) + the recent turns that fit the history budget."""
+        with self._lock:
+            if len(history) < self.summarized_upto:
+                # The chat was cleared; the summary describes a conversation that is gone.
+                self._reset()
+            start = self._recent_start(history)
+            if start > self.summarized_upto:
+                self._schedule_summary(history[self.summarized_upto:start], start)
+            messages = list(history[max(start, self.summarized_upto):])
+            if self.summary:
+                messages.insert(0, {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}", "summary": True})
+            return messages
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.summary = ""
+        self.summarized_upto = 0
+        self._generation += 1
+
+    def _recent_start(self, history):
+        """Index of the oldest message kept verbatim."""
+        used = 0
+        start = len(history)
+        while start > 0:
+            cost = message_tokens(history[start - 1])
+            if used + cost > self.history_budget and len(history) - start >= MIN_RECENT_MESSAGES:
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def _schedule_summary(self, messages, upto):
+        if self._task is not None and not self._task.done():
+            return  # the next view() picks up whatever this run did not cover
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (offline use): keep the recent window only
+        self._task = loop.create_task(self._update_summary(self.summary, messages, upto, self._generation))
+
+    async def _update_summary(self, summary, messages, upto, generation):
+        try:
+            new_summary = await self.summarize(summary, messages)
+        except Exception as e:
+            print(f"[Context Summary Error] {e}")
+            return
+        with self._lock:
+            if new_summary and generation == self._generation and upto > self.summarized_upto:
+                self.summary = new_summary
+                self.summarized_upto = upto
+
+    async def wait(self):
+        """Waits for a running summary update (used by tests and shutdown)."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
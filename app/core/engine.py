@@ -0,0 +1,111 @@
+# app/core/engine.py
+import asyncio
+import itertools
+import threading
+
+from app.core.stream_renderer import ResponseChannel
+
+
+class AgentEngine:
+    """
+    Runs one long-lived asyncio event loop on a background thread.
+
+    The UI submits work with `submit()` and gets back a request ID plus a per-request
+    response channel. Requests run concurrently on the shared loop, so a new query can
+    start while an earlier one is still streaming, and any request can be cancelled.
+    """
+    def __init__(self, name="agent-engine"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._requests = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_engine_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro_fn, *args, channel=None):
+        """
+        Schedules `coro_fn(*args, channel)` on the engine loop.
+        Returns (request_id, channel); the channel always receives a final `None`.
+        """
+        request_id = next(self._ids)
+        if channel is None:
+            channel = ResponseChannel()
+        channel.request_id = request_id
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_request(request_id, coro_fn, args, channel), self.loop
+        )
+        with self._lock:
+            self._requests[request_id] = future
+        future.add_done_callback(lambda f: self._forget(request_id, f, channel))
+        return request_id, channel
+
+    async def _run_request(self, request_id, coro_fn, args, channel):
+        channel.started = True
+        try:
+            await coro_fn(*args, channel)
+        except asyncio.CancelledError:
+            if not channel.closed:
+                channel.put("(cancelled)")
+                channel.put(None)
+            raise
+        except Exception as e:
+            print(f"[Agent Error] request {request_id}: {e}")
+            channel.put("Sorry, I encountered an error. Please try again.")
+            channel.put(None)
+
+    def _forget(self, request_id, future, channel):
+        with self._lock:
+            self._requests.pop(request_id, None)
+        if future.cancelled():
+            # Decided on the loop thread, which is the only one that writes `started`,
+            # so a cancel that lands just as the request starts ends it exactly once.
+            try:
+                self.loop.call_soon_threadsafe(self._end_unstarted, channel)
+            except RuntimeError:  # the loop is already closed
+                self._end_unstarted(channel)
+
+    @staticmethod
+    def _end_unstarted(channel):
+        # A request cancelled before it started never reached _run_request.
+        if not channel.started and not channel.closed:
+            channel.put(None)
+
+    def cancel(self, request_id):
+        """Cancels a running request. Returns False if it had already finished."""
+        with self._lock:
+            future = self._requests.get(request_id)
+        if future is None:
+            return False
+        return future.cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            request_ids = list(self._requests)
+        for request_id in request_ids:
+            self.cancel(request_id)
+
+    def active_requests(self):
+        with self._lock:
+            return list(self._requests)
+
+    def run(self, coro, timeout=None):
+        """Blocking helper for synchronous callers that live outside the engine thread."""
+        if self.in_engine_thread():
+            raise RuntimeError("AgentEngine.run() cannot be called from the engine thread; await the coroutine instead.")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def shutdown(self):
+        self.cancel_all()
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,307 @@
+# app/core/extractor.py
+"""
+Local argument extraction for routed intents.
+
+Given a query and the intent it was routed to, fills the intent's `args` without an
+LLM call: spaCy NER finds cities (every pipeline component is disabled except `ner`
+and the `tok2vec` layer it reads its features from), and rule-based parsers handle
+dates/times, ticker symbols, URLs, IDs and the free-text arguments that follow a
+trigger phrase ("remind me to ...", "news about ...").
+`extract_batch` runs the same extraction over many queries with `nlp.pipe`.
+"""
+import datetime
+import re
+
+from app.core.models import models
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_HOUR = 9  # a date without a time means the morning
+SPACY_COMPONENTS = ("tok2vec", "ner")  # ner needs the shared tok2vec features
+
+# Intents whose arguments benefit from named entities.
+NER_INTENTS = {"weather", "set_default_city"}
+
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "ten": 10, "fifteen": 15, "thirty": 30}
+_UNITS = {"minute": "minutes", "min": "minutes", "hour": "hours", "hr": "hours", "day": "days", "week": "weeks"}
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?\b")
+RELATIVE_RE = re.compile(r"\bin\s+(\d+|an?|one|two|three|four|five|ten|fifteen|thirty)\s*(minute|min|hour|hr|day|week)s?\b", re.IGNORECASE)
+DAY_RE = re.compile(r"\b(day after tomorrow|today|tonight|tomorrow)\b", re.IGNORECASE)
+WEEKDAY_RE = re.compile(r"\b(?:on\s+|next\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.IGNORECASE)
+CLOCK_RE = re.compile(
+    r"\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)(?!\w)"
+    r"|\bat\s+(\d{1,2})(?::(\d{2}))?\b"
+    r"|\b(?:at\s+)?(noon|midnight)\b",
+    re.IGNORECASE,
+)
+URL_RE = re.compile(r"\bhttps?://[^\s]+|\b(?:www\.)?[a-z0-9-]+(?:\.[a-z]{2,})+(?:/[^\s]*)?", re.IGNORECASE)
+TICKER_RE = re.compile(r"\$([A-Za-z]{1,5})\b|\b([A-Z]{1,5})\b")
+NUMERIC_ID_RE = re.compile(r"(?:#|\bid\s*|\bnumber\s*|\bno\.?\s*)?\b(\d+)\b", re.IGNORECASE)
+JOB_ID_RE = re.compile(r"\b([0-9a-f]{8,})\b", re.IGNORECASE)
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+# A place is up to four words that are not prepositions or time words ("in rome for the
+# weekend" -> "rome", "going to rain in paris" -> "paris").
+_PLACE_WORD = r"(?!(?:in|for|at|to|on|from|by|over|during|this|next|the|today|tomorrow|tonight|now|right|week|weekend)\b)[a-z][a-z.'-]*"
+_TIME_PHRASE = (r"today|tomorrow|tonight|now|right\s+now|(?:this|next)\s+\w+|(?:for\s+|over\s+)?the\s+weekend"
+                r"|(?:on\s+)?(?:mon|tues|wednes|thurs|fri|satur|sun)day")
+TRAILING_PLACE_RE = re.compile(
+    rf"\b(?:in|for|at|to)\s+({_PLACE_WORD}(?:\s+{_PLACE_WORD}){{0,3}})\s*(?:{_TIME_PHRASE})?[?.!]*$", re.IGNORECASE
+)
+
+# Uppercase words that are not ticker symbols.
+NOT_TICKERS = {"I", "A", "AM", "PM", "OK", "US", "USA", "UK", "EU", "CEO", "AI", "ID", "IT", "ME", "MY"}
+
+# Free-text arguments: whatever follows the trigger phrase.
+TRAILING_TEXT_RULES = {
+    "get_news": ("topic", r"\bnews\s+(?:about|on|regarding|for|from)\s+(?P<value>.+)"),
+    "google_search": ("query", r"\b(?:search\s+(?:the\s+web\s+|google\s+)?for|google|look\s+up)\s+(?P<value>.+)"),
+    "generate_image": ("prompt", r"\b(?:(?:image|picture|photo|drawing)\s+of|draw|paint)\s+(?P<value>.+)"),
+    "research_and_summarize": ("topic", r"\b(?:research|summarize|summarise)\s+(?:about\s+|on\s+)?(?P<value>.+)"),
+    "set_goal": ("goal_description", r"\b(?:set\s+(?:a\s+)?(?:new\s+)?goal|my\s+goal\s+is|goal)\s*(?:to|of|:)?\s+(?P<value>.+)"),
+    "add_task": ("task_description", r"\badd\s+(?:a\s+)?(?:new\s+)?task\s*(?:to|:)?\s+(?P<value>.+)"),
+    "set_language": ("language", r"\b(?:language\s+to|speak\s+(?:in\s+)?|reply\s+in|respond\s+in)\s*(?P<value>[a-z]+)"),
+    "set_tone": ("tone", r"\btone\s+to\s+(?P<value>.+)"),
+    "set_interests": ("interests", r"\b(?:interests?\s+(?:to|are|is)|interested\s+in)\s+(?P<value>.+)"),
+}
+TRAILING_TEXT_RULES = {intent: (arg, re.compile(pattern, re.IGNORECASE)) for intent, (arg, pattern) in TRAILING_TEXT_RULES.items()}
+
+REMINDER_TRIGGER_RE = re.compile(r"\b(?:remind\s+me\s+(?:to|about|that)|reminder\s+(?:to|for|about|that))\s+(?P<value>.+)", re.IGNORECASE)
+
+
+class Extraction:
+    """Arguments extracted for an intent, plus the pieces of the query they came from."""
+    def __init__(self, args, spans):
+        self.args = args
+        self.spans = spans
+
+    def residual(self, query):
+        """The query with the extracted pieces (whole words only) removed."""
+        for text in sorted(self.spans, key=len, reverse=True):
+            query = re.sub(rf"(?<!\w){re.escape(text)}(?!\w)", " ", query, flags=re.IGNORECASE)
+        return re.sub(r"\s+", " ", query).strip()
+
+    def __repr__(self):
+        return f"Extraction(args={self.args!r})"
+
+
+def parse_datetime(text, now=None):
+    """
+    Finds a date and/or time in the text ("tomorrow at 5pm", "in 10 minutes",
+    "2026-01-05 14:30", "on friday"). Returns (datetime, matched substrings) or None.
+    """
+    now = now or datetime.datetime.now()
+    spans = []
+
+    match = ISO_DATE_RE.search(text)
+    if match:
+        year, month, day, hour, minute, second = match.groups()
+        try:
+            value = datetime.datetime(int(year), int(month), int(day), int(hour or DEFAULT_HOUR), int(minute or 0), int(second or 0))
+        except ValueError:
+            return None
+        return value, [match.group(0)]
+
+    match = RELATIVE_RE.search(text)
+    if match:
+        amount = match.group(1).lower()
+        amount = int(amount) if amount.isdigit() else _NUMBER_WORDS[amount]
+        delta = datetime.timedelta(**{_UNITS[match.group(2).lower()]: amount})
+        return (now + delta).replace(microsecond=0), [match.group(0)]
+
+    date = None
+    default_hour = DEFAULT_HOUR
+    match = DAY_RE.search(text)
+    if match:
+        word = match.group(1).lower()
+        offset = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[word]
+        date = now.date() + datetime.timedelta(days=offset)
+        if word == "tonight":
+            default_hour = 20
+        spans.append(match.group(0))
+    else:
+        match = WEEKDAY_RE.search(text)
+        if match:
+            days_ahead = (_WEEKDAYS.index(match.group(1).lower()) - now.weekday()) % 7 or 7
+            date = now.date() + datetime.timedelta(days=days_ahead)
+            spans.append(match.group(0))
+
+    clock = None
+    match = CLOCK_RE.search(text)
+    if match:
+        hour, minute, meridiem, hour24, minute24, word = match.groups()
+        if word:
+            clock = (12, 0) if word.lower() == "noon" else (0, 0)
+        elif hour is not None:
+            hour = int(hour) % 12
+            if meridiem.lower().startswith("p"):
+                hour += 12
+            clock = (hour, int(minute or 0))
+        else:
+            clock = (int(hour24), int(minute24 or 0))
+            if date is not None and default_hour == 20 and clock[0] < 12:
+                clock = (clock[0] + 12, clock[1])  # "tonight at 8"
+        if clock[0] > 23 or clock[1] > 59:
+            return None
+        spans.append(match.group(0))
+
+    if date is None and clock is None:
+        return None
+    if date is None:
+        value = datetime.datetime.combine(now.date(), datetime.time(*clock))
+        if value <= now:
+            value += datetime.timedelta(days=1)
+        return value, spans
+    return datetime.datetime.combine(date, datetime.time(*(clock or (default_hour, 0)))), spans
+
+
+def _clean(value):
+    value = re.sub(r"\s+", " ", value).strip(" \t,;:-")
+    value = re.sub(r"[?.!]+$", "", value).strip()
+    # Connectives left dangling once a date or time has been cut out.
+    value = re.sub(r"^(?:to|that|at|on|in|by|for)\s+", "", value, flags=re.IGNORECASE)
+    return re.sub(r"\s+\b(?:at|on|in|by|for)$", "", value, flags=re.IGNORECASE).strip()
+
+
+def _extract_city(query, doc):
+    if doc is not None:
+        places = [ent.text for ent in doc.ents if ent.label_ == "GPE"]
+        if places:
+            return places[0]
+    match = TRAILING_PLACE_RE.search(query)
+    if match and match.group(1).strip():
+        return _clean(match.group(1))
+    return None
+
+
+def _extract_set_default_city(query, doc, now):
+    if doc is not None:
+        places = [ent.text for ent in doc.ents if ent.label_ == "GPE"]
+        if places:
+            return {"city": places[0]}, places[:1]
+    match = re.search(r"\b(?:city\s+(?:to|is)|to)\s+(?P<value>[a-z][a-z .'-]*)[?.!]*$", query, re.IGNORECASE)
+    if match:
+        city = _clean(match.group("value"))
+        return {"city": city}, [city]
+    return None
+
+
+def _extract_weather(query, doc, now):
+    city = _extract_city(query, doc)
+    return ({"city": city}, [city]) if city else None
+
+
+def _extract_stock(query, doc, now):
+    for match in TICKER_RE.finditer(query):
+        symbol = match.group(1) or match.group(2)
+        if match.group(1) or symbol not in NOT_TICKERS:
+            return {"symbol": symbol.upper()}, [match.group(0)]
+    return None
+
+
+def _extract_url(query, doc, now):
+    match = URL_RE.search(query)
+    return ({"url": match.group(0).rstrip(".,!?")}, [match.group(0)]) if match else None
+
+
+def _extract_website(query, doc, now):
+    found = _extract_url(query, doc, now)
+    if found:
+        return found
+    match = re.search(r"\b(?:open|launch|go\s+to)\s+(?P<value>[a-z0-9-]+)[?.!]*$", query, re.IGNORECASE)
+    return ({"url": match.group("value")}, [match.group("value")]) if match else None
+
+
+def _numeric_id(arg):
+    def extract(query, doc, now):
+        match = NUMERIC_ID_RE.search(query)
+        return ({arg: match.group(1)}, [match.group(0)]) if match else None
+    return extract
+
+
+def _extract_reminder_id(query, doc, now):
+    match = JOB_ID_RE.search(query) or NUMERIC_ID_RE.search(query)
+    return ({"reminder_id": match.group(1)}, [match.group(0)]) if match else None
+
+
+def _extract_reminder(query, doc, now):
+    parsed = parse_datetime(query, now)
+    trigger = REMINDER_TRIGGER_RE.search(query)
+    if not parsed or not trigger:
+        return None
+    when, time_spans = parsed
+    message = trigger.group("value")
+    for text in time_spans:
+        message = message.replace(text, " ")
+    message = _clean(message)
+    if not message:
+        return None
+    return {"message": message, "time": when.strftime(TIME_FORMAT)}, [message] + time_spans
+
+
+def _extract_email(query, doc, now):
+    match = EMAIL_RE.search(query)
+    return ({"recipient": match.group(0)}, [match.group(0)]) if match else None
+
+
+def _trailing_text(intent):
+    arg, pattern = TRAILING_TEXT_RULES[intent]
+
+    def extract(query, doc, now):
+        match = pattern.search(query)
+        if not match:
+            return None
+        value = _clean(match.group("value"))
+        return ({arg: value}, [value]) if value else None
+    return extract
+
+
+EXTRACTORS = {
+    "weather": _extract_weather,
+    "set_default_city": _extract_set_default_city,
+    "get_stock_price": _extract_stock,
+    "open_website": _extract_website,
+    "research_webpage": _extract_url,
+    "delete_reminder": _extract_reminder_id,
+    "complete_goal": _numeric_id("goal_id"),
+    "abandon_goal": _numeric_id("goal_id"),
+    "complete_task": _numeric_id("task_id"),
+    "set_reminder": _extract_reminder,
+    "send_email": _extract_email,
+}
+EXTRACTORS.update({intent: _trailing_text(intent) for intent in TRAILING_TEXT_RULES})
+
+
+class ArgumentExtractor:
+    def __init__(self, registry=models):
+        self.registry = registry
+
+    def _docs(self, texts, batch_size=64):
+        nlp = self.registry.get("spacy")
+        disabled = [name for name in nlp.pipe_names if name not in SPACY_COMPONENTS]
+        return nlp.pipe(texts, disable=disabled, batch_size=batch_size)
+
+    def extract(self, query, intent, now=None):
+        """
+        Extraction for one query, or None if the intent's arguments cannot all be filled
+        locally. spaCy is only used once it has been loaded, so this never blocks on it.
+        """
+        return self.extract_batch([(query, intent)], now=now, wait_for_model=False)[0]
+
+    def extract_batch(self, items, batch_size=64, now=None, wait_for_model=True):
+        """Extracts arguments for many (query, intent) pairs, running spaCy once over the batch."""
+        docs = {}
+        ner_items = [i for i, (_, intent) in enumerate(items) if intent in NER_INTENTS]
+        if ner_items and (wait_for_model or self.registry.is_loaded("spacy")):
+            try:
+                for i, doc in zip(ner_items, self._docs([items[i][0] for i in ner_items], batch_size)):
+                    docs[i] = doc
+            except Exception as e:
+                print(f"[Extractor Error] {e}")
+
+        results = []
+        for i, (query, intent) in enumerate(items):
+            extractor = EXTRACTORS.get(intent)
+            found = extractor(query, docs.get(i), now) if extractor else None
+            results.append(Extraction(*found) if found else None)
+        return results
@@ -3,6 +3,7 @@
 
 from app.core.spell_checker import correct_spelling
 from app.core.safety import is_content_safe
+from app.core.tracing import span, traced
 import html
 import re
 
@@ -13,6 +14,11 @@ def process_input(raw_query: str):
     2. Corrects spelling.
     3. Performs a safety check.
     """
+    with span("input.process_input"):
+        return _process_input(raw_query)
+
+
+def _process_input(raw_query: str):
     # 1. Sanitize Input
     safe_query = sanitize_input(raw_query)
     if not safe_query:
@@ -29,6 +35,7 @@ def process_input(raw_query: str):
     return corrected_query, None
 
 
+@traced("input.sanitize_input")
 def sanitize_input(user_text: str) -> str:
     """
     Sanitize user input to prevent script/HTML injection.
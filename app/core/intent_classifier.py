@@ -0,0 +1,193 @@
+# app/core/intent_classifier.py
+"""
+Local intent classifier distilled from the LLM planner.
+
+Every plan the LLM planner makes is logged to the `planner_decisions` table as a
+(query, label) pair. `python -m app.core.intent_classifier` fits a softmax regression
+over MiniLM embeddings of those queries, reports accuracy on held-out planner labels
+and saves the weights as a NumPy archive. At runtime the planner asks the classifier
+first and only calls the LLM when the prediction is not confident.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from app.core.models import models
+
+INTENT_MODEL_PATH = os.path.join("app", "database", "intent_classifier.npz")
+MIN_CONFIDENCE = 0.9
+# A model that did worse than this on held-out planner labels is not used at runtime.
+MIN_HELDOUT_ACCURACY = 0.9
+MIN_TRAINING_SAMPLES = 50
+
+NO_TOOL_LABEL = "__none__"
+MULTI_TOOL_LABEL = "__multi__"
+
+
+def plan_label(plan):
+    """The intent label a plan teaches: its single tool, or one of the special labels."""
+    if not plan:
+        return NO_TOOL_LABEL
+    if len(plan) > 1:
+        return MULTI_TOOL_LABEL
+    return plan[0].get("tool_name") or NO_TOOL_LABEL
+
+
+class IntentClassifier:
+    def __init__(self, weights=None, bias=None, labels=(), heldout_accuracy=0.0):
+        self.weights = weights
+        self.bias = bias
+        self.labels = list(labels)
+        self.heldout_accuracy = heldout_accuracy
+
+    @property
+    def ready(self):
+        return self.weights is not None and self.heldout_accuracy >= MIN_HELDOUT_ACCURACY
+
+    def fit(self, vectors, labels, epochs=300, learning_rate=0.5, l2=1e-4):
+        """Full-batch gradient descent on the softmax cross-entropy."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.labels = sorted(set(labels))
+        index = {label: i for i, label in enumerate(self.labels)}
+        targets = np.zeros((len(labels), len(self.labels)), dtype=np.float32)
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+
+        self.weights = np.zeros((vectors.shape[1], len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            gradient = (self.predict_proba(vectors) - targets) / len(vectors)
+            self.weights -= learning_rate * (vectors.T @ gradient + l2 * self.weights)
+            self.bias -= learning_rate * gradient.sum(axis=0)
+        return self
+
+    def predict_proba(self, vectors):
+        logits = np.asarray(vectors, dtype=np.float32) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, vectors):
+        """Returns a (label, confidence) pair per vector."""
+        probabilities = self.predict_proba(vectors)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def accuracy(self, vectors, labels):
+        if not len(labels):
+            return 0.0
+        predicted = [label for label, _ in self.predict(vectors)]
+        return sum(p == t for p, t in zip(predicted, labels)) / len(labels)
+
+    def classify(self, query):
+        """(label, confidence) for one query, or (None, 0.0) if no usable model is trained."""
+        if not self.ready:
+            return None, 0.0
+        return self.predict(embed([query]))[0]
+
+    def save(self, path=INTENT_MODEL_PATH):
+        np.savez(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels), heldout_accuracy=self.heldout_accuracy)
+
+    @classmethod
+    def load(cls, path=INTENT_MODEL_PATH):
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], data["labels"].tolist(), float(data["heldout_accuracy"]))
+
+
+def embed(texts):
+    return np.asarray(models.get("embedding").encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def _modified_time():
+    try:
+        return os.path.getmtime(INTENT_MODEL_PATH)
+    except OSError:
+        return None
+
+
+def _load_intent_classifier():
+    modified = _modified_time()
+    classifier = IntentClassifier() if modified is None else IntentClassifier.load(INTENT_MODEL_PATH)
+    classifier.modified = modified
+    return classifier
+
+
+models.register("intent_classifier", _load_intent_classifier, priority=30)
+
+
+def current_classifier():
+    """The registered classifier, reloaded first if the model file was retrained since it was loaded."""
+    classifier = models.get("intent_classifier")
+    if _modified_time() != getattr(classifier, "modified", None):
+        classifier = models.reload("intent_classifier")
+    return classifier
+
+
+def normalise_query(query):
+    return " ".join(query.lower().split()).strip("?!. ")
+
+
+def deduplicate(decisions):
+    """One (query, label) per normalised query, keeping the latest label the planner chose."""
+    latest = {}
+    for query, label in decisions:
+        key = normalise_query(query)
+        latest.pop(key, None)  # re-inserted so the order follows the latest occurrence
+        latest[key] = (query, label)
+    return list(latest.values())
+
+
+def split_holdout(queries, labels, holdout=0.2, seed=0):
+    """Shuffled train / held-out split; callers pass unique queries so none lands on both sides."""
+    order = np.random.default_rng(seed).permutation(len(queries))
+    cut = int(len(queries) * (1 - holdout))
+    train, test = order[:cut], order[cut:]
+    return ([queries[i] for i in train], [labels[i] for i in train],
+            [queries[i] for i in test], [labels[i] for i in test])
+
+
+def train_from_logs(decisions, holdout=0.2, min_samples=MIN_TRAINING_SAMPLES, path=INTENT_MODEL_PATH):
+    """
+    Fits on logged planner decisions, reports held-out accuracy and saves the model.
+    Repeated queries are counted once, so the held-out figure is measured on queries
+    the classifier has not seen. A running assistant picks the new file up on its next query.
+    """
+    decisions = deduplicate(decisions)
+    queries = [query for query, _ in decisions]
+    labels = [label for _, label in decisions]
+    if len(queries) < min_samples:
+        print(f"Only {len(queries)} distinct planner decisions logged; need at least {min_samples}.")
+        return None
+
+    train_queries, train_labels, test_queries, test_labels = split_holdout(queries, labels, holdout)
+    classifier = IntentClassifier().fit(embed(train_queries), train_labels)
+    accuracy = classifier.accuracy(embed(test_queries), test_labels) if test_queries else 0.0
+    print(f"Trained on {len(train_queries)} decisions, {len(classifier.labels)} labels. "
+          f"Held-out accuracy: {accuracy:.1%} on {len(test_queries)} decisions.")
+
+    # Refit on everything for deployment; the held-out figure gates runtime use.
+    classifier = IntentClassifier().fit(embed(queries), labels)
+    classifier.heldout_accuracy = accuracy
+    classifier.save(path)
+    if not classifier.ready:
+        print(f"Accuracy is below {MIN_HELDOUT_ACCURACY:.0%}; the planner will keep using the LLM.")
+    print(f"Saved intent classifier to {path}")
+    return classifier
+
+
+def main():
+    from app.core.utils import init_db
+    from app.database.planner_decisions import get_planner_decisions
+
+    parser = argparse.ArgumentParser(description="Train the local intent classifier from logged planner decisions.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of decisions held out for evaluation")
+    parser.add_argument("--min-samples", type=int, default=MIN_TRAINING_SAMPLES)
+    parser.add_argument("--output", default=INTENT_MODEL_PATH)
+    args = parser.parse_args()
+
+    init_db()
+    train_from_logs(get_planner_decisions(), args.holdout, args.min_samples, args.output)
+
+
+if __name__ == "__main__":
+    main()
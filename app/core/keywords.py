@@ -1,5 +1,10 @@
 KEYWORD_TO_INTENT = {
-    
+
+    # Greeting
+    "hello": "greet",
+    "hi": "greet",
+    "good morning": "greet",
+    "good evening": "greet",
 
     # Time
     "time": "get_time",
@@ -7,8 +12,15 @@ KEYWORD_TO_INTENT = {
 
     # Chat
     "reset chat": "reset_chat",
+    "reset the chat": "reset_chat",
     "clear chat": "reset_chat",
+    "clear the chat": "reset_chat",
+    "reset conversation": "reset_chat",
+    "reset the conversation": "reset_chat",
     "stop talking": "stop_speech",
+    "stop speaking": "stop_speech",
+    "stop reading": "stop_speech",
+    "be quiet": "stop_speech",
     "shut up": "stop_speech",
 
     # Weather
@@ -22,6 +34,7 @@ KEYWORD_TO_INTENT = {
     "photo": "generate_image",
     "generate": "generate_image",
     "create": "generate_image",
+    "draw": "generate_image",
 
     # Web
     "open": "open_website",
@@ -35,6 +48,14 @@ KEYWORD_TO_INTENT = {
     "research": "research_and_summarize",
     "summarize": "research_and_summarize",
     "scrape": "research_webpage",
+    "look up": "google_search",
+
+    # News and stocks
+    "news": "get_news",
+    "headlines": "get_news",
+    "stock": "get_stock_price",
+    "stock price": "get_stock_price",
+    "share price": "get_stock_price",
 
     # File
     "file": "file_query",
@@ -47,6 +68,7 @@ KEYWORD_TO_INTENT = {
     "set a reminder": "set_reminder",
     "show reminders": "show_reminders",
     "list reminders": "show_reminders",
+    "my reminders": "show_reminders",
     "delete reminder": "delete_reminder",
     "remove reminder": "delete_reminder",
 
@@ -72,6 +94,14 @@ KEYWORD_TO_INTENT = {
     "abandon goal": "abandon_goal",
     "quit goal": "abandon_goal",
 
+    # Tasks
+    "add task": "add_task",
+    "my tasks": "show_tasks",
+    "show tasks": "show_tasks",
+    "list tasks": "show_tasks",
+    "pending tasks": "show_tasks",
+    "complete task": "complete_task",
+
     # User
     "my details": "get_user_details",
     "who am i": "get_user_details",
@@ -1,7 +1,6 @@
 # app/core/main.py
 import pvporcupine
 import struct
-import asyncio
 import customtkinter as ctk
 from tkinter import scrolledtext, messagebox, filedialog, Toplevel, Label
 import tkinter as tk
@@ -28,7 +27,8 @@ from app.features.greetme import greetMe
 from app.features.calendar import show_reminders
 from app.features.weather import handle_weather_query
 from app.features.ai import get_ai_response
-from app.features.image_generate import generate_image
+from app.features.image_generate import generate_image_async
+from app.features.trip_planner import format_itinerary_header, format_itinerary_row
 from langdetect import detect
 from deep_translator import GoogleTranslator
 import edge_tts
@@ -37,8 +37,12 @@ import tempfile
 from app.core.agent import AIAgent
 from app.database.feedback import add_feedback
 from app.core.input_handler import process_input
+from app.core.stream_renderer import StreamRenderer
+from app.core.engine import AgentEngine
+from app.core.session import SessionState
+from app.core.models import models
+from app.core import tracing
 import html  # required for escaping sanitized text
-import textwrap
 
 speech_queue = queue.Queue()
 SESSION_FILE = "session.json"
@@ -68,7 +72,8 @@ class ChatApplication(ctk.CTk):
         self.minsize(800, 600)
 
         self.icon_path = os.path.join("app", "static", "ai.ico")
-        self.current_user = None
+        # Conversation state shared with the agent; current_user and message_history live here.
+        self.agent_session = SessionState("desktop", host=self)
         self.session_id = None
         self.dropdown_menu = None
         self.history_sidebar = None
@@ -76,22 +81,47 @@ class ChatApplication(ctk.CTk):
         self.max_guest_questions = 10
         self.image_generation_count = 0
         self.image_limit_logged_in = 5
-        self.message_history = []
         self.request_tracker = {}
-        self.start_time = None
+        self.request_start_times = {}
 
         self.rag = RAG()
         self.agent = AIAgent(self, self.rag)
-        self.response_queue = queue.Queue()
+        self.agent.sessions.add(self.agent_session, pinned=True)
+        self.engine = AgentEngine().start()
 
         self.setup_ui()
+        self.renderer = StreamRenderer(
+            self,
+            on_start=self._begin_response,
+            on_text=self._append_response,
+            on_complete=self._finish_response,
+        )
         init_db()
         create_tables()
         self.auto_login()
-        greetMe()
-        self._check_response_queue()
+        # Load models in the background; the first query only waits for what it needs.
+        models.warm_up()
+        # Speak the greeting on the speech worker instead of blocking the window.
+        speech_queue.put(greetMe(speak=False))
         # self.start_wake_word_listener()
 
+    @property
+    def current_user(self):
+        return self.agent_session.current_user
+
+    @current_user.setter
+    def current_user(self, user):
+        self.agent_session.current_user = user
+
+    @property
+    def message_history(self):
+        return self.agent_session.message_history
+
+    @message_history.setter
+    def message_history(self, history):
+        # Logout, loading a saved chat, the day rollover and reset all replace the history.
+        self.agent_session.replace_history(history)
+
     def start_wake_word_listener(self):
         threading.Thread(target=self.listen_for_wake_word, daemon=True).start()
 
@@ -307,6 +337,18 @@ class ChatApplication(ctk.CTk):
             text_color=["#FFFFFF", "#FFFFFF"],
         ).pack(side="left", padx=(10, 0))
 
+        ctk.CTkButton(
+            self.bottom_frame,
+            text="⏹",
+            width=45,
+            height=48,
+            command=self.cancel_requests,
+            font=("Segoe UI", 16),
+            corner_radius=15,
+            fg_color=["#E6E6E6", "#2C2F33"],
+            text_color=["#000000", "#FFFFFF"],
+        ).pack(side="left", padx=(10, 0))
+
 
 
     def upload_file(self):
@@ -399,7 +441,7 @@ class ChatApplication(ctk.CTk):
     def login_user(self, first_name, last_name, gmail):
         self.current_user = {"first_name": first_name, "last_name": last_name, "gmail": gmail}
         self.session_id = self.get_or_create_session(gmail)
-        self.agent.load_user_preferences(gmail)
+        self.agent.load_user_preferences(self.agent_session, gmail)
         self.update_navbar_buttons()
         self.save_session()
         self.load_chat_history(self.session_id)
@@ -428,7 +470,7 @@ class ChatApplication(ctk.CTk):
         self.message_history = []
         self.respond("You have been logged out.")
 
-    def handle_image_generation(self, query):
+    async def handle_image_generation(self, query):
         limit = self.image_limit_logged_in if self.current_user else self.image_limit_guest
         if self.image_generation_count >= limit:
             return "⚠️ You have reached the image generation limit. Please login or wait."
@@ -439,13 +481,19 @@ class ChatApplication(ctk.CTk):
         if not prompt:
             return "Please specify what you want to generate."
 
-        image_response = generate_image(prompt)
-        image_path = image_response.get('image')
+        image_response = await generate_image_async(prompt)
+        image_path = image_response.get('image_path')
 
         if not image_path:
             error_message = image_response.get('error', 'Unknown error')
             return f"❌ Failed to generate image: {error_message}"
 
+        self.image_generation_count += 1
+        # Widgets must be created on the Tk thread, not on the agent engine thread.
+        self.after(0, self._display_generated_image, image_path)
+        return image_path
+
+    def _display_generated_image(self, image_path):
         try:
             with open(image_path, "rb") as f:
                 image_data = f.read()
@@ -466,15 +514,12 @@ class ChatApplication(ctk.CTk):
                 self.image_refs = []
             self.image_refs.append(image_tk_preview)
 
-            self.image_generation_count += 1
             if self.speech_enabled.get():
                 speech_queue.put("Image generated successfully.")
 
-            return image_path
-
         except Exception as e:
             print(f"[Image Display Error] {e}")
-            return "❌ Failed to display image."
+            self.respond("❌ Failed to display image.")
 
     def toggle_tasks_sidebar(self):
         if self.tasks_sidebar.winfo_ismapped():
@@ -673,16 +718,26 @@ class ChatApplication(ctk.CTk):
 
         self.request_tracker = {}
 
-    def process_command(self, query=None):
+    def process_command(self, query=None, speaker="You"):
         # Data Flow Step 1: Input Handling
         # The user's raw query is processed by the input_handler.
         # This includes sanitization, spell checking, and a safety check.
         raw_query = query if query is not None else self.input_entry.get().strip()
         if not raw_query:
             return
+        # The first check may load the spell index and the safety classifier; keep the
+        # window responsive and continue on the Tk thread once it is done.
+        threading.Thread(target=self._check_input, args=(raw_query, query, speaker), daemon=True).start()
 
-        processed_query, error_message = process_input(raw_query)
+    def _check_input(self, raw_query, query, speaker):
+        try:
+            processed_query, error_message = process_input(raw_query)
+        except Exception as e:
+            print(f"[Input Error] {e}")
+            processed_query, error_message = None, "Sorry, I couldn't process that message."
+        self.after(0, self._accept_input, processed_query, error_message, query, speaker)
 
+    def _accept_input(self, processed_query, error_message, query, speaker):
         if error_message:
             self.respond(f"⚠️ {error_message}")
             if not query: # Clear input field only if it was a typed message
@@ -712,7 +767,7 @@ class ChatApplication(ctk.CTk):
         # Display user message
         self.chat_area.configure(state="normal")
         self.chat_area.tag_config("user", foreground="#0078D7")
-        self.chat_area.insert(tk.END, f"You: {processed_query}\n", "user")
+        self.chat_area.insert(tk.END, f"{speaker}: {processed_query}\n", "user")
         self.chat_area.configure(state="disabled")
         self.message_history.append({"role": "user", "content": processed_query})
         if self.current_user:
@@ -724,49 +779,44 @@ class ChatApplication(ctk.CTk):
         # The processed query is sent to the AIAgent, which uses the PlanningEngine
         # to determine the user's intent and create a plan.
         self.thinking_label.pack(pady=5)
-        self.start_time = time.perf_counter()
-        threading.Thread(target=self._process_query_thread, args=(processed_query,)).start()
+        request_id, channel = self.engine.submit(self._run_agent_query, processed_query)
+        self.request_start_times[request_id] = time.perf_counter()
+        self.renderer.attach(channel)
 
-    def _process_query_thread(self, query):
-        try:
-            asyncio.run(self.agent.process_query(query, self.response_queue))
-        except Exception as e:
-            print(f"[Agent Error] {e}")
-            self.response_queue.put("Sorry, I encountered an error. Please try again.")
-            self.response_queue.put(None)
+    async def _run_agent_query(self, query, response_queue):
+        # process_command already ran the safety check through process_input.
+        await self.agent.process_query(query, response_queue, self.agent_session, safety_checked=True)
 
-    def _check_response_queue(self):
-        try:
-            chunk = self.response_queue.get(block=False)
-            if chunk is None:
-                if self.start_time:
-                    end_time = time.perf_counter()
-                    elapsed_time = (end_time - self.start_time) * 1_000_000  # in microseconds
-                    print(f"Response took: {elapsed_time:.2f} microseconds")
-                    self.start_time = None
-                self.thinking_label.pack_forget()
-                # Save the complete response to history
-                complete_response = self.chat_area.get("end-2l", "end-1c").strip()
-                if self.current_user:
-                    add_message(self.session_id, "assistant", complete_response)
-                self.message_history.append({"role": "assistant", "content": complete_response})
-                return
+    def cancel_requests(self):
+        """Cancels every query that is still running on the agent engine."""
+        self.engine.cancel_all()
 
-            if self.thinking_label.winfo_ismapped():
-                self.thinking_label.pack_forget()
-                self.chat_area.configure(state="normal")
-                self.chat_area.insert(tk.END, "Jenny: ")
-                self.chat_area.configure(state="disabled")
+    def _begin_response(self):
+        self.thinking_label.pack_forget()
+        self.chat_area.configure(state="normal")
+        self.chat_area.tag_config("jenny", foreground="#000000")
+        self.chat_area.insert(tk.END, "Jenny: ")
+        self.chat_area.configure(state="disabled")
 
-            self.chat_area.configure(state="normal")
-            self.chat_area.tag_config("jenny", foreground="#000000")
-            self.chat_area.insert(tk.END, chunk, "jenny")
-            self.chat_area.configure(state="disabled")
-            self.chat_area.see(tk.END)
+    def _append_response(self, text):
+        self.chat_area.configure(state="normal")
+        self.chat_area.insert(tk.END, text, "jenny")
+        self.chat_area.configure(state="disabled")
+        self.chat_area.see(tk.END)
 
-        except queue.Empty:
-            pass
-        self.after(100, self._check_response_queue)
+    def _finish_response(self, complete_response, channel):
+        start_time = self.request_start_times.pop(channel.request_id, None)
+        if start_time:
+            tracing.record("ui.response_total", (time.perf_counter() - start_time) * 1000)
+        if not self.request_start_times:
+            self.thinking_label.pack_forget()
+        self.chat_area.configure(state="normal")
+        self.chat_area.insert(tk.END, "\n\n")
+        self.chat_area.configure(state="disabled")
+        # Save the complete response to history
+        if self.current_user:
+            add_message(self.session_id, "assistant", complete_response)
+        self.message_history.append({"role": "assistant", "content": complete_response})
 
     def _update_chat_with_response(self, answer, query):
         self.thinking_label.pack_forget()
@@ -808,40 +858,10 @@ class ChatApplication(ctk.CTk):
     def _display_itinerary_table(self, itinerary):
         self.chat_area.configure(state="normal")
         self.chat_area.insert(tk.END, "Here is your trip itinerary:\n\n")
-        
-        # Define table headers
-        headers = ["Day", "Morning", "Afternoon", "Evening"]
-        col_widths = [5, 30, 30, 30]
-
-        # Header
-        header_line = ""
-        for i, header in enumerate(headers):
-            header_line += f"{header:<{col_widths[i]}} "
-        self.chat_area.insert(tk.END, header_line + "\n")
-        self.chat_area.insert(tk.END, "-" * sum(col_widths) + "\n")
-
-        # Table content
+        self.chat_area.insert(tk.END, format_itinerary_header())
         for day_plan in itinerary:
-            day = str(day_plan.get("day", ""))
-            morning = day_plan.get("morning", "")
-            afternoon = day_plan.get("afternoon", "")
-            evening = day_plan.get("evening", "")
-
-            # Wrap text
-            morning_lines = textwrap.wrap(morning, width=col_widths[1])
-            afternoon_lines = textwrap.wrap(afternoon, width=col_widths[2])
-            evening_lines = textwrap.wrap(evening, width=col_widths[3])
-
-            max_lines = max(len(morning_lines), len(afternoon_lines), len(evening_lines), 1)
-
-            for i in range(max_lines):
-                day_str = f"{day:<{col_widths[0]}} " if i == 0 else " " * (col_widths[0] + 1)
-                morning_str = f"{morning_lines[i]:<{col_widths[1]}} " if i < len(morning_lines) else " " * (col_widths[1] + 1)
-                afternoon_str = f"{afternoon_lines[i]:<{col_widths[2]}} " if i < len(afternoon_lines) else " " * (col_widths[2] + 1)
-                evening_str = f"{evening_lines[i]:<{col_widths[3]}} " if i < len(evening_lines) else ""
-                self.chat_area.insert(tk.END, f"{day_str}{morning_str}{afternoon_str}{evening_str}\n")
-            
-            self.chat_area.configure(state="disabled")
+            self.chat_area.insert(tk.END, format_itinerary_row(day_plan))
+        self.chat_area.configure(state="disabled")
         self.chat_area.see(tk.END)
 
     def add_feedback_buttons(self, response_id):
@@ -886,18 +906,8 @@ class ChatApplication(ctk.CTk):
                 if detected_lang != "en":
                     raw_query = GoogleTranslator(source="auto", target="en").translate(raw_query)
 
-                # Process the input
-                processed_query, error_message = process_input(raw_query)
-
-                if error_message:
-                    self.respond(f"⚠️ {error_message}")
-                    return
-
-                self.chat_area.configure(state="normal")
-                self.chat_area.insert(tk.END, f"You (Voice): {processed_query}\n")
-                self.chat_area.configure(state="disabled")
-
-                self.process_command(processed_query)
+                # Checked off the Tk thread and shown like a typed message.
+                self.process_command(raw_query, speaker="You (Voice)")
 
             except sr.UnknownValueError:
                 self.respond("Sorry, I didn't catch that.")
@@ -909,6 +919,15 @@ class ChatApplication(ctk.CTk):
 
 
 
+    def reset_chat(self):
+        self.message_history = []
+        self.after(0, self._clear_chat_area)
+
+    def _clear_chat_area(self):
+        self.chat_area.configure(state="normal")
+        self.chat_area.delete("1.0", tk.END)
+        self.chat_area.configure(state="disabled")
+
     def stop_speech(self):
         while not speech_queue.empty():
             try:
@@ -917,7 +936,9 @@ class ChatApplication(ctk.CTk):
                 continue
 
     def on_exit(self):
+        print(tracing.format_summary())
         speech_queue.put(None)
+        self.engine.shutdown()
         self.destroy()
 
     def toggle_theme(self):
@@ -0,0 +1,101 @@
+# app/core/models.py
+import threading
+import time
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+SPACY_MODEL_NAME = "en_core_web_sm"
+SAFETY_MODEL_NAME = "typeform/distilbert-base-uncased-mnli"
+
+
+class ModelRegistry:
+    """
+    Lazy, thread-safe loader for the heavy models the assistant uses.
+
+    Nothing is loaded at import time. `get(name)` loads a model on first use and blocks
+    only on that one model; `warm_up()` loads everything in the background in priority
+    order (lowest number first) so the window can appear immediately.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._priorities = {}
+        self._models = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self._warm_up_thread = None
+
+    def register(self, name, factory, priority=100):
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._priorities[name] = priority
+            self._locks.setdefault(name, threading.Lock())
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._factories:
+            raise KeyError(f"Unknown model '{name}'")
+        with self._locks[name]:
+            # Another thread (usually the warm-up thread) may have finished loading it.
+            model = self._models.get(name)
+            if model is None:
+                start = time.perf_counter()
+                model = self._factories[name]()
+                self._models[name] = model
+                print(f"[Models] Loaded {name} in {time.perf_counter() - start:.2f}s")
+        return model
+
+    def reload(self, name):
+        """Loads `name` again; callers keep the old copy until the new one is ready."""
+        if name not in self._factories:
+            raise KeyError(f"Unknown model '{name}'")
+        with self._locks[name]:
+            start = time.perf_counter()
+            model = self._factories[name]()
+            self._models[name] = model
+            print(f"[Models] Reloaded {name} in {time.perf_counter() - start:.2f}s")
+        return model
+
+    def warm_up(self, names=None):
+        """Starts a daemon thread that loads the given (or all) models in priority order."""
+        if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+            return self._warm_up_thread
+        with self._registry_lock:
+            names = list(names or self._factories)
+        names.sort(key=lambda n: self._priorities.get(n, 100))
+        self._warm_up_thread = threading.Thread(target=self._warm_up, args=(names,), name="model-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _warm_up(self, names):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"[Models] Warm-up of {name} failed: {e}")
+
+
+def _load_safety_classifier():
+    from transformers import pipeline
+    return pipeline("zero-shot-classification", model=SAFETY_MODEL_NAME)
+
+
+def _load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def _load_spacy():
+    import spacy
+    return spacy.load(SPACY_MODEL_NAME)
+
+
+models = ModelRegistry()
+# Every message goes through the safety check, most need embeddings for RAG,
+# and spaCy is only needed for entity extraction.
+models.register("safety_classifier", _load_safety_classifier, priority=10)
+models.register("embedding", _load_embedding_model, priority=20)
+models.register("spacy", _load_spacy, priority=50)
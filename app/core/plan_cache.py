@@ -0,0 +1,167 @@
+# app/core/plan_cache.py
+"""
+Cache of LLM plans keyed on query templates.
+
+When the planner returns a plan, every argument value that appears verbatim in the
+query is replaced by a slot, so "weather in London" is stored as the template
+"weather in {0}" with the plan [weather(city={0})]. A later "weather in Paris" matches
+the template and gets the same plan with "Paris" filled back in, without an LLM call.
+Plans with an argument the query does not spell out (e.g. a date the LLM resolved from
+"tomorrow") are not cached, since they could not be rebuilt for another query.
+"""
+import collections
+import re
+import threading
+import time
+
+from app.core.router import STOPWORDS
+
+PLAN_CACHE_SIZE = 512
+PLAN_CACHE_TTL = 6 * 3600  # seconds
+
+# Queries that lean on the conversation ("do it again", "what about Paris") are
+# planned with the chat history, so their plans cannot be reused out of context.
+CONTEXTUAL_WORDS = {"it", "that", "this", "those", "them", "again", "same", "there", "he", "she", "they", "about"}
+
+_SPACE_RE = re.compile(r"\s+")
+_SLOT_RE = re.compile(r"\{(\d+)\}")
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def normalize_query(query):
+    """Collapses whitespace and drops trailing punctuation; case is kept for slot values."""
+    return _SPACE_RE.sub(" ", query).strip().rstrip("?!.").strip()
+
+
+class PlanCache:
+    def __init__(self, max_size=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # template -> (pattern, steps, slots, expires_at)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def check_fingerprint(self, fingerprint):
+        """Drops every cached plan when the tool catalogue (intent_routes) has changed."""
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._entries.clear()
+                self._fingerprint = fingerprint
+
+    def get(self, query):
+        """Returns a plan for the query with its argument values filled in, or None."""
+        text = normalize_query(query)
+        if not text or _is_contextual(text):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for template in [text.lower()] + list(reversed(self._entries)):
+                entry = self._entries.get(template)
+                if entry is None:
+                    continue
+                pattern, steps, slots, expires_at = entry
+                if expires_at < now:
+                    del self._entries[template]
+                    continue
+                match = pattern.fullmatch(text)
+                if match is None:
+                    continue
+                values = {int(name[1:]): value.strip() for name, value in match.groupdict().items()}
+                if not all(_fits_slot(values[index], original) for index, original in enumerate(slots)):
+                    continue
+                self._entries.move_to_end(template)
+                self.hits += 1
+                return _fill(steps, values)
+            self.misses += 1
+        return None
+
+    def put(self, query, plan):
+        """Caches a plan under the query's template; returns False if it cannot be reused."""
+        text = normalize_query(query)
+        if not text or "{" in text or _is_contextual(text) or not isinstance(plan, list):
+            return False
+        template = _make_template(text, plan)
+        if template is None:
+            return False
+        template, steps, slots = template
+        pattern = re.compile(_template_regex(template), re.IGNORECASE)
+        with self._lock:
+            self._entries[template] = (pattern, steps, slots, time.monotonic() + self.ttl)
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _is_contextual(text):
+    return any(word in CONTEXTUAL_WORDS for word in _WORD_RE.findall(text.lower()))
+
+
+def _make_template(text, plan):
+    """Turns the query into a slotted template; None if some argument is not in the query."""
+    template = text.lower()
+    slots = []  # lowercase slot values, index = slot number
+    steps = []
+    for step in plan:
+        if not isinstance(step, dict) or not isinstance(step.get("args", {}), dict):
+            return None
+        slot_args = {}
+        for name, value in step.get("args", {}).items():
+            value = str(value).strip().lower()
+            if not value:
+                return None
+            if value not in slots:
+                # Only whole words outside existing slots can become a slot.
+                match = re.search(rf"(?<![\w{{]){re.escape(value)}(?![\w}}])", template)
+                if match is None:
+                    return None
+                template = template[:match.start()] + f"{{{len(slots)}}}" + template[match.end():]
+                slots.append(value)
+            slot_args[name] = slots.index(value)
+        steps.append({**step, "args": slot_args})
+    # A template that is nothing but slots would match any query.
+    if not _WORD_RE.search(_SLOT_RE.sub("", template)):
+        return None
+    return template, steps, slots
+
+
+def _fits_slot(value, original):
+    """
+    Guards against a slot swallowing the rest of a different query: the value may not
+    be much longer than the one the template was learned from, and may only contain
+    filler words if that one did ("the weather" must not fill "{0} weather").
+    """
+    words = value.lower().split()
+    original_words = original.split()
+    if not words or len(words) > max(2 * len(original_words), len(original_words) + 2):
+        return False
+    if "and" in words and "and" not in original_words:
+        return False
+    return any(w in STOPWORDS for w in original_words) or not any(w in STOPWORDS for w in words)
+
+
+def _template_regex(template):
+    parts = []
+    position = 0
+    for match in _SLOT_RE.finditer(template):
+        parts.append(re.escape(template[position:match.start()]))
+        parts.append(rf"(?P<s{match.group(1)}>.+?)")
+        position = match.end()
+    parts.append(re.escape(template[position:]))
+    return "".join(parts)
+
+
+def _fill(steps, values):
+    return [
+        {**step, "args": {name: values[index] for name, index in step["args"].items()}}
+        for step in steps
+    ]
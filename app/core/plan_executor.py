@@ -0,0 +1,159 @@
+# app/core/plan_executor.py
+"""
+Runs a plan as a dependency graph.
+
+Steps may name the steps they must wait for with "depends_on" (step indices, or the
+"id" of another step); everything else starts at once. Async handlers run on the
+event loop, sync handlers on a bounded thread pool, so a weather + news + stock plan
+takes about as long as its slowest tool.
+
+Output is written to the response queue as soon as it exists. One step at a time
+streams live; output of steps that finish while another one is streaming is held
+back and flushed the moment the live step is done, so chunks are never interleaved.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.tracing import span
+
+MAX_TOOL_WORKERS = 8
+
+_tool_pool = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
+
+
+class StepOutput:
+    """The response queue handed to a streaming handler; routes its chunks through the executor."""
+    def __init__(self, executor, index):
+        self.executor = executor
+        self.index = index
+
+    def put(self, item, block=True, timeout=None):
+        # The end of the response is signalled once, by the planner, after the whole plan.
+        if item is not None:
+            self.executor.emit(self.index, item)
+
+
+def resolve_dependencies(plan):
+    """
+    Maps each step index to the indices it depends on. Unknown references are
+    ignored; a plan whose dependencies form a cycle runs strictly in order.
+    """
+    ids = {step.get("id"): i for i, step in enumerate(plan) if step.get("id") is not None}
+    dependencies = {}
+    for i, step in enumerate(plan):
+        deps = set()
+        for ref in step.get("depends_on") or []:
+            if isinstance(ref, int) and 0 <= ref < len(plan):
+                deps.add(ref)
+            elif ref in ids:
+                deps.add(ids[ref])
+            elif isinstance(ref, str) and ref.isdigit() and int(ref) < len(plan):
+                deps.add(int(ref))
+        deps.discard(i)
+        dependencies[i] = deps
+
+    # Kahn's algorithm: if not every step can be ordered there is a cycle.
+    remaining = {i: set(deps) for i, deps in dependencies.items()}
+    ready = [i for i, deps in remaining.items() if not deps]
+    ordered = 0
+    while ready:
+        current = ready.pop()
+        ordered += 1
+        for i, deps in remaining.items():
+            if current in deps:
+                deps.discard(current)
+                if not deps:
+                    ready.append(i)
+    if ordered < len(plan):
+        return {i: ({i - 1} if i else set()) for i in range(len(plan))}
+    return dependencies
+
+
+class PlanExecutor:
+    def __init__(self, intent_routes, response_queue, session):
+        self.intent_routes = intent_routes
+        self.response_queue = response_queue
+        self.session = session
+        self._live = None  # index of the step currently streaming to the user
+        self._last_emitter = None
+        self._buffers = {}
+        self._finished = []  # finished steps whose output is still held back
+
+    async def run(self, plan):
+        dependencies = resolve_dependencies(plan)
+        self._buffers = {i: [] for i in range(len(plan))}
+        done = {i: asyncio.get_running_loop().create_future() for i in range(len(plan))}
+        await asyncio.gather(*(self._run_step(i, step, dependencies[i], done) for i, step in enumerate(plan)))
+
+    async def _run_step(self, index, step, dependencies, done):
+        succeeded = False
+        try:
+            failed = [i for i in dependencies if not await asyncio.shield(done[i])]
+            tool_name = step.get("tool_name")
+            if failed:
+                self.emit(index, f"Skipped {tool_name} because an earlier step failed.")
+                return
+            route = self.intent_routes.get(tool_name)
+            if route is None:
+                self.emit(index, f"Sorry, I found an unknown tool in my plan: {tool_name}")
+                return
+            args = step.get("args") or {}
+            handler = route["handler"]
+            with span(f"tool.{tool_name}"):
+                if route.get("streaming"):
+                    await handler(args, StepOutput(self, index), self.session)
+                    result = None
+                elif asyncio.iscoroutinefunction(handler):
+                    result = await handler(args, self.session)
+                else:
+                    context = contextvars.copy_context()
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        _tool_pool, context.run, handler, args, self.session
+                    )
+            if result is not None:
+                self.emit(index, str(result))
+            succeeded = True
+        except Exception as e:
+            print(f"[Planning Error] {step.get('tool_name')}: {e}")
+            self.emit(index, f"Sorry, something went wrong while running {step.get('tool_name')}.")
+        finally:
+            if not done[index].done():
+                done[index].set_result(succeeded)
+            self._finish(index)
+
+    def emit(self, index, chunk):
+        if self._live is None:
+            self._live = index
+        if self._live == index:
+            self._forward(index, chunk)
+        else:
+            self._buffers[index].append(chunk)
+
+    def _forward(self, index, chunk):
+        if self._last_emitter is not None and self._last_emitter != index:
+            self.response_queue.put("\n")
+        self._last_emitter = index
+        self.response_queue.put(chunk)
+
+    def _finish(self, index):
+        if self._live == index:
+            self._live = None
+        else:
+            self._finished.append(index)
+        if self._live is None:
+            self._hand_over()
+
+    def _hand_over(self):
+        """Flushes held-back output of finished steps, then lets a running step stream live."""
+        for index in self._finished:
+            for chunk in self._buffers.pop(index, []):
+                self._forward(index, chunk)
+        self._finished.clear()
+        for index, chunks in self._buffers.items():
+            if chunks:
+                self._live = index
+                for chunk in chunks:
+                    self._forward(index, chunk)
+                chunks.clear()
+                break
@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import json
 import re
 from datetime import datetime
@@ -6,6 +8,35 @@ from deep_translator import GoogleTranslator
 
 from app.features.ai import get_ai_response
 from app.database.preferences import get_user_preference
+from app.core.tracing import span
+from app.core.safety import SAFETY_CHECKED, SAFETY_POLICY
+from app.core.keywords import KEYWORD_TO_INTENT
+from app.core.router import KeywordRouter
+from app.core.extractor import ArgumentExtractor
+from app.core.plan_cache import PlanCache
+from app.core.tool_retriever import ToolRetriever
+from app.core.plan_executor import PlanExecutor
+from app.core.speculation import SPECULATIVE_EXECUTION, SpeculativeBuffer
+from app.core.intent_classifier import MIN_CONFIDENCE, NO_TOOL_LABEL, current_classifier, plan_label
+from app.core.models import models
+from app.database.planner_decisions import log_planner_decision
+
+PLANNER_HISTORY_MESSAGES = 6
+PLAN_ERROR_MESSAGE = "Sorry, I encountered an error while generating the response."
+
+
+class _SentTracker:
+    """Forwards to a response queue and remembers whether anything reached the user."""
+    def __init__(self, queue):
+        self.queue = queue
+        self.sent = False
+
+    def put(self, item, block=True, timeout=None):
+        self.sent = True
+        self.queue.put(item, block, timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
 
 class PlanningEngine:
     """
@@ -16,36 +47,149 @@ class PlanningEngine:
     """
     def __init__(self, agent):
         self.agent = agent
+        self.router = KeywordRouter(KEYWORD_TO_INTENT)
+        self.extractor = ArgumentExtractor()
+        self.plan_cache = PlanCache()
+        self.tool_retriever = ToolRetriever()
 
-    def get_tools_definition(self):
-        tools = []
-        for intent, data in self.agent.intent_routes.items():
-            tools.append({
+    def local_step(self, query, intent):
+        """
+        A plan step for an intent chosen locally, with its arguments extracted from the
+        query. Returns (step, extraction) or None if some argument cannot be filled.
+        """
+        route = self.agent.intent_routes.get(intent)
+        if route is None:
+            return None
+        if not route.get("args"):
+            return {"tool_name": intent, "args": {}}, None
+        extraction = self.extractor.extract(query, intent)
+        if extraction is None or not set(route["args"]) <= set(extraction.args):
+            return None
+        return {"tool_name": intent, "args": extraction.args}, extraction
+
+    def route_locally(self, query):
+        """
+        Fast path: returns a one-step plan when the keyword router confidently matches an
+        intent whose arguments can be extracted locally, otherwise None (the LLM planner decides).
+        """
+        with span("planner.local_route") as attrs:
+            attrs["hit"] = False
+            match = self.router.match(query)
+            local = self.local_step(query, match.intent) if match else None
+            if local is None:
+                return None
+            step, extraction = local
+            if extraction is None and match.unexplained:
+                # Nothing can absorb the leftover words ("what time is it in tokyo").
+                return None
+            if extraction is not None:
+                # Each extracted argument explains one more word of the query.
+                match = self.router.match(query, explained=extraction.spans)
+                if match is None or match.intent != step["tool_name"]:
+                    return None
+            if match.confidence < self.router.min_confidence:
+                return None
+            attrs["hit"] = True
+            attrs["intent"] = step["tool_name"]
+            return [step]
+
+    def classify_locally(self, query):
+        """
+        Asks the intent classifier distilled from past planner decisions. Returns a plan
+        for confident predictions whose arguments can be extracted locally, otherwise None.
+        """
+        # Never wait for the embedding model here; the LLM planner covers the warm-up window.
+        if not models.is_loaded("embedding"):
+            return None
+        with span("planner.intent_classifier") as attrs:
+            try:
+                label, confidence = current_classifier().classify(query)
+            except Exception as e:
+                print(f"[Intent Classifier Error] {e}")
+                return None
+            attrs["label"] = label
+            attrs["confidence"] = round(confidence, 3)
+            if label is None or confidence < MIN_CONFIDENCE:
+                return None
+            if label == NO_TOOL_LABEL:
+                return []
+            local = self.local_step(query, label)
+            return [local[0]] if local else None
+
+    def get_tools(self):
+        return [
+            {
                 "name": intent,
                 "description": data.get("description", f"Handles {intent}"),
                 "args": data.get("args", {})
-            })
-        return json.dumps(tools, indent=2)
+            }
+            for intent, data in self.agent.intent_routes.items()
+        ]
+
+    def get_tools_definition(self):
+        return json.dumps(self.get_tools(), indent=2)
+
+    def routes_fingerprint(self, tools=None):
+        """Changes whenever a tool is added, removed or redescribed in intent_routes."""
+        tools = self.get_tools() if tools is None else tools
+        return hashlib.sha1(json.dumps(tools, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def get_plan(self, query, session):
+        """Returns the plan for a query from the plan cache, or from the LLM planner on a miss."""
+        tools = self.get_tools()
+        fingerprint = self.routes_fingerprint(tools)
+        self.plan_cache.check_fingerprint(fingerprint)
+        with span("planner.plan_cache") as attrs:
+            plan = self.plan_cache.get(query)
+            attrs["hit"] = plan is not None
+        if plan is not None:
+            return plan
+
+        plan = await asyncio.to_thread(self.classify_locally, query)
+        if plan is not None:
+            return plan
 
-    async def create_plan(self, query):
-        tools_definition = self.get_tools_definition()
+        with span("planner.create_plan"):
+            plan_response = await self.create_plan(query, session, tools, fingerprint)
+        plan_str = plan_response.get('text', '')
+
+        match = re.search(r'\[.*\]', plan_str, re.DOTALL)
+        if not match:
+            return []
+        plan = json.loads(match.group(0))
+        if all(isinstance(step, dict) and step.get("tool_name") in self.agent.intent_routes for step in plan):
+            self.plan_cache.put(query, plan)
+            # Training data for the intent classifier; written off the event loop.
+            asyncio.get_running_loop().run_in_executor(None, log_planner_decision, query, plan_label(plan), plan)
+        return plan
+
+    async def create_plan(self, query, session, tools=None, fingerprint=None):
+        tools = self.get_tools() if tools is None else tools
+        fingerprint = fingerprint or self.routes_fingerprint(tools)
+        # Only the tools relevant to this query go into the prompt, in a compact form.
+        # Embedding runs off the event loop (the first call may still be loading the model).
+        with span("planner.select_tools") as attrs:
+            selected = await asyncio.to_thread(self.tool_retriever.select, query, tools, fingerprint)
+            attrs["tools"] = len(selected)
+        tools_definition = self.tool_retriever.schema(selected, fingerprint)
         
         prompt = f"""You are an intelligent planner for an AI assistant named Jenny.
 Your job is to create a step-by-step plan to fulfill the user's request by using the available tools.
 
-**Available Tools:**
+**Available Tools** (name(arguments): description):
 {tools_definition}
 
 **User Query:**
 "{query}"
 
-**Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}
+**Time:** {datetime.now().strftime('%Y-%m-%d %H:%M')}
 
 **Instructions:**
 1.  Analyze the user's query to understand their intent.
 2.  If the query requires information from the user's files, you MUST use the "file_query" tool.
 3.  If the query can be fulfilled using one or more tools, create a plan.
 4.  The plan must be a JSON array of objects. Each object represents a step and must have a "tool_name" and an "args" object.
+    Steps run at the same time. If a step must wait for earlier steps, add "depends_on": [indexes of those steps, starting at 0].
 5.  The "tool_name" must be one of the available tools.
 6.  The "args" object should contain the arguments for the tool, extracted from the user's query.
 7.  If a tool requires no arguments, provide an empty "args" object: {{}}.
@@ -55,89 +199,123 @@ Your job is to create a step-by-step plan to fulfill the user's request by using
 **Plan:**
 """
         
-        response = await get_ai_response(prompt, self.agent.app.message_history, self.agent.ai_brain_context, stream=False)
+        # The planner only needs the last few turns to resolve follow-ups.
+        history = session.message_history[-PLANNER_HISTORY_MESSAGES:]
+        response = await get_ai_response(prompt, history, self.agent.ai_brain_context, stream=False, safety=SAFETY_POLICY)
         return response
 
-    async def execute_plan(self, query, response_queue):
+    async def execute_plan(self, query, response_queue, session):
         """
         Data Flow Step 3: Decision (Core Logic)
         This method executes the plan generated by create_plan.
-        It iterates through the steps, calls the appropriate handler function for each tool,
-        and passes the required arguments.
+        Steps run as a dependency graph (see PlanExecutor): independent tool calls run
+        concurrently and each result is streamed as soon as it is ready.
         If no plan is generated, it falls back to a general AI response.
         """
         # 1. Handle conversational context (moved from agent)
-        if self.agent.conversation_context == "AWAITING_CITY_FOR_WEATHER":
-            self.agent.conversation_context = None
-            self.agent.handle_weather({"city": query})
+        if session.conversation_context == "AWAITING_CITY_FOR_WEATHER":
+            session.conversation_context = None
+            response_queue.put(self.agent.handle_weather({"city": query}, session))
+            response_queue.put(None)
+            return
+        if session.conversation_context == "AWAITING_TRIP_DESTINATION":
+            session.conversation_context = None
+            plan = [{"tool_name": "plan_trip", "args": {"destination": query}}]
+            await PlanExecutor(self.agent.intent_routes, response_queue, session).run(plan)
+            response_queue.put(None)
             return
         # ... (add other conversational context handlers here if any) ...
 
         # 2. Translate query to English (moved from agent)
         try:
-            lang = detect(query)
+            with span("planner.detect_language"):
+                lang = detect(query)
             if lang != "en":
-                query = GoogleTranslator(source='auto', target='en').translate(query)
+                with span("planner.translate"):
+                    query = GoogleTranslator(source='auto', target='en').translate(query)
         except Exception as e:
             print(f"[Translation Error] {e}")
             pass
 
+        response_queue = _SentTracker(response_queue)
         try:
-            # 3. Create a plan using the LLM
-            plan_response = await self.create_plan(query)
-            plan_str = plan_response.get('text', '')
-            
-            match = re.search(r'\[.*\]', plan_str, re.DOTALL)
-            if not match:
-                response_generator = await get_ai_response(query, self.agent.app.message_history, self.agent.ai_brain_context, rag_context=rag_context, stream=True)
-                async for chunk in response_generator:
-                    response_queue.put(chunk)
-                response_queue.put(None)
-                return
-                
-            plan_str = match.group(0)
-            plan = json.loads(plan_str)
+            # 3. Route obvious commands locally, otherwise use a cached or fresh LLM plan
+            plan = self.route_locally(query)
+            if plan is None:
+                if SPECULATIVE_EXECUTION:
+                    await self.execute_speculatively(query, response_queue, session)
+                    return
+                plan = await self.get_plan(query, session)
 
             if not plan:
-                # If plan is empty, check for RAG context before falling back to AI
-                rag_context = self.agent.rag.retrieve_context(query)
-                response_generator = get_ai_response(query, self.agent.app.message_history, self.agent.ai_brain_context, rag_context=rag_context, stream=True)
-                async for chunk in response_generator:
-                    response_queue.put(chunk)
-                response_queue.put(None)
+                # No tool needed: answer directly, with RAG context if any
+                await self.answer_directly(query, response_queue, session)
                 return
 
-            # 4. Execute the plan
-            responses = []
-            for step in plan:
-                tool_name = step.get("tool_name")
-                args = step.get("args", {})
-                
-                if tool_name in self.agent.intent_routes:
-                    handler = self.agent.intent_routes[tool_name]["handler"]
-                    
-                    # Special handling for async and response_queue-based handlers
-                    if tool_name in ["google_search", "file_query", "research_and_summarize"]:
-                        await handler(args, response_queue)
-                        return 
-                    else:
-                        if asyncio.iscoroutinefunction(handler):
-                            result = await handler(args)
-                        else:
-                            result = handler(args)
-                        responses.append(result)
-                else:
-                    responses.append(f"Sorry, I found an unknown tool in my plan: {tool_name}")
-            
-            response_text = "\n".join(map(str, responses))
-            response_queue.put(response_text)
+            # 4. Execute the plan, independent steps concurrently
+            await PlanExecutor(self.agent.intent_routes, response_queue, session).run(plan)
             response_queue.put(None)
 
         except Exception as e:
             print(f"[Planning Error] {e}")
+            if response_queue.sent:
+                # Part of a response is already shown; end it rather than answering again.
+                response_queue.put(PLAN_ERROR_MESSAGE)
+                response_queue.put(None)
+                return
             # Fallback to AI with RAG context if planning fails
-            rag_context = self.agent.rag.retrieve_context(query)
-            response_generator = await get_ai_response(query, self.agent.app.message_history, self.agent.ai_brain_context, rag_context=rag_context, stream=True)
-            async for chunk in response_generator:
-                response_queue.put(chunk)
-            response_queue.put(None)
\ No newline at end of file
+            await self.answer_directly(query, response_queue, session)
+
+    async def execute_speculatively(self, query, response_queue, session):
+        """
+        Opt-in (JENNY_SPECULATIVE=1): plans and starts a direct answer (RAG retrieval
+        included) at the same time. The buffered answer is committed if the plan needs
+        no tool and cancelled otherwise, so conversational queries skip waiting for
+        the planner before the answer starts.
+        """
+        buffer = SpeculativeBuffer()
+        answer_task = asyncio.create_task(self.answer_directly(query, buffer, session))
+        with span("planner.speculation") as attrs:
+            try:
+                plan = await self.get_plan(query, session)
+            except asyncio.CancelledError:
+                answer_task.cancel()
+                raise
+            except Exception as e:
+                print(f"[Planning Error] {e}")
+                plan = []
+
+            if not plan:
+                attrs["outcome"] = "committed"
+                buffer.commit(response_queue)
+                try:
+                    await answer_task
+                except Exception as e:
+                    # Part of the answer may already be shown; finish it here rather
+                    # than letting execute_plan start a second answer after it.
+                    print(f"[AI Response Error] {e}")
+                    attrs["outcome"] = "failed"
+                    response_queue.put(PLAN_ERROR_MESSAGE)
+                    response_queue.put(None)
+                return
+
+            attrs["outcome"] = "cancelled"
+            buffer.discard()
+            answer_task.cancel()
+            try:
+                await answer_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                print(f"[Planning Error] {e}")
+
+        await PlanExecutor(self.agent.intent_routes, response_queue, session).run(plan)
+        response_queue.put(None)
+
+    async def answer_directly(self, query, response_queue, session):
+        """Streams a plain AI answer, grounded in RAG context when the knowledge base has any."""
+        rag_context = await asyncio.to_thread(self.agent.rag.retrieve_context, query)
+        response_generator = await get_ai_response(query, session.prompt_history(), self.agent.ai_brain_context, rag_context=rag_context, stream=True, safety=SAFETY_CHECKED, cache=True)
+        async for chunk in response_generator:
+            response_queue.put(chunk)
+        response_queue.put(None)
@@ -0,0 +1,224 @@
+# app/core/provider_pool.py
+"""
+Health-scored pool of LLM providers with circuit breakers and hedged requests.
+
+Each provider keeps a rolling window of time-to-first-chunk and of outcomes. Providers
+are tried fastest-and-healthiest first; one that fails FAILURE_THRESHOLD times in a
+row is skipped for COOLDOWN seconds, and a failure on its first request after that
+skips it for another cooldown. A stream that has produced nothing by the provider's
+usual p90 time-to-first-chunk is hedged: the next provider starts as well, the first
+one to produce a chunk wins and the other is cancelled.
+"""
+import asyncio
+import collections
+import math
+import threading
+import time
+
+STATS_WINDOW = 50  # most recent requests kept per provider
+FAILURE_THRESHOLD = 3  # consecutive failures that open the circuit
+COOLDOWN = 30.0  # seconds a provider with an open circuit is skipped
+HEDGE_PERCENTILE = 90
+MIN_HEDGE_DELAY = 1.0  # seconds
+MAX_HEDGE_DELAY = 5.0
+DEFAULT_LATENCY = 2.0  # assumed time-to-first-chunk of a provider without samples
+MIN_SAMPLES = 5  # samples needed before a provider's own percentile is trusted
+
+_NO_OUTPUT = object()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class ProviderStats:
+    def __init__(self, name, window=STATS_WINDOW):
+        self.name = name
+        self.latencies = collections.deque(maxlen=window)
+        self.outcomes = collections.deque(maxlen=window)  # True for success
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # circuit open while time.monotonic() < open_until
+
+    @property
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency(self, pct=50):
+        return _percentile(self.latencies, pct) if self.latencies else DEFAULT_LATENCY
+
+    def score(self):
+        """Expected cost of trying this provider; lower is better."""
+        return self.latency() * (1 + 4 * self.error_rate)
+
+
+class ProviderPool:
+    def __init__(self, names, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 hedge_percentile=HEDGE_PERCENTILE, min_hedge_delay=MIN_HEDGE_DELAY, max_hedge_delay=MAX_HEDGE_DELAY):
+        self.names = list(names)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stats(self, name):
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = ProviderStats(name)
+            return self._stats[name]
+
+    def ranked(self, names=None):
+        """
+        Providers to try, best first. Providers with an open circuit are left out until
+        their cooldown has passed. If every circuit is open, all providers are returned,
+        soonest to recover first, rather than none.
+        """
+        names = list(names or self.names)
+        now = time.monotonic()
+        stats = [self.stats(name) for name in names]
+        with self._lock:
+            available = [s for s in stats if now >= s.open_until]
+            if not available:
+                return [s.name for s in sorted(stats, key=lambda s: s.open_until)]
+            # sorted() is stable, so equally scored providers keep the configured order.
+            return [s.name for s in sorted(available, key=lambda s: s.score())]
+
+    def hedge_delay(self, name):
+        """How long to wait for a provider's first chunk before starting another one."""
+        stats = self.stats(name)
+        with self._lock:
+            if len(stats.latencies) < MIN_SAMPLES:
+                return self.max_hedge_delay
+            delay = _percentile(stats.latencies, self.hedge_percentile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    def record_success(self, name, latency):
+        stats = self.stats(name)
+        with self._lock:
+            stats.latencies.append(latency)
+            stats.outcomes.append(True)
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+
+    def record_cancelled(self, name, elapsed):
+        """
+        A stream cancelled before its first chunk took at least `elapsed`. Kept as a latency
+        sample when it is above the provider's median, so a provider that stalls without
+        failing loses its rank; a hedge cancelled early cannot make a provider look faster.
+        """
+        stats = self.stats(name)
+        with self._lock:
+            if elapsed > stats.latency(50):
+                stats.latencies.append(elapsed)
+
+    def record_failure(self, name):
+        stats = self.stats(name)
+        with self._lock:
+            stats.outcomes.append(False)
+            stats.consecutive_failures += 1
+            # A failure right after a cooldown (open_until is still set) reopens at once.
+            if stats.consecutive_failures >= self.failure_threshold or stats.open_until:
+                stats.open_until = time.monotonic() + self.cooldown
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    "p50": round(s.latency(50), 3),
+                    "p90": round(s.latency(90), 3),
+                    "error_rate": round(s.error_rate, 3),
+                    "circuit_open": time.monotonic() < s.open_until,
+                }
+                for name, s in self._stats.items()
+            }
+
+
+async def _discard(task, stream):
+    """Cancels a pending first-chunk read and closes its stream."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
+
+
+async def hedged_stream(pool, open_stream, attempts, first_chunk_timeout, names=None):
+    """
+    Yields the chunks of whichever provider produces a first chunk first.
+
+    `open_stream(name)` returns an async iterator of chunks. Up to `attempts` streams
+    are opened in total: a failed stream is replaced right away, a slow one is hedged
+    after pool.hedge_delay(). Errors after the first chunk are raised, never retried.
+    """
+    loop = asyncio.get_running_loop()
+    ranked = pool.ranked(names)
+    candidates = [ranked[i % len(ranked)] for i in range(attempts)]
+    running = {}  # first-chunk task -> (name, stream, start time)
+    winner = None
+    last_error = None
+    next_start = loop.time()
+    try:
+        while winner is None:
+            now = loop.time()
+            if candidates and (not running or now >= next_start):
+                name = candidates.pop(0)
+                stream = open_stream(name)
+                running[asyncio.ensure_future(stream.__anext__())] = (name, stream, now)
+                next_start = now + pool.hedge_delay(name)
+                continue
+            if not running:
+                raise last_error or RuntimeError("No provider produced a response")
+
+            wake = min(start + first_chunk_timeout for _, _, start in running.values())
+            if candidates:
+                wake = min(wake, next_start)
+            done, _ = await asyncio.wait(running, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                name, stream, start = running.pop(task)
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    chunk = _NO_OUTPUT
+                except Exception as e:
+                    pool.record_failure(name)
+                    last_error = e
+                    next_start = loop.time()  # replace the failed stream right away
+                    await _discard(task, stream)
+                    continue
+                pool.record_success(name, loop.time() - start)
+                if winner is None:
+                    winner = (name, stream, chunk)
+                else:
+                    await _discard(task, stream)
+
+            now = loop.time()
+            for task, (name, stream, start) in list(running.items()):
+                if winner is None and now >= start + first_chunk_timeout:
+                    del running[task]
+                    pool.record_failure(name)
+                    last_error = asyncio.TimeoutError(f"No response from {name} within {first_chunk_timeout}s")
+                    await _discard(task, stream)
+    finally:
+        # Losing (or abandoned) streams are cancelled; how long they ran still counts.
+        now = loop.time()
+        for task, (name, stream, start) in running.items():
+            pool.record_cancelled(name, now - start)
+            await _discard(task, stream)
+
+    name, stream, chunk = winner
+    if chunk is _NO_OUTPUT:
+        return
+    try:
+        yield chunk
+        async for chunk in stream:
+            yield chunk
+    except Exception:
+        pool.record_failure(name)
+        raise
+    finally:
+        await stream.aclose()
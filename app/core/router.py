@@ -0,0 +1,124 @@
+# app/core/router.py
+"""
+Deterministic keyword router compiled from KEYWORD_TO_INTENT.
+
+Phrases are stored in a token trie, so a query is scanned once, left to right, taking
+the longest phrase at each position (phrase priority: "delete reminder" beats
+"reminder"). The confidence of a route is the share of the query's content words the
+matched phrases explain, halved when the query mentions more than one intent.
+"""
+import re
+
+MIN_ROUTE_CONFIDENCE = 0.75
+
+# Words that carry no intent of their own and never lower the coverage of a match.
+STOPWORDS = {
+    "a", "an", "the", "is", "it", "its", "are", "what", "whats", "what's", "please", "pls",
+    "me", "my", "i", "can", "could", "you", "would", "will", "now", "right", "current",
+    "currently", "show", "list", "tell", "give", "display", "all", "of", "for", "to",
+    "hey", "jenny", "and", "just", "do", "does", "have", "there", "any", "see", "let",
+    "in", "on", "at", "about", "like",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_END = "$intent"
+
+
+class RouteMatch:
+    def __init__(self, intent, confidence, phrases, unexplained=()):
+        self.intent = intent
+        self.confidence = confidence
+        self.phrases = phrases
+        self.unexplained = list(unexplained)  # content words no phrase or argument accounts for
+
+    def __repr__(self):
+        return f"RouteMatch(intent={self.intent!r}, confidence={self.confidence:.2f}, phrases={self.phrases!r})"
+
+
+def tokenize(text):
+    return [token.strip("'") for token in _TOKEN_RE.findall(text.lower()) if token.strip("'")]
+
+
+def _first_content_position(tokens, span, taken):
+    """Position of the first content word of `span` where it occurs as whole tokens in `tokens`."""
+    for start in range(len(tokens) - len(span) + 1):
+        if span and tokens[start:start + len(span)] == span:
+            for i in range(start, start + len(span)):
+                if tokens[i] not in STOPWORDS and i not in taken:
+                    return i
+            return None
+    return None
+
+
+class KeywordRouter:
+    def __init__(self, keyword_to_intent, min_confidence=MIN_ROUTE_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self._trie = {}
+        for phrase, intent in keyword_to_intent.items():
+            node = self._trie
+            for token in tokenize(phrase):
+                node = node.setdefault(token, {})
+            node[_END] = (phrase, intent)
+
+    def find_phrases(self, tokens):
+        """Longest non-overlapping phrase matches as (start, end, phrase, intent)."""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    best = (i, j) + node[_END]
+            if best:
+                matches.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return matches
+
+    def match(self, query, explained=()):
+        """
+        Scores the query; returns a RouteMatch (possibly low-confidence) or None.
+        `explained` are argument spans extracted from the query; each one explains at
+        most one content word, so a long free-text argument cannot make up the coverage.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        matches = self.find_phrases(tokens)
+        if not matches:
+            return None
+
+        matched_positions = set()
+        for start, end, _, _ in matches:
+            matched_positions.update(range(start, end))
+        for text in explained:
+            position = _first_content_position(tokens, tokenize(text), matched_positions)
+            if position is not None:
+                matched_positions.add(position)
+        content_positions = {i for i, token in enumerate(tokens) if token not in STOPWORDS} | matched_positions
+        coverage = len(matched_positions) / len(content_positions)
+        unexplained = [tokens[i] for i in sorted(content_positions - matched_positions)]
+
+        intents = {intent for _, _, _, intent in matches}
+        # The longest phrase decides when several intents are mentioned.
+        start, end, phrase, intent = max(matches, key=lambda m: m[1] - m[0])
+        confidence = coverage if len(intents) == 1 else coverage / 2
+        return RouteMatch(intent, confidence, [m[2] for m in matches], unexplained)
+
+    def route(self, query, exact=False):
+        """
+        Returns a RouteMatch only when it clears the confidence threshold. With `exact`
+        (for intents that take no arguments) every content word must be explained, so
+        "what time is it in tokyo" is not answered with the local time.
+        """
+        match = self.match(query)
+        if match is None or match.confidence < self.min_confidence:
+            return None
+        if exact and match.unexplained:
+            return None
+        return match
@@ -1,7 +1,11 @@
+import collections
+import os
 import re
-from transformers import pipeline
+import threading
+import time
+from app.core.models import models
+from app.core.tracing import traced
 
-classifier = pipeline("zero-shot-classification", model="typeform/distilbert-base-uncased-mnli")
 candidate_labels = ["safe", "unsafe"]
 
 UNSAFE_PATTERNS = [
@@ -12,26 +16,185 @@ UNSAFE_PATTERNS = [
     r"\b(explicit|porn|nsfw)\b",
 ]
 
+# Tier 1: every pattern folded into one compiled alternation; the named group tells which one hit.
+UNSAFE_RE = re.compile("|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(UNSAFE_PATTERNS)), re.IGNORECASE)
+
 # Whitelist common safe queries
 WHITELIST = ["hello", "hi", "hey", "how are you", "greetings"]
+_WHITELIST = {" ".join(phrase.split()) for phrase in WHITELIST}
+
+# Short texts made only of these words are small talk and skip the classifier. A word
+# count alone is not enough: "how to poison someone" is short too.
+SMALL_TALK_WORDS = {
+    "hello", "hi", "hey", "greetings", "good", "morning", "afternoon", "evening", "night",
+    "thanks", "thank", "you", "ok", "okay", "yes", "no", "please", "bye", "goodbye", "sure",
+    "great", "nice", "cool", "fine", "well", "how", "are", "am", "i", "me", "doing", "what",
+    "s", "is", "it", "the", "a", "time", "date", "day", "today", "who", "your", "name",
+    "help", "stop", "reset", "chat",
+}
+
+# Cascade settings: only text that is neither clearly unsafe nor clearly benign reaches the model.
+SAFETY_CONFIG = {
+    "classifier_threshold": float(os.environ.get("JENNY_SAFETY_THRESHOLD", "0.85")),
+    "short_text_max_words": int(os.environ.get("JENNY_SAFETY_SHORT_WORDS", "4")),
+    "use_classifier": os.environ.get("JENNY_SAFETY_CLASSIFIER", "1") != "0",
+}
+
+SAFETY_TIERS = ["cache", "lexical_block", "whitelist", "small_talk", "classifier_disabled", "classifier_pass", "classifier_block", "classifier_error"]
+
+# How a prompt reaching the LLM should be checked:
+SAFETY_FULL = "full"        # untrusted text: full check (cached)
+SAFETY_POLICY = "policy"    # planner / tool-generated prompts: cheap pattern policy only
+SAFETY_CHECKED = "checked"  # user text whose verdict was already computed for this request
+
+VERDICT_CACHE_SIZE = 2048
+VERDICT_CACHE_TTL = 60 * 60  # seconds
+
+
+class VerdictCache:
+    """Thread-safe LRU cache of safety verdicts with a time-to-live."""
+    def __init__(self, max_size=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            verdict, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, key, verdict):
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verdict_cache = VerdictCache()
+
+
+class TierStats:
+    """Counts how many checks each cascade tier settled."""
+    def __init__(self):
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, tier):
+        with self._lock:
+            self._counts[tier] += 1
+
+    def report(self):
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            "total": total,
+            "tiers": {
+                tier: {"count": counts.get(tier, 0), "share": round(counts.get(tier, 0) / total, 4) if total else 0.0}
+                for tier in SAFETY_TIERS
+            },
+        }
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+tier_stats = TierStats()
+
+
+def get_safety_stats():
+    """Share of safety checks settled at each tier of the cascade."""
+    return tier_stats.report()
+
+
+def normalize_text(text):
+    """Lowercases, drops punctuation and collapses whitespace so near-identical texts share a key."""
+    text = re.sub(r"[^\w\s-]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def check_policy(text):
+    """Cheap pattern-only policy (tier 1), also used for prompts the assistant builds itself."""
+    match = UNSAFE_RE.search(text)
+    if match:
+        pattern = UNSAFE_PATTERNS[int(match.lastgroup[1:])]
+        return False, f"⚠️ Your query was blocked due to: '{pattern}'"
+    return True, ""
+
+
+def check_prompt(text, safety=SAFETY_FULL):
+    """Applies the check that matches where a prompt came from (see the SAFETY_* modes)."""
+    if safety == SAFETY_CHECKED:
+        return True, ""
+    if safety == SAFETY_POLICY:
+        return check_policy(text)
+    return is_content_safe(text)
+
+
+class _FailOpen(tuple):
+    """A pass given only because the classifier failed; never cached, so the text is checked again."""
+
 
 def is_content_safe(text):
-    if text.lower().strip() in WHITELIST:
+    key = normalize_text(text)
+    verdict = verdict_cache.get(key)
+    if verdict is None:
+        verdict = _evaluate(text, key)
+        if not isinstance(verdict, _FailOpen):
+            verdict_cache.put(key, verdict)
+    else:
+        tier_stats.hit("cache")
+    return verdict
+
+
+@traced("safety.is_content_safe")
+def _evaluate(text, normalized=None):
+    """
+    Tiered cascade:
+    1. compiled lexical prefilter blocks obvious cases in microseconds,
+    2. the whitelist and short small talk (only SMALL_TALK_WORDS) pass right away,
+    3. only ambiguous text reaches the zero-shot classifier.
+    """
+    safe, message = check_policy(text)
+    if not safe:
+        tier_stats.hit("lexical_block")
+        return safe, message
+
+    normalized = normalized if normalized is not None else normalize_text(text)
+    if normalized in _WHITELIST:
+        tier_stats.hit("whitelist")
         return True, ""
+    words = normalized.split()
+    if len(words) <= SAFETY_CONFIG["short_text_max_words"] and all(word in SMALL_TALK_WORDS for word in words):
+        tier_stats.hit("small_talk")
+        return True, ""
+    if not SAFETY_CONFIG["use_classifier"]:
+        tier_stats.hit("classifier_disabled")
+        return True, ""
+
     try:
+        classifier = models.get("safety_classifier")
         result = classifier(text, candidate_labels)
-        if result['labels'][0] == 'unsafe' and result['scores'][0] > 0.85:
+        if result['labels'][0] == 'unsafe' and result['scores'][0] > SAFETY_CONFIG["classifier_threshold"]:
+            tier_stats.hit("classifier_block")
             return False, "⚠️ This query cannot be answered due to safety policy."
-        # Regex fallback
-        text_lower = text.lower()
-        for pattern in UNSAFE_PATTERNS:
-            if re.search(pattern, text_lower):
-                return False, f"⚠️ Your query was blocked due to: '{pattern}'"
+        tier_stats.hit("classifier_pass")
         return True, ""
     except Exception as e:
         print(f"[Safety Error] {e}")
-        text_lower = text.lower()
-        for pattern in UNSAFE_PATTERNS:
-            if re.search(pattern, text_lower):
-                return False, f"⚠️ Your query was blocked due to: '{pattern}'"
-        return True, ""
+        tier_stats.hit("classifier_error")
+        return _FailOpen((True, ""))
@@ -0,0 +1,116 @@
+# app/core/semantic_cache.py
+"""
+Opt-in semantic cache of direct answers (JENNY_SEMANTIC_CACHE=1).
+
+Past (query, answer) pairs are kept with the query's MiniLM embedding in a
+preallocated NumPy matrix; a lookup is one matrix-vector product. A new query whose
+cosine similarity to a cached one clears the threshold gets the cached answer,
+replayed through the same streaming interface as a live generation. Entries expire
+after a TTL and the least recently used entry is evicted when the cache is full.
+Queries that depend on the user, the conversation, the current time or retrieved
+documents are never cached.
+"""
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from app.core.models import models
+from app.core.plan_cache import CONTEXTUAL_WORDS
+
+SEMANTIC_CACHE_ENABLED = os.environ.get("JENNY_SEMANTIC_CACHE", "0") == "1"
+SIMILARITY_THRESHOLD = float(os.environ.get("JENNY_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+CACHE_SIZE = 2048
+CACHE_TTL = 24 * 3600  # seconds
+REPLAY_CHUNK_CHARS = 24
+
+PERSONAL_WORDS = {"i", "me", "my", "mine", "myself", "we", "us", "our", "ours", "i'm", "i've", "i'd"}
+TIME_SENSITIVE_WORDS = {
+    "today", "tonight", "tomorrow", "yesterday", "now", "currently", "current", "latest",
+    "recent", "recently", "news", "weather", "time", "date", "price", "score", "next",
+}
+FOLLOW_UP_WORDS = {"also", "else", "another", "and", "more"}
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def is_cacheable(query):
+    """False for queries whose answer depends on who asks, the conversation or the clock."""
+    words = _WORD_RE.findall(query.lower())
+    if not words or words[0] in FOLLOW_UP_WORDS:
+        return False
+    words = set(words)
+    return not (words & PERSONAL_WORDS or words & CONTEXTUAL_WORDS or words & TIME_SENSITIVE_WORDS)
+
+
+def replay(answer, chunk_chars=REPLAY_CHUNK_CHARS):
+    """Async generator yielding a cached answer in small pieces, like a live stream."""
+    async def _replay():
+        for i in range(0, len(answer), chunk_chars):
+            yield answer[i:i + chunk_chars]
+    return _replay()
+
+
+class SemanticCache:
+    def __init__(self, dim=384, max_size=CACHE_SIZE, ttl=CACHE_TTL, threshold=SIMILARITY_THRESHOLD, registry=models):
+        self.registry = registry
+        self.dim = dim
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = np.zeros((max_size, dim), dtype=np.float32)
+        self._expires = np.zeros(max_size, dtype=np.float64)  # 0 marks a free slot
+        self._last_used = np.zeros(max_size, dtype=np.float64)
+        self._queries = [None] * max_size
+        self._answers = [None] * max_size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, query):
+        """Normalized query embedding, or None while the embedding model is still loading."""
+        if not self.registry.is_loaded("embedding"):
+            return None
+        vector = self.registry.get("embedding").encode([query], normalize_embeddings=True)[0]
+        return np.asarray(vector, dtype=np.float32)
+
+    def lookup(self, vector):
+        """Returns (answer, similarity) for the closest live entry above the threshold, or None."""
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.monotonic()
+        with self._lock:
+            scores = self._vectors @ vector
+            scores[self._expires <= now] = -1.0
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[best] = now
+            self.hits += 1
+            return self._answers[best], float(scores[best])
+
+    def add(self, query, vector, answer):
+        now = time.monotonic()
+        with self._lock:
+            # A free or expired slot if there is one, otherwise the least recently used.
+            expired = np.flatnonzero(self._expires <= now)
+            slot = int(expired[0]) if len(expired) else int(self._last_used.argmin())
+            self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._queries[slot] = query
+            self._answers[slot] = answer
+
+    def clear(self):
+        with self._lock:
+            self._expires[:] = 0
+            self._queries = [None] * self.max_size
+            self._answers = [None] * self.max_size
+
+    def __len__(self):
+        with self._lock:
+            return int((self._expires > time.monotonic()).sum())
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,214 @@
+# app/core/server.py
+"""
+Headless HTTP serving mode.
+
+Drives AIAgent / PlanningEngine without Tk so the assistant can run behind a load
+balancer and serve many users from one process:
+
+    POST /api/chat          {"message": "...", "session_id": "..."} -> {"session_id", "response"}
+    POST /api/chat/stream   same body, answered as Server-Sent Events, one event per chunk
+    GET  /health
+    GET  /metrics           p50 / p95 / p99 latency per pipeline stage, safety tier shares
+"""
+import asyncio
+import json
+import os
+import uuid
+
+from aiohttp import web
+
+from app.core.agent import AIAgent
+from app.core.input_handler import process_input
+from app.core.stream_renderer import chunk_to_text
+from app.core import tracing
+from app.core.safety import get_safety_stats
+from app.features.image_generate import generate_image_async
+from app.features.rag import RAG
+
+REQUEST_TIMEOUT = float(os.environ.get("JENNY_REQUEST_TIMEOUT", "120"))  # seconds per query
+
+
+class AsyncResponseChannel:
+    """
+    Response channel for asyncio consumers. `put()` is safe to call from the event loop
+    and from worker threads, so it can be handed to the agent like the desktop queue.
+    """
+    def __init__(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.request_id = None
+        self.closed = False
+
+    def put(self, item, block=True, timeout=None):
+        if item is None:
+            self.closed = True
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def get(self):
+        return await self._queue.get()
+
+
+class HeadlessHost:
+    """Stands in for ChatApplication when the agent is served over HTTP; one per session."""
+    def __init__(self):
+        self.channel = None
+        self.lock = asyncio.Lock()
+
+    def respond(self, message):
+        # Progress notes from handlers go to the response stream of the current request.
+        if self.channel is not None:
+            self.channel.put(f"{message}\n")
+
+    def reset_chat(self):
+        pass
+
+    def stop_speech(self):
+        pass
+
+    async def handle_image_generation(self, prompt):
+        image_response = await generate_image_async(prompt)
+        if not image_response.get("image_path"):
+            return f"❌ Failed to generate image: {image_response.get('error', 'Unknown error')}"
+        return image_response["image_path"]
+
+
+class AgentServer:
+    def __init__(self, agent):
+        self.agent = agent
+
+    def get_session(self, session_id):
+        """Returns the SessionState for a client-supplied ID, creating one (and its host) if needed."""
+        if not session_id:
+            session_id = uuid.uuid4().hex
+        session = self.agent.sessions.get(str(session_id))
+        if session is None:
+            session = self.agent.get_session(str(session_id), host=HeadlessHost())
+        return session
+
+    async def run_query(self, session, raw_query):
+        """Runs one query for a session and yields the response chunks as they arrive."""
+        processed_query, error_message = await asyncio.to_thread(process_input, raw_query)
+        if error_message:
+            yield f"⚠️ {error_message}"
+            return
+
+        host = session.host
+        async with host.lock:
+            channel = AsyncResponseChannel()
+            host.channel = channel
+            session.message_history.append({"role": "user", "content": processed_query})
+            task = asyncio.create_task(self.agent.process_query(processed_query, channel, session, safety_checked=True))
+            # An end marker even if process_query returns or fails without sending one;
+            # it arrives after every chunk the task put before finishing.
+            task.add_done_callback(lambda _: channel.put(None))
+            deadline = asyncio.get_running_loop().time() + REQUEST_TIMEOUT
+
+            pieces = []
+            try:
+                while True:
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    try:
+                        chunk = await asyncio.wait_for(channel.get(), max(0.0, remaining))
+                    except asyncio.TimeoutError:
+                        print(f"[Server Error] session {session.session_id}: request timed out after {REQUEST_TIMEOUT}s")
+                        task.cancel()
+                        yield "⚠️ The request took too long and was stopped."
+                        return
+                    if chunk is None:
+                        break
+                    text = chunk_to_text(chunk)
+                    if text:
+                        pieces.append(text)
+                        yield text
+                try:
+                    await task
+                except Exception as e:
+                    print(f"[Server Error] session {session.session_id}: {e}")
+                    if not pieces:
+                        yield "Sorry, I encountered an error. Please try again."
+            except BaseException:
+                # Client went away or the request was cancelled: stop the agent work too.
+                task.cancel()
+                raise
+            finally:
+                host.channel = None
+                session.message_history.append({"role": "assistant", "content": "".join(pieces).strip()})
+
+    async def handle_chat(self, request):
+        body = await _read_json(request)
+        message = str(body.get("message", "")).strip()
+        if not message:
+            raise web.HTTPBadRequest(text="'message' is required")
+        session = self.get_session(body.get("session_id"))
+
+        pieces = [chunk async for chunk in self.run_query(session, message)]
+        return web.json_response({"session_id": session.session_id, "response": "".join(pieces).strip()})
+
+    async def handle_chat_stream(self, request):
+        body = await _read_json(request)
+        message = str(body.get("message", "")).strip()
+        if not message:
+            raise web.HTTPBadRequest(text="'message' is required")
+        session = self.get_session(body.get("session_id"))
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+        await _send_event(response, "session", {"session_id": session.session_id})
+        async for chunk in self.run_query(session, message):
+            await _send_event(response, "chunk", {"text": chunk})
+        await _send_event(response, "done", {})
+        await response.write_eof()
+        return response
+
+    async def handle_health(self, request):
+        self.agent.sessions.evict_idle()
+        return web.json_response({"status": "ok", "sessions": len(self.agent.sessions)})
+
+    async def handle_metrics(self, request):
+        return web.json_response({"latency": tracing.summary(), "safety": get_safety_stats()})
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+async def _send_event(response, event, data):
+    await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+
+def create_app(agent=None):
+    if agent is None:
+        agent = AIAgent(HeadlessHost(), RAG())
+    server = AgentServer(agent)
+    app = web.Application()
+    app["server"] = server
+    app.router.add_post("/api/chat", server.handle_chat)
+    app.router.add_post("/api/chat/stream", server.handle_chat_stream)
+    app.router.add_get("/health", server.handle_health)
+    app.router.add_get("/metrics", server.handle_metrics)
+    return app
+
+
+def main():
+    from app.core.utils import init_db
+    from app.database.chat_history import create_tables
+
+    init_db()
+    create_tables()
+    host = os.environ.get("JENNY_HOST", "0.0.0.0")
+    port = int(os.environ.get("JENNY_PORT", "8000"))
+    web.run_app(create_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# app/core/session.py
+import collections
+import threading
+import time
+
+from app.core.context_window import ContextWindow
+
+MAX_SESSIONS = 1000
+SESSION_IDLE_TIMEOUT = 30 * 60  # seconds
+
+
+class SessionState:
+    """
+    Everything the agent remembers about one conversation.
+    It is passed explicitly through process_query -> execute_plan -> handlers, so a
+    single AIAgent (and its models) can serve many conversations at the same time.
+    """
+    def __init__(self, session_id, host=None, current_user=None):
+        self.session_id = session_id
+        self.host = host  # the front end: ChatApplication or a HeadlessHost
+        self.current_user = current_user
+        self.message_history = []
+        self.trip_plan_details = {}
+        self.conversation_context = None
+        self.user_preferences = {}
+        self.context = ContextWindow()
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def replace_history(self, history):
+        """Starts over with `history`; the rolling summary of the old one no longer applies."""
+        self.message_history = history
+        self.context.reset()
+
+    def prompt_history(self):
+        """The history to send with a prompt: a running summary plus the recent turns."""
+        return self.context.view(self.message_history)
+
+    @property
+    def user_gmail(self):
+        return self.current_user['gmail'] if self.current_user else None
+
+
+class SessionStore:
+    """
+    Bounded, thread-safe map of session ID -> SessionState with idle eviction.
+    Pinned sessions (the desktop one) are kept outside the bound and never evicted.
+    """
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = collections.OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._pinned.get(session_id)
+            if session is not None:
+                session.touch()
+                return session
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.touch()
+            return session
+
+    def get_or_create(self, session_id, host=None):
+        with self._lock:
+            session = self._pinned.get(session_id) or self._sessions.get(session_id)
+            if session is None:
+                session = SessionState(session_id, host=host)
+                self._add(session)
+            elif session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def add(self, session, pinned=False):
+        with self._lock:
+            if pinned:
+                self._sessions.pop(session.session_id, None)
+                self._pinned[session.session_id] = session
+            else:
+                self._add(session)
+        return session
+
+    def _add(self, session):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._evict()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        # Oldest sessions sit at the front, so stop at the first one still in use.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) > self.max_sessions or oldest.last_active < cutoff:
+                self._sessions.popitem(last=False)
+            else:
+                break
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict()
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._pinned.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions) + len(self._pinned)
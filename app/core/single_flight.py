@@ -0,0 +1,106 @@
+# app/core/single_flight.py
+"""
+Coalesces identical in-flight streams.
+
+The first caller for a key opens the upstream stream; callers that arrive while it
+is still running attach to it instead of opening their own, receive the chunks
+produced so far and then every new one as it arrives. The upstream stream is
+cancelled only when every subscriber has gone, and the key is released as soon as
+the stream ends, so a later identical request starts fresh.
+"""
+import asyncio
+import hashlib
+
+
+class StreamCancelled(RuntimeError):
+    """Raised to anyone still reading a shared stream that was cancelled before it ended."""
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class _SharedStream:
+    """One upstream stream fanned out to every subscriber."""
+    def __init__(self, group, key, open_stream):
+        self.group = group
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._pump(open_stream))
+
+    def _notify(self):
+        # Waiters hold the old event; replacing it lets them re-check without a lock.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _pump(self, open_stream):
+        try:
+            async for chunk in open_stream():
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            # A cancelled stream ended early; nobody may take what it produced as complete.
+            if self.error is None:
+                self.error = StreamCancelled("The shared stream was cancelled")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self.group._release(self)
+            self._notify()
+
+    def subscribe(self):
+        self.subscribers += 1
+        return self._follow()
+
+    async def _follow(self):
+        sent = 0
+        try:
+            while True:
+                changed = self._changed
+                while sent < len(self.chunks):
+                    sent += 1
+                    yield self.chunks[sent - 1]
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # Released first: the upstream cleanup takes a few loop turns, and an
+                # identical request in that window must start a fresh stream.
+                self.group._release(self)
+                self.error = StreamCancelled("The shared stream was cancelled")
+                self.task.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}  # (event loop, key) -> _SharedStream
+        self.coalesced = 0
+
+    def stream(self, key, open_stream):
+        """Async iterator over the stream for `key`, shared with identical in-flight calls."""
+        loop = asyncio.get_running_loop()
+        shared = self._in_flight.get((loop, key))
+        if shared is None:
+            shared = _SharedStream(self, key, open_stream)
+            self._in_flight[(loop, key)] = shared
+        else:
+            self.coalesced += 1
+        return shared.subscribe()
+
+    def _release(self, shared):
+        loop = shared.task.get_loop()
+        if self._in_flight.get((loop, shared.key)) is shared:
+            del self._in_flight[(loop, shared.key)]
+
+    def __len__(self):
+        return len(self._in_flight)
@@ -0,0 +1,42 @@
+# app/core/speculation.py
+"""
+Buffer for work started before we know whether it is wanted.
+
+In speculative mode the planner and a tentative direct answer run at the same time.
+The answer streams into a SpeculativeBuffer; if the planner decides no tool is needed
+the buffer is committed (buffered chunks are flushed and later ones pass straight
+through), otherwise the answer task is cancelled and the buffer discarded.
+"""
+import os
+
+SPECULATIVE_EXECUTION = os.environ.get("JENNY_SPECULATIVE", "0") == "1"
+
+
+class SpeculativeBuffer:
+    def __init__(self):
+        self._chunks = []
+        self._target = None
+        self.discarded = False
+
+    @property
+    def committed(self):
+        return self._target is not None
+
+    def put(self, item, block=True, timeout=None):
+        if self.discarded:
+            return
+        if self._target is not None:
+            self._target.put(item)
+        else:
+            self._chunks.append(item)
+
+    def commit(self, target):
+        """Flushes everything buffered so far to `target` and forwards later chunks directly."""
+        for chunk in self._chunks:
+            target.put(chunk)
+        self._chunks = []
+        self._target = target
+
+    def discard(self):
+        self._chunks = []
+        self.discarded = True
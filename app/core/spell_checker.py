@@ -1,18 +1,94 @@
-from spellchecker import SpellChecker
+import functools
+import os
+import re
+from app.core.models import models
+from app.core.symspell import SymSpell
+from app.core.tracing import traced
 
-spell = SpellChecker()
+SPELL_INDEX_PATH = os.path.join("app", "database", "symspell_index.pkl")
+MAX_INDEX_WORDS = 30000  # only the most frequent words are offered as corrections
+CORRECTION_CACHE_SIZE = 4096
 
-def correct_spelling(text):
+# Tokens that must never be "corrected"
+URL_RE = re.compile(r"^(https?://|www\.)|\.(com|org|net|io|dev|ai|in)(/|$)", re.IGNORECASE)
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+CODE_RE = re.compile(r"[_/\\{}()\[\]<>=$#@`|]|[a-z][A-Z]|\w\.\w")
+EDGE_PUNCT_RE = re.compile(r"^(\W*)(.*?)(\W*)$", re.DOTALL)
+
+
+def _load_spell_index():
+    """Loads the pickled index, building (and caching) it from pyspellchecker's dictionary if needed."""
+    if os.path.exists(SPELL_INDEX_PATH):
+        try:
+            return SymSpell.load(SPELL_INDEX_PATH)
+        except Exception as e:
+            print(f"[Spell Index Error] {e}; rebuilding")
+
+    from spellchecker import SpellChecker
+    frequencies = SpellChecker().word_frequency.dictionary
+    index = SymSpell().build(frequencies, max_index_words=MAX_INDEX_WORDS)
+    try:
+        index.save(SPELL_INDEX_PATH)
+    except OSError as e:
+        print(f"[Spell Index Error] {e}")
+    return index
+
+models.register("spell_index", _load_spell_index, priority=5)
+
+
+def _should_skip(token):
+    return (
+        not token.isalpha()  # numbers, contractions, mixed alphanumerics
+        or (token.isupper() and len(token) > 1)  # acronyms
+    )
+
+
+@functools.lru_cache(maxsize=CORRECTION_CACHE_SIZE)
+def _correct_word(word):
+    return models.get("spell_index").lookup(word)
+
+
+def _match_case(original, corrected):
+    if original.isupper():
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected.capitalize()
+    return corrected
+
+
+@traced("input.correct_spelling")
+def correct_spelling(text, index=None):
     """
     Corrects the spelling of a given text.
+    URLs, emails, numbers, code-like tokens and known words are left untouched;
+    each distinct unknown word is looked up once.
     """
+    lookup = index.lookup if index is not None else _correct_word
+    known = (index or models.get("spell_index")).is_known
+
     words = text.split()
+    corrections = {}
+    for word in words:
+        if URL_RE.search(word) or EMAIL_RE.match(word) or CODE_RE.search(word):
+            continue
+        prefix, core, suffix = EDGE_PUNCT_RE.match(word).groups()
+        if not core or _should_skip(core):
+            continue
+        lower = core.lower()
+        if lower in corrections or known(lower):
+            continue
+        corrections[lower] = lookup(lower)
+
+    if not any(corrections.values()):
+        return " ".join(words)
+
     corrected_words = []
     for word in words:
-        # Get the one `most likely` answer
-        corrected_word = spell.correction(word)
-        if corrected_word is not None:
-            corrected_words.append(corrected_word)
+        match = EDGE_PUNCT_RE.match(word)
+        prefix, core, suffix = match.groups()
+        corrected = corrections.get(core.lower()) if core else None
+        if corrected and not CODE_RE.search(word):
+            corrected_words.append(prefix + _match_case(core, corrected) + suffix)
         else:
-            corrected_words.append(word) # if no correction found, keep the original word
-    return " ".join(corrected_words)
\ No newline at end of file
+            corrected_words.append(word)
+    return " ".join(corrected_words)
@@ -0,0 +1,147 @@
+# app/core/stream_renderer.py
+import collections
+import queue
+import threading
+import time
+
+FRAME_BUDGET = 0.012  # seconds spent draining the queue per UI frame
+FRAME_INTERVAL_MS = 16  # delay before the next frame when work is left over
+WAKE_EVENT = "<<ResponseChunk>>"
+
+
+class ResponseChannel(queue.Queue):
+    """
+    A response queue that notifies a listener every time a chunk is put.
+    Producers keep using the plain `put()` API; `None` still marks the end of a response.
+    """
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._listener = None
+        self.request_id = None
+        self.started = False  # set by the engine once the request begins running
+        self.closed = False
+
+    def set_listener(self, listener):
+        self._listener = listener
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if item is None:
+            self.closed = True
+        listener = self._listener
+        if listener is not None:
+            listener()
+
+
+def chunk_to_text(chunk):
+    """Normalizes the different chunk shapes producers put on the queue into text."""
+    if isinstance(chunk, str):
+        return chunk
+    if isinstance(chunk, dict):
+        return str(chunk.get("text", ""))
+    return str(chunk)
+
+
+class StreamRenderer:
+    """
+    Paints streamed responses into the chat window.
+
+    Instead of taking one chunk per timer tick, the renderer is woken by the producer,
+    drains everything queued within a per-frame time budget and hands the merged text
+    to the UI in a single insert. The finished answer is assembled in a buffer, so the
+    caller never has to read it back from the text widget.
+
+    Several response channels can be attached at once (one per in-flight request); they
+    are painted one after another in the order they were attached, while later ones keep
+    buffering in their own queues.
+
+    The UI is driven through three callbacks that always run on the Tk thread:
+    on_start() before the first chunk, on_text(text) for each merged frame and
+    on_complete(full_text, channel) once the end-of-response marker arrives.
+    """
+    def __init__(self, widget, on_start, on_text, on_complete,
+                 frame_budget=FRAME_BUDGET, frame_interval_ms=FRAME_INTERVAL_MS):
+        self.widget = widget
+        self.on_start = on_start
+        self.on_text = on_text
+        self.on_complete = on_complete
+        self.frame_budget = frame_budget
+        self.frame_interval_ms = frame_interval_ms
+
+        self._channels = collections.deque()
+        self._buffer = []
+        self._started = False
+        self._wake_pending = threading.Event()
+        self._frame_scheduled = False
+
+        self.widget.bind(WAKE_EVENT, lambda e: self._on_wake(), add="+")
+
+    def attach(self, channel):
+        """Queues a response channel for painting. Call from the Tk thread."""
+        self._channels.append(channel)
+        channel.set_listener(self.wake)
+        if not channel.empty():
+            self.wake()
+
+    def wake(self):
+        """Called from any thread when a chunk is queued; coalesces repeated wake-ups."""
+        if self._wake_pending.is_set():
+            return
+        self._wake_pending.set()
+        try:
+            # event_generate with when="tail" is the thread-safe way to poke the Tk loop.
+            self.widget.event_generate(WAKE_EVENT, when="tail")
+        except Exception:
+            try:
+                self.widget.after(0, self._on_wake)
+            except Exception as e:
+                print(f"[Renderer Error] {e}")
+
+    def _on_wake(self):
+        if not self._frame_scheduled:
+            self._render_frame()
+
+    def _render_frame(self):
+        self._frame_scheduled = False
+        self._wake_pending.clear()
+        if not self._channels:
+            return
+
+        channel = self._channels[0]
+        deadline = time.perf_counter() + self.frame_budget
+        pieces = []
+        finished = False
+        while time.perf_counter() < deadline:
+            try:
+                chunk = channel.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                finished = True
+                break
+            text = chunk_to_text(chunk)
+            if text:
+                pieces.append(text)
+
+        if pieces:
+            text = "".join(pieces)
+            if not self._started:
+                self._started = True
+                self.on_start()
+            self._buffer.append(text)
+            self.on_text(text)
+
+        if finished:
+            self._channels.popleft()
+            channel.set_listener(None)
+            if not self._started:
+                self.on_start()
+            full_text = "".join(self._buffer).strip()
+            self._buffer = []
+            self._started = False
+            self.on_complete(full_text, channel)
+
+        # Budget ran out (or a response ended) with more work queued: continue next frame.
+        if self._channels and not self._channels[0].empty():
+            self._frame_scheduled = True
+            self.widget.after(self.frame_interval_ms, self._render_frame)
@@ -0,0 +1,135 @@
+# app/core/symspell.py
+"""
+Symmetric-delete spelling index (the SymSpell algorithm).
+
+Instead of generating every edit of the input at query time, all deletes of every
+dictionary word (up to `max_edit_distance`, over the first `prefix_length` letters)
+are computed once when the index is built. A lookup only generates deletes of the
+input word and lands on candidate words with a few dict probes, so its cost does not
+depend on the size of the dictionary.
+"""
+import pickle
+
+INDEX_VERSION = 1
+
+
+class SymSpell:
+    def __init__(self, max_edit_distance=2, prefix_length=7):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = {}  # every known word -> frequency
+        self._deletes = {}  # delete -> word or tuple of words that produce it
+
+    def build(self, word_frequency, max_index_words=None):
+        """
+        Indexes a {word: frequency} mapping. All words count as known, but only the
+        `max_index_words` most frequent ones are offered as corrections.
+        """
+        self.words = dict(word_frequency)
+        candidates = sorted(self.words, key=self.words.get, reverse=True)
+        if max_index_words:
+            candidates = candidates[:max_index_words]
+        deletes = {}
+        for word in candidates:
+            for key in self._edits(word[:self.prefix_length]):
+                existing = deletes.get(key)
+                if existing is None:
+                    deletes[key] = word
+                elif isinstance(existing, tuple):
+                    deletes[key] = existing + (word,)
+                else:
+                    deletes[key] = (existing, word)
+        self._deletes = deletes
+        return self
+
+    def _edits(self, word):
+        """The word itself plus every string reachable by up to max_edit_distance deletes."""
+        edits = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance):
+            next_frontier = set()
+            for item in frontier:
+                if len(item) <= 1:
+                    continue
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            next_frontier -= edits
+            edits |= next_frontier
+            frontier = next_frontier
+        return edits
+
+    def is_known(self, word):
+        return word in self.words
+
+    def lookup(self, word):
+        """Returns the closest, most frequent dictionary word, or None if nothing is within range."""
+        if word in self.words:
+            return word
+
+        best = None
+        best_distance = self.max_edit_distance + 1
+        best_frequency = 0
+        seen = set()
+        for key in self._edits(word[:self.prefix_length]):
+            entry = self._deletes.get(key)
+            if entry is None:
+                continue
+            for candidate in (entry if isinstance(entry, tuple) else (entry,)):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if abs(len(candidate) - len(word)) > self.max_edit_distance:
+                    continue
+                distance = damerau_levenshtein(word, candidate, best_distance)
+                if distance > self.max_edit_distance:
+                    continue
+                frequency = self.words.get(candidate, 0)
+                if distance < best_distance or (distance == best_distance and frequency > best_frequency):
+                    best, best_distance, best_frequency = candidate, distance, frequency
+        return best
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "version": INDEX_VERSION,
+                "max_edit_distance": self.max_edit_distance,
+                "prefix_length": self.prefix_length,
+                "words": self.words,
+                "deletes": self._deletes,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported spelling index version: {data.get('version')}")
+        index = cls(data["max_edit_distance"], data["prefix_length"])
+        index.words = data["words"]
+        index._deletes = data["deletes"]
+        return index
+
+
+def damerau_levenshtein(a, b, limit):
+    """Optimal string alignment distance; returns limit + 1 as soon as it is exceeded."""
+    if a == b:
+        return 0
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len_b + 1))
+    for i in range(1, len_a + 1):
+        current = [i] + [0] * len_b
+        row_min = current[0]
+        for j in range(1, len_b + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[len_b]
@@ -0,0 +1,76 @@
+# app/core/tool_retriever.py
+"""
+Picks the tools worth showing the LLM planner for a query.
+
+Tool descriptions are embedded once with the shared MiniLM model (and again only when
+intent_routes changes). Each query is embedded and only the top-k most similar tools
+go into the planner prompt, rendered as a compact one-line-per-tool schema that is
+cached per tool selection.
+"""
+import threading
+
+from app.core.models import models
+
+TOOL_TOP_K = 8
+MAX_CACHED_SCHEMAS = 256
+# Tools the planner prompt refers to by name, so they are always offered.
+ALWAYS_INCLUDE = ("file_query",)
+
+
+class ToolRetriever:
+    def __init__(self, top_k=TOOL_TOP_K, always_include=ALWAYS_INCLUDE, registry=models):
+        self.top_k = top_k
+        self.always_include = always_include
+        self.registry = registry
+        self._fingerprint = None
+        self._vectors = {}  # tool name -> normalized embedding
+        self._schemas = {}  # (fingerprint, tool names) -> compact schema string
+        self._lock = threading.Lock()
+
+    def _encode(self, texts):
+        model = self.registry.get("embedding")
+        return [[float(x) for x in vector] for vector in model.encode(texts, normalize_embeddings=True)]
+
+    def _index(self, tools, fingerprint):
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            texts = [f"{tool['name'].replace('_', ' ')}: {tool['description']}" for tool in tools]
+            vectors = self._encode(texts)
+            self._vectors = {tool["name"]: vector for tool, vector in zip(tools, vectors)}
+            self._fingerprint = fingerprint
+
+    def select(self, query, tools, fingerprint):
+        """Returns the top-k tools for the query (in catalogue order), or all tools if embedding fails."""
+        if len(tools) <= self.top_k:
+            return tools
+        try:
+            self._index(tools, fingerprint)
+            query_vector = self._encode([query])[0]
+        except Exception as e:
+            print(f"[Tool Retrieval Error] {e}")
+            return tools
+
+        scores = {
+            name: sum(a * b for a, b in zip(vector, query_vector))
+            for name, vector in self._vectors.items()
+        }
+        selected = set(sorted(scores, key=scores.get, reverse=True)[:self.top_k])
+        selected.update(name for name in self.always_include if name in scores)
+        return [tool for tool in tools if tool["name"] in selected]
+
+    def schema(self, tools, fingerprint):
+        """Compact tool listing, e.g. `- weather(city: The city to get the weather for.): Gets the weather.`"""
+        key = (fingerprint, tuple(tool["name"] for tool in tools))
+        schema = self._schemas.get(key)
+        if schema is None:
+            if len(self._schemas) >= MAX_CACHED_SCHEMAS:
+                self._schemas.clear()
+            schema = "\n".join(_format_tool(tool) for tool in tools)
+            self._schemas[key] = schema
+        return schema
+
+
+def _format_tool(tool):
+    args = "; ".join(f"{name}: {description}" for name, description in tool["args"].items())
+    return f"- {tool['name']}({args}): {tool['description']}"
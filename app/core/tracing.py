@@ -0,0 +1,169 @@
+# app/core/tracing.py
+"""
+Lightweight latency tracing for the query pipeline.
+
+    with span("planner.create_plan"):
+        ...
+
+Each finished span is appended as one JSON line to a rotating log file and folded
+into an in-process window of recent durations, from which `summary()` reports
+p50 / p95 / p99 per span name.
+"""
+import collections
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from logging.handlers import RotatingFileHandler
+
+TRACE_FILE = os.environ.get("JENNY_TRACE_FILE", os.path.join("logs", "traces.jsonl"))
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+TRACING_ENABLED = os.environ.get("JENNY_TRACING", "1") != "0"
+STATS_WINDOW = 1000  # most recent durations kept per span name
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_logger = None
+_logger_lock = threading.Lock()
+
+
+class LatencyStats:
+    """Rolling window of span durations with percentile summaries."""
+    def __init__(self, window=STATS_WINDOW):
+        self.window = window
+        self._durations = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def add(self, name, duration_ms):
+        with self._lock:
+            self._durations[name].append(duration_ms)
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._durations.items() if values}
+        return {
+            name: {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+            }
+            for name, values in snapshot.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return round(sorted_values[index], 3)
+
+
+stats = LatencyStats()
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger("jenny.trace")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                try:
+                    os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                    handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding="utf-8")
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+                except OSError as e:
+                    print(f"[Tracing Error] {e}")
+                _logger = logger
+    return _logger
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def record(name, duration_ms, **attrs):
+    """Records a finished span (or any measured duration, e.g. time-to-first-token)."""
+    stats.add(name, duration_ms)
+    if not TRACING_ENABLED:
+        return
+    entry = {
+        "ts": time.time(),
+        "trace_id": _trace_id.get(),
+        "span": name,
+        "duration_ms": round(duration_ms, 3),
+    }
+    if attrs:
+        entry["attrs"] = attrs
+    try:
+        _get_logger().info(json.dumps(entry, default=str))
+    except Exception as e:
+        print(f"[Tracing Error] {e}")
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record(name, (time.perf_counter() - start) * 1000, **attrs)
+
+
+@contextlib.contextmanager
+def trace(name="request", trace_id=None, **attrs):
+    """Starts a new trace (unless one is already active) and times it as a span."""
+    token = None
+    if _trace_id.get() is None or trace_id is not None:
+        token = _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        with span(name, **attrs) as span_attrs:
+            yield span_attrs
+    finally:
+        if token is not None:
+            _trace_id.reset(token)
+
+
+def traced(name):
+    """Decorator form of `span` for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summary():
+    return stats.summary()
+
+
+def format_summary():
+    lines = [f"{'span':<32} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    for name, s in sorted(summary().items()):
+        lines.append(f"{name:<32} {s['count']:>6} {s['p50']:>10.1f} {s['p95']:>10.1f} {s['p99']:>10.1f}")
+    return "\n".join(lines)
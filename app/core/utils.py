@@ -1,7 +1,6 @@
 import asyncio
 import edge_tts
 import sqlite3
-import tkinter.messagebox as mbox
 import os
 from playsound import playsound
 
@@ -143,6 +142,19 @@ def init_db():
             """
         )
 
+        # Planner decisions, used to train the local intent classifier
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS planner_decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                label TEXT NOT NULL,
+                plan TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+
         conn.commit()
     except sqlite3.Error as err:
         show_error("DB Init Error", str(err))
@@ -153,6 +165,7 @@ def init_db():
 def show_error(title, message):
     """Show error popup."""
     try:
+        import tkinter.messagebox as mbox  # imported lazily so headless mode runs without Tk
         mbox.showerror(title, message)
     except Exception:
         print(f"[ERROR] {title}: {message}")
@@ -161,6 +174,7 @@ def show_error(title, message):
 def show_info(title, message):
     """Show info popup."""
     try:
+        import tkinter.messagebox as mbox
         mbox.showinfo(title, message)
     except Exception:
         print(f"[INFO] {title}: {message}")
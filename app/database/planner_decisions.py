@@ -0,0 +1,34 @@
+import sqlite3
+import json
+from app.core.utils import db_connect
+
+def log_planner_decision(query, label, plan):
+    """Store a (query -> plan) decision made by the LLM planner."""
+    try:
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO planner_decisions (query, label, plan) VALUES (?, ?, ?)",
+            (query, label, json.dumps(plan)),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[DB Save Error] {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_planner_decisions():
+    """Retrieve all logged (query, label) pairs, oldest first."""
+    try:
+        conn = db_connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT query, label FROM planner_decisions ORDER BY id")
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"[DB Error] {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
@@ -1,15 +1,44 @@
 from app.features.g4f_adapter import generate_text
-from app.core.safety import is_content_safe
+from app.core.safety import check_prompt, SAFETY_FULL
+from app.core import tracing
+from app.core.context_window import CONTEXT_TOKEN_BUDGET, estimate_tokens, fit_messages
+from app.core.semantic_cache import SEMANTIC_CACHE_ENABLED, semantic_cache, is_cacheable, replay
+from app.core.single_flight import SingleFlight, prompt_key
 import asyncio
+import time
 
-async def get_ai_response(query, message_history=None, brain_context=None, stream=False, rag_context=None):
-    # Safety check
-    is_safe, message = is_content_safe(query)
+# Identical prompts in flight at the same time share one provider stream.
+_single_flight = SingleFlight()
+
+def _generate(prompt):
+    return _single_flight.stream(prompt_key(prompt), lambda: generate_text(prompt))
+
+async def get_ai_response(query, message_history=None, brain_context=None, stream=False, rag_context=None, safety=SAFETY_FULL, cache=False):
+    # Safety check (skipped or reduced to the pattern policy when the caller says so)
+    is_safe, message = check_prompt(query, safety)
     if not is_safe:
         async def error_generator():
             yield {"text": message}
         return error_generator() if stream else {"text": message}
 
+    # Semantic cache (opt-in per call and per install; never for answers grounded in documents)
+    cache_vector = None
+    if cache and SEMANTIC_CACHE_ENABLED and not rag_context and is_cacheable(query):
+        try:
+            cache_vector = await asyncio.to_thread(semantic_cache.embed, query)
+            hit = semantic_cache.lookup(cache_vector) if cache_vector is not None else None
+        except Exception as e:
+            print(f"[Semantic Cache Error] {e}")
+            cache_vector, hit = None, None
+        if hit is not None:
+            answer, similarity = hit
+            tracing.record("llm.semantic_cache_hit", 0, similarity=round(similarity, 3))
+            return replay(answer) if stream else {"text": answer}
+
+    def remember(answer):
+        if cache_vector is not None and answer.strip():
+            semantic_cache.add(query, cache_vector, answer)
+
     # Default message history
     if message_history is None:
         message_history = []
@@ -17,34 +46,48 @@ async def get_ai_response(query, message_history=None, brain_context=None, strea
     # Context string from RAG
     context_string = f"Context:\n{rag_context}\n\n---\n\n" if rag_context else ""
 
-    # System message
+    # System message (a leading system message in the history is replaced by the current one;
+    # a running conversation summary is kept)
     system_message = {"role": "system", "content": brain_context or "You are a helpful assistant."}
-    if not message_history or message_history[0]['role'] != 'system':
-        messages = [system_message] + message_history + [{"role": "user", "content": query}]
-    else:
-        if message_history[0]['content'] != system_message['content']:
-            message_history[0] = system_message
-        messages = message_history + [{"role": "user", "content": query}]
-    
+    history = list(message_history)
+    if history and history[0]['role'] == 'system' and not history[0].get('summary'):
+        history = history[1:]
+    messages = [system_message] + history + [{"role": "user", "content": query}]
+    messages = fit_messages(messages, CONTEXT_TOKEN_BUDGET - estimate_tokens(context_string))
+
     prompt = context_string + "\n".join([f"{m['role']}: {m['content']}" for m in messages])
 
     # Streamed response generator
     async def _stream_response():
+        start = time.perf_counter()
+        first_token = False
+        parts = []
         try:
-            async for chunk in generate_text(prompt):
+            async for chunk in _generate(prompt):
                 if hasattr(chunk, "choices") and chunk.choices:
-                    yield chunk.choices[0].delta.content or ""
+                    if not first_token:
+                        first_token = True
+                        tracing.record("llm.time_to_first_token", (time.perf_counter() - start) * 1000)
+                    text = chunk.choices[0].delta.content or ""
+                    parts.append(text)
+                    yield text
+            # Only complete answers are cached; an interrupted or failed stream is not.
+            remember("".join(parts))
         except Exception as e:
             print(f"[AI Response Error] {e}")
             yield "Sorry, I encountered an error while generating the response."
+        finally:
+            tracing.record("llm.stream_total", (time.perf_counter() - start) * 1000, prompt_chars=len(prompt))
 
     # Return either streamed or full response
     if stream:
         return _stream_response()
     else:
         try:
-            response_chunks = [chunk.choices[0].delta.content or "" async for chunk in generate_text(prompt) if hasattr(chunk, "choices")]
+            with tracing.span("llm.generate", prompt_chars=len(prompt)):
+                response_chunks = [chunk.choices[0].delta.content or "" async for chunk in _generate(prompt) if hasattr(chunk, "choices")]
             full_response = "".join(response_chunks)
+            remember(full_response)
             return {"text": full_response.strip() or "I am sorry, I cannot answer this question."}
         except Exception as e:
             print(f"[AI Response Error] {e}")
@@ -0,0 +1,96 @@
+import functools
+import math
+import re
+
+CHUNK_TOKENS = 200  # stays under the 256-token input limit of all-MiniLM-L6-v2
+CHUNK_OVERLAP = 40  # tokens repeated at the start of a window cut mid-paragraph
+READ_BLOCK = 64 * 1024  # characters read from the file at a time
+MAX_WORD_CHARS = 100  # longer runs without whitespace (hashes, base64, ...) are split
+
+_WORD_RE = re.compile(r"\S+\s*")
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+
+
+def word_tokens(word):
+    """
+    Conservative WordPiece count of a word without a tokenizer. Like BERT's tokenizer it
+    splits off every punctuation mark and digit run, so punctuation-heavy text such as
+    log lines is not underestimated: letters count one token per four characters,
+    digits one per three, each punctuation mark one.
+    """
+    count = 0
+    for piece in _PIECE_RE.findall(word):
+        if piece[0].isdigit():
+            count += math.ceil(len(piece) / 3)
+        elif piece[0].isalpha():
+            count += math.ceil(len(piece) / 4)
+        else:
+            count += 1
+    return max(1, count)
+
+
+def tokenizer_counter(tokenizer, cache_size=65536):
+    """Exact token counter from a Hugging Face tokenizer; repeated words are counted once."""
+    @functools.lru_cache(maxsize=cache_size)
+    def count(word):
+        return max(1, len(tokenizer.tokenize(word)))
+    return count
+
+
+def _split_long(word):
+    while len(word) > MAX_WORD_CHARS:
+        yield word[:MAX_WORD_CHARS]
+        word = word[MAX_WORD_CHARS:]
+    yield word
+
+
+def _words(f, block_size):
+    """Yields the words of a text file (each with its trailing whitespace), one block at a time."""
+    carry = ""
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+        text = carry + block
+        carry = ""
+        for match in _WORD_RE.finditer(text):
+            pieces = list(_split_long(match.group()))
+            if match.end() == len(text):
+                carry = pieces.pop()  # may continue in the next block
+            yield from pieces
+    if carry:
+        yield carry
+
+
+def iter_chunks(f, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP, token_counter=word_tokens, block_size=READ_BLOCK):
+    """
+    Splits a text file object into windows of at most `max_tokens` tokens without reading
+    it all into memory. A window ends at a paragraph break once it is at least half full,
+    otherwise when the budget is reached; a window cut mid-paragraph is followed by one
+    that starts with its last `overlap` tokens, so text at the cut keeps its context.
+    """
+    window = []  # (word, tokens)
+    total = 0
+    for word in _words(f, block_size):
+        cost = token_counter(word)
+        if window and total + cost > max_tokens:
+            yield "".join(w for w, _ in window).strip()
+            # Carry the tail of the window over into the next one.
+            kept = []
+            kept_tokens = 0
+            for w, c in reversed(window):
+                if kept_tokens + c > overlap:
+                    break
+                kept.append((w, c))
+                kept_tokens += c
+            window = kept[::-1]
+            total = kept_tokens
+        window.append((word, cost))
+        total += cost
+        if "\n\n" in word and total >= max_tokens // 2:
+            yield "".join(w for w, _ in window).strip()
+            window = []
+            total = 0
+    text = "".join(w for w, _ in window).strip()
+    if text:
+        yield text
@@ -0,0 +1,150 @@
+"""
+Deterministic stand-in for the g4f client, for offline tests, benchmarks and profiling.
+
+Selected with JENNY_LLM_PROVIDER=fake (see g4f_adapter). It answers from scripted
+rules instead of the network and streams word by word with a configurable
+time-to-first-token, speed, jitter and failure rate. Given the same seed the same
+prompt always gets the same answer and timings, whatever order requests arrive in.
+
+A script is a JSON list of rules, tried in order:
+
+    [{"match": "weather in (\\w+)", "response": "Sunny in \\1."},
+     {"match": ".*", "response": "You asked: $query"}]
+
+`match` is a regular expression searched in the prompt; `response` may use the
+match's groups (\\1, \\g<name>) and $query (the last user message) or $prompt.
+"""
+import collections
+import hashlib
+import json
+import os
+import random
+import re
+import string
+import threading
+import time
+from types import SimpleNamespace
+
+DEFAULT_RULES = [
+    # The planner expects a JSON plan; an empty plan makes it answer directly.
+    {"match": r"You are an intelligent planner", "response": "[]"},
+    {"match": r"Update the running summary", "response": "The user and the assistant had a conversation."},
+    {"match": r".*", "response": "This is a scripted answer to: $query"},
+]
+
+MAX_TRACKED_PROMPTS = 4096  # prompts whose call count is remembered
+
+_TOKEN_RE = re.compile(r"\S+\s*")
+_USER_LINE_RE = re.compile(r"(?:^|\n)user: (.*)\Z", re.DOTALL)
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _chunk(text):
+    """A streaming chunk shaped like the g4f/OpenAI ones."""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeProviderError(ConnectionError):
+    pass
+
+
+class FakeLLM:
+    def __init__(self, rules=None, ttft=0.2, tokens_per_second=50.0, jitter=0.1, failure_rate=0.0, seed=0):
+        self.rules = [(re.compile(rule["match"], re.DOTALL | re.IGNORECASE), rule["response"]) for rule in (rules or DEFAULT_RULES)]
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        # prompt hash -> calls so far, so retries can succeed; least recently used first
+        self._attempts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        rules = None
+        path = os.environ.get("JENNY_FAKE_LLM_SCRIPT")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+        return cls(
+            rules=rules,
+            ttft=_env_float("JENNY_FAKE_LLM_TTFT", 0.2),
+            tokens_per_second=_env_float("JENNY_FAKE_LLM_TPS", 50),
+            jitter=_env_float("JENNY_FAKE_LLM_JITTER", 0.1),
+            failure_rate=_env_float("JENNY_FAKE_LLM_FAILURE_RATE", 0),
+            seed=int(os.environ.get("JENNY_FAKE_LLM_SEED", "0")),
+        )
+
+    def respond(self, prompt):
+        """The scripted answer for a prompt."""
+        found = _USER_LINE_RE.search(prompt)
+        values = {"query": found.group(1).strip() if found else prompt, "prompt": prompt}
+        for pattern, response in self.rules:
+            match = pattern.search(prompt)
+            if match:
+                return string.Template(match.expand(response)).safe_substitute(values)
+        return ""
+
+    def _rng(self, prompt):
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.pop(key, 0)
+            self._attempts[key] = attempt + 1
+            if len(self._attempts) > MAX_TRACKED_PROMPTS:
+                self._attempts.popitem(last=False)
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    def _delay(self, rng, seconds):
+        return max(0.0, seconds * (1 + rng.uniform(-self.jitter, self.jitter)))
+
+    def stream(self, prompt):
+        """Blocking iterator of chunks, like a g4f stream (it runs in a worker thread)."""
+        rng = self._rng(prompt)
+        if rng.random() < self.failure_rate:
+            time.sleep(self._delay(rng, self.ttft))
+            raise FakeProviderError("Scripted provider failure")
+        tokens = _TOKEN_RE.findall(self.respond(prompt))
+        delays = [self._delay(rng, self.ttft)] + [
+            self._delay(rng, 1 / self.tokens_per_second) if self.tokens_per_second > 0 else 0.0
+            for _ in tokens[1:]
+        ]
+        return self._iterate(tokens, delays)
+
+    @staticmethod
+    def _iterate(tokens, delays):
+        for token, delay in zip(tokens, delays):
+            time.sleep(delay)
+            yield _chunk(token)
+
+
+class _Completions:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        prompt = "\n".join(m["content"] for m in messages or [])
+        if stream:
+            return self.llm.stream(prompt)
+        text = "".join(chunk.choices[0].delta.content for chunk in self.llm.stream(prompt))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class _Images:
+    def __init__(self, llm):
+        self.llm = llm
+
+    async def generate(self, model=None, prompt="", **kwargs):
+        name = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        return SimpleNamespace(data=[SimpleNamespace(url=f"http://localhost/fake-images/{name}.png")])
+
+
+class FakeClient:
+    """Implements the parts of g4f.client.Client that g4f_adapter uses."""
+    def __init__(self, llm=None):
+        self.llm = llm or FakeLLM.from_env()
+        self.chat = SimpleNamespace(completions=_Completions(self.llm))
+        self.images = _Images(self.llm)
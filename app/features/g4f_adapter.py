@@ -1,46 +1,150 @@
 import asyncio
+import concurrent.futures
+import functools
 import logging
-from g4f.client import Client
+import os
+import threading
+import time
+
+from app.core.provider_pool import ProviderPool, hedged_stream
 
 logging.basicConfig(level=logging.INFO)
-client = Client()
+
+# JENNY_LLM_PROVIDER=fake swaps in the scripted offline client (app/features/fake_llm.py).
+if os.environ.get("JENNY_LLM_PROVIDER", "g4f") == "fake":
+    from app.features.fake_llm import FakeClient
+    client = FakeClient()
+else:
+    from g4f.client import Client
+    client = Client()
+
+# Models are tried best-first by recent latency and error rate (see app/core/provider_pool.py).
+TEXT_MODELS = os.environ.get("JENNY_TEXT_MODELS", "gpt-4o-mini,gpt-4o,llama-3.3-70b").split(",")
+IMAGE_MODELS = os.environ.get("JENNY_IMAGE_MODELS", "dall-e-3,flux").split(",")
+text_pool = ProviderPool(TEXT_MODELS)
+image_pool = ProviderPool(IMAGE_MODELS)
 
 # --- Text Generation ---
-async def generate_text(prompt: str, model: str = "gpt-4o-mini", timeout: int = 10, retries: int = 2):
-    for attempt in range(retries):
+STREAM_QUEUE_SIZE = 64  # chunks buffered between the provider thread and the consumer
+CHUNK_TIMEOUT = 30  # seconds allowed between two chunks once the stream has started
+
+_STREAM_END = object()
+
+
+async def _pump_stream(open_stream, first_chunk_timeout, chunk_timeout, queue_size=STREAM_QUEUE_SIZE):
+    """
+    Iterates a blocking provider stream in a worker thread and yields its chunks on the
+    event loop through a bounded queue. A full queue blocks the worker (backpressure);
+    when the consumer stops early the worker is told to stop and the response closed.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        """Blocks this worker thread (never the loop) while the consumer is behind."""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def worker():
+        response = None
         try:
-            logging.info(f"[TextGen] Model: {model}, Attempt {attempt + 1}/{retries}")
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                timeout=timeout,
-                stream=True
-            )
+            response = open_stream()
             for chunk in response:
-                yield chunk
-            return
-        except Exception as e:
-            logging.warning(f"[TextGen] Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                await asyncio.sleep(1)
-            else:
-                logging.error("[TextGen] All retries failed.")
-                yield "Error: Unable to generate text after multiple retries."
+                if stop.is_set() or not put(chunk):
+                    break
+            if not stop.is_set():
+                put(_STREAM_END)
+        except BaseException as e:
+            if not stop.is_set():
+                try:
+                    put(e)
+                except RuntimeError:
+                    pass  # the event loop is gone
+        finally:
+            close = getattr(response, "close", None)
+            if stop.is_set() and callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    thread = threading.Thread(target=worker, name="g4f-stream", daemon=True)
+    thread.start()
+    timeout = first_chunk_timeout
+    try:
+        while True:
+            item = await asyncio.wait_for(queue.get(), timeout)
+            if item is _STREAM_END:
                 return
+            if isinstance(item, BaseException):
+                raise item
+            timeout = chunk_timeout
+            yield item
+    finally:
+        stop.set()
+
+
+async def generate_text(prompt: str, model: str = None, timeout: int = 10, retries: int = 3, chunk_timeout: int = CHUNK_TIMEOUT):
+    """
+    Streams completion chunks from the best model in the pool without blocking the event
+    loop (`model` pins one model). `timeout` bounds each attempt's wait for its first
+    chunk, `chunk_timeout` every later gap. At most `retries` streams are opened, hedges
+    included, and only before the first chunk, so output is never duplicated.
+    """
+    def open_stream(name):
+        logging.info(f"[TextGen] Model: {name}")
+        create = functools.partial(
+            client.chat.completions.create,
+            model=name,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout,
+            stream=True
+        )
+        return _pump_stream(create, timeout, chunk_timeout)
+
+    started = False
+    stream = hedged_stream(text_pool, open_stream, retries, timeout, [model] if model else None)
+    try:
+        async for chunk in stream:
+            started = True
+            yield chunk
+    except Exception as e:
+        if started:
+            logging.error(f"[TextGen] Stream failed after it started: {e}")
+            raise
+        logging.error(f"[TextGen] All retries failed: {e}")
+        yield f"Error: Unable to generate text after {retries} retries."
+    finally:
+        # Stops the provider streams right away when our consumer stops early.
+        await stream.aclose()
 
 # --- Image Generation ---
-async def generate_image(prompt: str, model: str = "dall-e-3", timeout: int = 10, retries: int = 2):
+async def generate_image(prompt: str, model: str = None, timeout: int = 10, retries: int = 2):
+    """Tries the models in pool order, moving to the next one as soon as one fails."""
+    names = image_pool.ranked([model] if model else None)
     for attempt in range(retries):
+        name = names[attempt % len(names)]
+        start = time.monotonic()
         try:
-            logging.info(f"[ImageGen] Model: {model}, Attempt {attempt + 1}/{retries}")
-            response = await client.images.generate(model=model, prompt=prompt, timeout=timeout)
+            logging.info(f"[ImageGen] Model: {name}, Attempt {attempt + 1}/{retries}")
+            response = await client.images.generate(model=name, prompt=prompt, timeout=timeout)
             if hasattr(response, "data") and response.data:
+                image_pool.record_success(name, time.monotonic() - start)
                 return response.data[0].url
             raise ValueError("No image data returned")
         except Exception as e:
+            image_pool.record_failure(name)
             logging.warning(f"[ImageGen] Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                await asyncio.sleep(1)
-            else:
+            if attempt == retries - 1:
                 logging.error("[ImageGen] All retries failed.")
                 return f"Error: Unable to generate image after {retries} retries."
+            if len(names) == 1:
+                await asyncio.sleep(1)  # same model again: give it a moment
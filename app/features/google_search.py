@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from googlesearch import search
 import requests
 from bs4 import BeautifulSoup
+
+SNIPPET_WORKERS = 5
 # import your AI/ChatGPT model (example using g4f)
 
 # client = Client()
@@ -24,6 +27,26 @@ def handle_query(query):
         # Fallback: simple dummy answer (replace with AI model in your project)
         return {"results": [{"title": "AI Assistant", "link": "#", "snippet": f"I think you asked: '{query}'. Here is my reasoning-based response."}]}
 
+def search_urls(query, num_results=5):
+    """Top result URLs for a query (raises if the search itself fails)."""
+    return list(search(query, num_results=num_results))
+
+def fetch_snippet(url):
+    """First line of a page's text, or a placeholder if the page cannot be fetched."""
+    try:
+        page = requests.get(url, timeout=5, headers={"User-Agent": "Mozilla/5.0"})
+        soup = BeautifulSoup(page.text, "html.parser")
+        return soup.get_text().strip().split("\n")[0][:200]
+    except Exception:
+        return "No snippet available."
+
+def search_result(url, snippet):
+    return {
+        "title": url.split("//")[-1].split("/")[0],  # Domain as title
+        "link": url,
+        "snippet": snippet
+    }
+
 def handle_google_search(query):
     # Clean query
     search_query = (
@@ -39,22 +62,12 @@ def handle_google_search(query):
 
     results = []
     try:
-        # Fetch top 5 search results
-        for url in search(search_query, num_results=5):
-            snippet = ""
-            try:
-                # Fetch page content for snippet
-                page = requests.get(url, timeout=5, headers={"User-Agent": "Mozilla/5.0"})
-                soup = BeautifulSoup(page.text, "html.parser")
-                snippet = soup.get_text().strip().split("\n")[0][:200]
-            except:
-                snippet = "No snippet available."
-
-            results.append({
-                "title": url.split("//")[-1].split("/")[0],  # Domain as title
-                "link": url,
-                "snippet": snippet
-            })
+        # Fetch top 5 search results; their pages are fetched in parallel, so the
+        # slowest page bounds the search rather than the sum of all of them.
+        urls = search_urls(search_query)
+        with ThreadPoolExecutor(max_workers=SNIPPET_WORKERS) as pool:
+            snippets = list(pool.map(fetch_snippet, urls))
+        results = [search_result(url, snippet) for url, snippet in zip(urls, snippets)]
 
     except Exception as e:
         results.append({"title": "Error", "link": "#", "snippet": str(e)})
@@ -2,7 +2,7 @@ import datetime
 from app.core.utils import say
 
 
-def greetMe():
+def greetMe(speak=True):
     """Greets the user based on the current time."""
     hour = datetime.datetime.now().hour
     if 0 <= hour < 12:
@@ -14,5 +14,6 @@ def greetMe():
     else:
         greeting = "Good Night, sir"
 
-    say(f"{greeting}. Please tell me, how can I help you?")
+    if speak:
+        say(f"{greeting}. Please tell me, how can I help you?")
     return f"{greeting}. Please tell me, how can I help you?"
@@ -5,6 +5,14 @@ import uuid
 import requests
 
 def generate_image(prompt: str) -> dict:
+    """
+    Synchronous wrapper around generate_image_async for callers without an event loop.
+    Code already running on the agent engine loop must await generate_image_async instead.
+    """
+    return asyncio.run(generate_image_async(prompt))
+
+
+async def generate_image_async(prompt: str) -> dict:
     """
     Generate an image from a text prompt using g4f and save it locally.
 
@@ -18,7 +26,7 @@ def generate_image(prompt: str) -> dict:
         }
     """
     try:
-        image_url = asyncio.run(g4f_generate_image(prompt))
+        image_url = await g4f_generate_image(prompt)
 
         if isinstance(image_url, str) and image_url.startswith("Error:"):
             return {"image_path": None, "error": image_url}
@@ -27,25 +35,32 @@ def generate_image(prompt: str) -> dict:
         if isinstance(image_url, list):
             image_url = image_url[0]
 
-        # Download and save the image
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        image_name = f"{uuid.uuid4()}.png"
-        # Correctly join the path components
-        image_path = os.path.join("app", "static", "images", image_name)
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-
-        with open(image_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
+        # Download off the event loop so other requests keep streaming
+        image_path = await asyncio.to_thread(_download_image, image_url)
         return {"image_path": image_path, "error": None}
 
     except Exception as e:
         return {"image_path": None, "error": str(e)}
 
 
+def _download_image(image_url: str) -> str:
+    """Downloads an image URL into app/static/images and returns the local path."""
+    response = requests.get(image_url, stream=True)
+    response.raise_for_status()  # Raise an exception for bad status codes
+
+    image_name = f"{uuid.uuid4()}.png"
+    # Correctly join the path components
+    image_path = os.path.join("app", "static", "images", image_name)
+    
+    # Ensure the directory exists
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+
+    with open(image_path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            f.write(chunk)
+
+    return image_path
+
+
+
 
@@ -0,0 +1,78 @@
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class JSONItemStream:
+    """
+    Incremental parser for JSON streamed by an LLM.
+
+    Feed it text as it arrives; `feed()` returns every object of the first array of
+    objects in the document (e.g. each day of {"itinerary": [...]}) as soon as its
+    closing brace arrives. Text outside the JSON value, such as Markdown code fences or
+    a sentence before it, is ignored, and trailing commas are dropped before an item is
+    parsed.
+    """
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._items_depth = None  # stack depth of the item array
+        self._item_start = None
+        self.finished = False  # the top-level value is complete
+
+    def feed(self, chunk):
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self.finished:
+                break
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._stack:
+                # Outside the value only an opening bracket matters (fences, prose are skipped).
+                if ch in "{[":
+                    self._open(ch, i)
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._open(ch, i)
+            elif ch in "}]":
+                item = self._close(i)
+                if item is not None:
+                    items.append(item)
+        self._pos = len(text)
+        return items
+
+    def _open(self, ch, i):
+        self._stack.append(ch)
+        if ch == "{" and len(self._stack) > 1 and self._stack[-2] == "[":
+            depth = len(self._stack) - 1
+            if self._items_depth is None:
+                self._items_depth = depth  # the first array that holds objects
+            if depth == self._items_depth:
+                self._item_start = i
+
+    def _close(self, i):
+        self._stack.pop()
+        if not self._stack:
+            self.finished = True
+        if self._item_start is None or len(self._stack) != self._items_depth:
+            return None
+        raw, self._item_start = self.text[self._item_start:i + 1], None
+        try:
+            item = json.loads(_TRAILING_COMMA_RE.sub(r"\1", raw))
+        except json.JSONDecodeError as e:
+            print(f"[JSON Stream Error] {e}: {raw[:200]}")
+            return None
+        return item if isinstance(item, dict) else None
@@ -1,38 +1,71 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 import os
+import threading
+from app.core.models import models
+from app.core.tracing import traced
+from app.features.chunker import iter_chunks, tokenizer_counter, word_tokens
+
+EMBED_BATCH_SIZE = 64  # chunks embedded and written to the vector store at a time
+# Chunks farther from the query than this are unrelated and left out. The store measures
+# squared L2 between MiniLM's unit vectors, so 1.2 is a cosine similarity of about 0.4.
+MAX_CONTEXT_DISTANCE = float(os.environ.get("JENNY_RAG_MAX_DISTANCE", "1.2"))
 
 class RAG:
     def __init__(self, persist_directory="file_vectors"):
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.collection = self.client.get_or_create_collection(name="documents")
+        # The vector store and embedding model are opened on first use (or by the
+        # background warm-up), so constructing RAG does not delay the window.
+        self.persist_directory = persist_directory
+        self._collection = None
+        self._collection_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return models.get("embedding")
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._collection_lock:
+                if self._collection is None:
+                    import chromadb
+                    client = chromadb.PersistentClient(path=self.persist_directory)
+                    self._collection = client.get_or_create_collection(name="documents")
+        return self._collection
 
     def index_document(self, file_path):
-        """Reads a document, splits it into chunks, and indexes the chunks."""
+        """
+        Streams a document through the chunker and indexes it batch by batch, so memory
+        use stays flat however large the file is. Returns the number of chunks indexed.
+        """
+        # Windows are measured with the embedding model's own tokenizer when it has one.
+        tokenizer = getattr(self.model, "tokenizer", None)
+        token_counter = tokenizer_counter(tokenizer) if tokenizer is not None else word_tokens
+
+        batch = []
+        indexed = 0
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
+                for chunk in iter_chunks(f, token_counter=token_counter):
+                    batch.append(chunk)
+                    if len(batch) == EMBED_BATCH_SIZE:
+                        self._add_chunks(file_path, batch, indexed)
+                        indexed += len(batch)
+                        batch = []
+        except (OSError, UnicodeDecodeError) as e:
             print(f"Error reading file {file_path}: {e}")
-            return
-
-        # Simple chunking by paragraph
-        chunks = content.split('\n\n')
-        
-        # Filter out empty chunks
-        chunks = [chunk for chunk in chunks if chunk.strip()]
+            return indexed
 
-        if not chunks:
-            return
+        if batch:
+            self._add_chunks(file_path, batch, indexed)
+            indexed += len(batch)
+        return indexed
 
-        # Generate embeddings
-        embeddings = self.model.encode(chunks)
+    def _add_chunks(self, file_path, chunks, first_index):
+        """Embeds one batch of chunks and stores it in ChromaDB."""
+        embeddings = self.model.encode(chunks, batch_size=EMBED_BATCH_SIZE)
 
         # Create unique IDs for each chunk
-        ids = [f"{file_path}_{i}" for i in range(len(chunks))]
+        ids = [f"{file_path}_{first_index + i}" for i in range(len(chunks))]
 
-        # Store in ChromaDB
         self.collection.add(
             embeddings=embeddings,
             documents=chunks,
@@ -40,14 +73,18 @@ class RAG:
             ids=ids
         )
 
-    def retrieve_context(self, query, n_results=3):
-        """Retrieves the most relevant document chunks for a given query."""
+    @traced("rag.retrieve_context")
+    def retrieve_context(self, query, n_results=3, max_distance=MAX_CONTEXT_DISTANCE):
+        """Retrieves the most relevant document chunks for a query, leaving out unrelated ones."""
         query_embedding = self.model.encode([query])
         results = self.collection.query(
             query_embeddings=query_embedding,
-            n_results=n_results
+            n_results=n_results,
+            include=["documents", "distances"],
         )
-        return results['documents'][0]
+        documents = results['documents'][0]
+        distances = results['distances'][0]
+        return [document for document, distance in zip(documents, distances) if distance <= max_distance]
 
 # Example usage (for testing)
 if __name__ == '__main__':
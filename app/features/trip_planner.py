@@ -1,8 +1,45 @@
+import asyncio
+import collections
 import json
 import re
+import textwrap
+import time
 from app.features.ai import get_ai_response
+from app.features.json_stream import JSONItemStream
+from app.features.google_search import search_urls, fetch_snippet, search_result
+from app.core.safety import SAFETY_POLICY
 from app.features.weather import fetch_weather
 
+ITINERARY_HEADERS = ["Day", "Morning", "Afternoon", "Evening"]
+ITINERARY_COLUMN_WIDTHS = [5, 30, 30, 30]
+
+TRIP_CONTEXT_DEADLINE = 12  # seconds for all destination research together
+TRIP_CONTEXT_TTL = 1800  # seconds destination research is reused
+SEARCH_MARGIN = 0.5  # seconds the search keeps to assemble its results before the deadline
+
+MAX_CONTEXT_ENTRIES = 512  # cached (part, destination) results, least recently used dropped first
+
+# (part, destination) -> (expires at, value); parts are "weather", "search" and "notes"
+_context_cache = collections.OrderedDict()
+
+
+def _cached_context(part, key, now):
+    entry = _context_cache.get((part, key))
+    if entry is None:
+        return None
+    if entry[0] <= now:
+        del _context_cache[(part, key)]
+        return None
+    _context_cache.move_to_end((part, key))
+    return entry
+
+
+def _cache_context(part, key, value):
+    _context_cache[(part, key)] = (time.monotonic() + TRIP_CONTEXT_TTL, value)
+    _context_cache.move_to_end((part, key))
+    while len(_context_cache) > MAX_CONTEXT_ENTRIES:
+        _context_cache.popitem(last=False)
+
 def fix_json(bad_json: str) -> str:
     """
     Attempts to clean and fix JSON string returned by AI.
@@ -18,15 +55,104 @@ def fix_json(bad_json: str) -> str:
 
     return bad_json
 
-def plan_trip(destination, duration, interests, trip_type, search_results):
+def format_itinerary_header():
+    header_line = "".join(f"{header:<{width}} " for header, width in zip(ITINERARY_HEADERS, ITINERARY_COLUMN_WIDTHS))
+    return header_line + "\n" + "-" * sum(ITINERARY_COLUMN_WIDTHS) + "\n"
+
+def format_itinerary_row(day_plan):
+    """One day of the itinerary as fixed-width table lines, activities wrapped to their columns."""
+    widths = ITINERARY_COLUMN_WIDTHS
+    day = str(day_plan.get("day", ""))
+    columns = [textwrap.wrap(str(day_plan.get(part) or ""), width=width)
+               for part, width in zip(("morning", "afternoon", "evening"), widths[1:])]
+    lines = []
+    for i in range(max(max(len(column) for column in columns), 1)):
+        day_str = f"{day:<{widths[0]}} " if i == 0 else " " * (widths[0] + 1)
+        cells = [f"{column[i]:<{width}} " if i < len(column) else " " * (width + 1)
+                 for column, width in zip(columns, widths[1:])]
+        lines.append((day_str + "".join(cells)).rstrip() + "\n")
+    return "".join(lines)
+
+def _usable(part, value):
+    """Only real results are cached; failures are retried on the next plan."""
+    if part == "weather":
+        return bool(value) and not value.startswith(("❌", "⚠️"))
+    if part == "search":
+        return bool(value.get("results"))
+    return bool(value)
+
+async def _search_destination(destination, deadline):
+    """Web search for a destination with the result pages fetched concurrently until `deadline`."""
+    loop = asyncio.get_running_loop()
+    query = f"top attractions, restaurants, and local transportation in {destination}"
+    urls = await asyncio.to_thread(search_urls, query)
+    tasks = [asyncio.ensure_future(asyncio.to_thread(fetch_snippet, url)) for url in urls]
+    if tasks:
+        await asyncio.wait(tasks, timeout=max(0.0, deadline - SEARCH_MARGIN - loop.time()))
+    results = []
+    for url, task in zip(urls, tasks):
+        finished = task.done() and not task.cancelled() and task.exception() is None
+        results.append(search_result(url, task.result() if finished else "No snippet available."))
+        task.cancel()
+    return {"results": results}
+
+async def gather_trip_context(destination, rag=None, deadline=TRIP_CONTEXT_DEADLINE):
+    """
+    Weather, web search and knowledge-base notes for a destination, fetched concurrently
+    under one deadline. Each part is cached per destination for TRIP_CONTEXT_TTL, so
+    replanning the same city (e.g. with other interests) skips the I/O. Parts that fail
+    or miss the deadline are left out.
+    """
+    loop = asyncio.get_running_loop()
+    key = destination.strip().lower()
+    end = loop.time() + deadline
+    stages = {
+        "weather": lambda: asyncio.to_thread(fetch_weather, destination),
+        "search": lambda: _search_destination(destination, end),
+    }
+    if rag is not None:
+        stages["notes"] = lambda: asyncio.to_thread(rag.retrieve_context, destination)
+
+    context = {}
+    tasks = {}
+    now = time.monotonic()
+    for part, start in stages.items():
+        cached = _cached_context(part, key, now)
+        if cached:
+            context[part] = cached[1]
+        else:
+            tasks[asyncio.ensure_future(start())] = part
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            print(f"[Trip Planner Error] {tasks[task]} missed the {deadline}s deadline")
+            task.cancel()
+        for task in done:
+            part = tasks[task]
+            try:
+                value = task.result()
+            except Exception as e:
+                print(f"[Trip Planner Error] {part}: {e}")
+                continue
+            context[part] = value
+            if _usable(part, value):
+                _cache_context(part, key, value)
+    return context
+
+async def plan_trip(destination, duration, interests, trip_type, rag=None, on_day=None):
     """
     Plans a trip to a destination based on user interests and trip type.
+    The itinerary is streamed: `on_day(day_plan)` is called for each day as soon as the
+    model has finished writing it. Returns {"itinerary": [...]} or {"error": ...}.
     """
     if not all([destination, duration, interests, trip_type]):
         return {"error": "Please provide a destination, duration, interests, and trip type."}
 
     try:
-        weather_report = fetch_weather(destination)
+        context = await gather_trip_context(destination, rag)
+        weather_report = context.get("weather", "Not available.")
+        search_results = context.get("search")
+        notes = "\n".join(context.get("notes") or [])
 
         if not search_results or not search_results.get('results'):
             return {"error": f"I couldn't find enough information to plan a trip to {destination}."}
@@ -60,13 +186,26 @@ def plan_trip(destination, duration, interests, trip_type, search_results):
         Search results:
         {search_results['results']}
         """
+        if notes:
+            prompt += f"""
+        Notes from the user's documents:
+        {notes}
+        """
 
-        response = get_ai_response(prompt, [], "")
-        itinerary_text = response.get('text', '{}')
-
-        # Clean up AI response
-        cleaned_json = fix_json(itinerary_text)
+        parser = JSONItemStream()
+        days = []
+        response = await get_ai_response(prompt, [], "", stream=True, safety=SAFETY_POLICY)
+        async for chunk in response:
+            text = chunk.get("text", "") if isinstance(chunk, dict) else chunk
+            for day_plan in parser.feed(text):
+                days.append(day_plan)
+                if on_day is not None:
+                    on_day(day_plan)
+        if days:
+            return {"itinerary": days}
 
+        # No day objects came through the stream: parse the whole answer as before.
+        cleaned_json = fix_json(parser.text)
         try:
             itinerary_json = json.loads(cleaned_json)
             return itinerary_json
@@ -1,27 +1,23 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 from typing import List
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
+from app.core.models import models
 
 # -----------------------
-# Setup ChromaDB
+# Setup ChromaDB (opened lazily, on first use or by the warm-up thread)
 # -----------------------
-client = chromadb.PersistentClient(path="web_vectors")
-web_collection = client.get_or_create_collection(name="web_content")
+def _load_web_collection():
+    import chromadb
+    client = chromadb.PersistentClient(path="web_vectors")
+    return client.get_or_create_collection(name="web_content")
+
+models.register("web_collection", _load_web_collection, priority=60)
 
 # -----------------------
-# Embedding model
+# Embedding model (shared with RAG)
 # -----------------------
-embedding_model = None
-
 def get_embedding_model():
-    global embedding_model
-    if embedding_model is None:
-        print("Loading embedding model...")
-        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("Embedding model loaded.")
-    return embedding_model
+    return models.get("embedding")
 
 # -----------------------
 # Scrape dynamic/static webpage and store
@@ -57,6 +53,7 @@ def scrape_and_store_url(url: str) -> str:
         embeddings = model.encode(chunks).tolist()
 
         # Store in ChromaDB
+        web_collection = models.get("web_collection")
         for i, chunk in enumerate(chunks):
             web_collection.add(
                 embeddings=[embeddings[i]],
@@ -77,7 +74,7 @@ def query_web_content(query: str) -> str:
         model = get_embedding_model()
         query_embedding = model.encode([query])[0].tolist()
 
-        results = web_collection.query(
+        results = models.get("web_collection").query(
             query_embeddings=[query_embedding],
             n_results=3
         )
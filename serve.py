@@ -0,0 +1,4 @@
+from app.core.server import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import io
+import re
+import tracemalloc
+
+import pytest
+
+from app.features import rag as rag_module
+from app.features.chunker import iter_chunks, tokenizer_counter, word_tokens
+from app.features.rag import RAG
+
+
+def chunks_of(text, **kwargs):
+    return list(iter_chunks(io.StringIO(text), **kwargs))
+
+
+def tokens(chunk):
+    return sum(word_tokens(word) for word in chunk.split())
+
+
+def test_windows_respect_the_token_budget_and_keep_every_word():
+    words = [f"word{i}" for i in range(1000)]
+    chunks = chunks_of(" ".join(words), max_tokens=50, overlap=10, block_size=37)
+
+    assert all(tokens(chunk) <= 50 for chunk in chunks)
+    seen = {word for chunk in chunks for word in chunk.split()}
+    assert seen == set(words)
+
+
+def test_windows_cut_mid_paragraph_overlap():
+    chunks = chunks_of(" ".join(f"w{i}" for i in range(100)), max_tokens=20, overlap=5, token_counter=lambda word: 1)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split()[-5:] == current.split()[:5]
+
+
+def test_paragraph_breaks_end_half_full_windows():
+    paragraphs = [" ".join(f"p{p}w{i}" for i in range(8)) for p in range(3)]
+    chunks = chunks_of("\n\n".join(paragraphs), max_tokens=14, overlap=5, token_counter=lambda word: 1)
+
+    assert chunks == paragraphs
+
+
+def test_long_runs_without_spaces_are_split():
+    chunks = chunks_of("x" * 5000, max_tokens=100, overlap=0, block_size=64)
+
+    assert "".join(chunks) == "x" * 5000
+    assert all(tokens(chunk) <= 100 for chunk in chunks)
+
+
+LOG_LINE = "2024-01-01T12:00:00,123 ERROR [main] com.example.Service - Connection refused (code=111)\n"
+
+
+def basic_pieces(text):
+    """Lower bound of the real token count: BERT splits on whitespace and every punctuation mark."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def test_punctuation_heavy_logs_fit_the_model_input():
+    chunks = chunks_of(LOG_LINE * 200)
+
+    # 256 model tokens, less [CLS] and [SEP]
+    assert all(basic_pieces(chunk) <= 254 for chunk in chunks)
+    assert all(word_tokens(word) >= basic_pieces(word) for word in LOG_LINE.split())
+
+
+def test_windows_fit_the_real_tokenizer():
+    transformers = pytest.importorskip("transformers")
+    try:
+        tokenizer = transformers.AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2", local_files_only=True)
+    except Exception:
+        pytest.skip("MiniLM tokenizer is not available offline")
+
+    text = LOG_LINE * 100 + "\n\n" + "Plain prose about the deployment. " * 200
+    for counter in (word_tokens, tokenizer_counter(tokenizer)):
+        for chunk in chunks_of(text, token_counter=counter):
+            assert len(tokenizer.tokenize(chunk)) <= 254
+
+
+class FakeModel:
+    def encode(self, texts, batch_size=32):
+        return [[float(len(text))] for text in texts]
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    def add(self, embeddings, documents, metadatas, ids):
+        self.batches.append(ids)
+
+
+class FakeRAG(RAG):
+    model = FakeModel()
+
+
+def test_index_document_writes_fixed_size_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_module, "EMBED_BATCH_SIZE", 8)
+    path = tmp_path / "notes.txt"
+    path.write_text("\n\n".join(" ".join(f"p{p}w{i}" for i in range(60)) for p in range(20)), encoding="utf-8")
+    rag = FakeRAG()
+    rag._collection = FakeCollection()
+
+    count = rag.index_document(str(path))
+
+    assert count == sum(len(batch) for batch in rag._collection.batches)
+    assert all(len(batch) <= 8 for batch in rag._collection.batches)
+    ids = [i for batch in rag._collection.batches for i in batch]
+    assert ids == [f"{path}_{i}" for i in range(count)]
+
+
+def test_memory_stays_flat_for_large_files(tmp_path):
+    path = tmp_path / "big.log"
+    line = "2024-01-01 12:00:00 INFO request handled in 12ms by worker-7\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(30000):  # about 2 MB
+            f.write(line)
+
+    tracemalloc.start()
+    with open(path, "r", encoding="utf-8") as f:
+        count = sum(1 for _ in iter_chunks(f))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count > 500
+    assert peak < 1024 * 1024
+
+
+class NearestCollection:
+    def query(self, query_embeddings, n_results, include):
+        return {"documents": [["close", "related", "unrelated"][:n_results]], "distances": [[0.3, 1.1, 1.7][:n_results]]}
+
+
+def test_retrieve_context_leaves_out_unrelated_chunks():
+    rag = FakeRAG()
+    rag._collection = NearestCollection()
+
+    assert rag.retrieve_context("what is gemini") == ["close", "related"]
+    assert rag.retrieve_context("what is gemini", max_distance=0.5) == ["close"]
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.core.context_window import ContextWindow, fit_messages, message_tokens
+
+
+def make_history(turns):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "x" * 200})
+        history.append({"role": "assistant", "content": f"answer {i} " + "y" * 200})
+    return history
+
+
+def test_prompt_size_stays_bounded_and_old_turns_are_summarized():
+    calls = []
+
+    async def summarize(summary, messages):
+        calls.append(len(messages))
+        return f"{summary} +{len(messages)}".strip()
+
+    async def scenario():
+        window = ContextWindow(history_budget=300, summarize=summarize)
+        history = []
+        sizes = []
+        for turn in make_history(30):
+            history.append(turn)
+            view = window.view(history)
+            sizes.append(sum(message_tokens(m) for m in view))
+            await window.wait()
+        return window, sizes
+
+    window, sizes = asyncio.run(scenario())
+
+    assert max(sizes) < 300 + 100  # recent turns plus a short summary, whatever the length
+    assert calls and sum(calls) == window.summarized_upto
+    assert window.view(make_history(30))[0]["summary"]
+
+
+def test_view_without_event_loop_keeps_recent_turns_only():
+    window = ContextWindow(history_budget=300)
+    view = window.view(make_history(10))
+
+    assert view[-1]["content"].startswith("answer 9")
+    assert sum(message_tokens(m) for m in view) <= 300
+    assert not any(m.get("summary") for m in view)
+
+
+def test_fit_messages_keeps_system_summary_and_query():
+    messages = [{"role": "system", "content": "brain"}, {"role": "system", "content": "summary", "summary": True}]
+    messages += make_history(5) + [{"role": "user", "content": "current question"}]
+    fitted = fit_messages(messages, budget=150)
+
+    assert fitted[0]["content"] == "brain"
+    assert fitted[1]["summary"]
+    assert fitted[-1]["content"] == "current question"
+    assert len(fitted) < len(messages)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.core.engine import AgentEngine
+
+
+def drain(channel, timeout=2):
+    chunks = []
+    while True:
+        chunk = channel.get(timeout=timeout)
+        if chunk is None:
+            return chunks
+        chunks.append(chunk)
+
+
+def test_submit_runs_on_shared_loop_with_separate_channels():
+    engine = AgentEngine().start()
+    try:
+        async def answer(text, channel):
+            await asyncio.sleep(0)
+            channel.put(text)
+            channel.put(None)
+
+        first_id, first = engine.submit(answer, "one")
+        second_id, second = engine.submit(answer, "two")
+
+        assert first_id != second_id
+        assert drain(first) == ["one"]
+        assert drain(second) == ["two"]
+    finally:
+        engine.shutdown()
+
+
+def test_cancel_closes_the_response_channel():
+    engine = AgentEngine().start()
+    try:
+        async def slow(channel):
+            channel.put("partial")
+            await asyncio.sleep(30)
+
+        request_id, channel = engine.submit(slow)
+        assert channel.get(timeout=2) == "partial"
+        assert engine.cancel(request_id)
+        assert drain(channel) == ["(cancelled)"]
+    finally:
+        engine.shutdown()
+
+
+def test_cancel_racing_the_start_ends_each_request_exactly_once():
+    engine = AgentEngine().start()
+    try:
+        async def answer(channel):
+            await asyncio.sleep(0.01)
+            channel.put("done")
+            channel.put(None)
+
+        channels = []
+        for _ in range(200):
+            request_id, channel = engine.submit(answer)
+            engine.cancel(request_id)
+            channels.append(channel)
+
+        for channel in channels:
+            drain(channel)
+        engine.run(asyncio.sleep(0.05))
+        assert all(channel.empty() for channel in channels)
+    finally:
+        engine.shutdown()
@@ -0,0 +1,79 @@
+import datetime
+
+from app.core.extractor import ArgumentExtractor, parse_datetime
+from app.core.keywords import KEYWORD_TO_INTENT
+from app.core.models import ModelRegistry
+from app.core.router import KeywordRouter
+
+NOW = datetime.datetime(2026, 10, 18, 14, 0)  # a Sunday
+
+
+def make_extractor():
+    # No spaCy model registered: extraction must still work from the rules alone.
+    return ArgumentExtractor(registry=ModelRegistry())
+
+
+def test_parse_datetime():
+    assert parse_datetime("tomorrow at 5pm", NOW)[0] == datetime.datetime(2026, 10, 19, 17, 0)
+    assert parse_datetime("in 10 minutes", NOW)[0] == datetime.datetime(2026, 10, 18, 14, 10)
+    assert parse_datetime("at 9:30", NOW)[0] == datetime.datetime(2026, 10, 19, 9, 30)
+    assert parse_datetime("on friday", NOW)[0] == datetime.datetime(2026, 10, 23, 9, 0)
+    assert parse_datetime("2026-12-01 08:15:00", NOW)[0] == datetime.datetime(2026, 12, 1, 8, 15)
+    assert parse_datetime("call mom", NOW) is None
+
+
+def test_extracts_arguments_for_routed_intents():
+    extractor = make_extractor()
+    reminder = extractor.extract("remind me to call mom tomorrow at 5pm", "set_reminder", now=NOW)
+    assert reminder.args == {"message": "call mom", "time": "2026-10-19 17:00:00"}
+    assert extractor.extract("weather in new york", "weather").args == {"city": "new york"}
+    assert extractor.extract("what's the $aapl stock price", "get_stock_price").args == {"symbol": "AAPL"}
+    assert extractor.extract("complete goal #12", "complete_goal").args == {"goal_id": "12"}
+    assert extractor.extract("scrape https://example.com/page", "research_webpage").args == {"url": "https://example.com/page"}
+    assert extractor.extract("news about electric cars", "get_news").args == {"topic": "electric cars"}
+    assert extractor.extract("what's the weather", "weather") is None
+
+
+def test_batch_mode_matches_single_extraction():
+    extractor = make_extractor()
+    items = [("weather in paris", "weather"), ("open github.com", "open_website"), ("hello", "greet")]
+    results = extractor.extract_batch(items, wait_for_model=False)
+
+    assert results[0].args == {"city": "paris"}
+    assert results[1].args == {"url": "github.com"}
+    assert results[2] is None
+
+
+def test_residual_scores_as_a_confident_route():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    query = "remind me to buy milk at 6pm"
+    extraction = make_extractor().extract(query, "set_reminder", now=NOW)
+
+    assert router.match(query).confidence < router.min_confidence
+    assert router.route(extraction.residual(query)).intent == "set_reminder"
+    assert router.match(query, explained=extraction.spans).confidence >= router.min_confidence
+
+
+def test_places_stop_at_prepositions_and_time_words():
+    extractor = make_extractor()
+    assert extractor.extract("is it going to rain in paris", "weather").args == {"city": "paris"}
+    assert extractor.extract("weather in rome for the weekend", "weather").args == {"city": "rome"}
+    assert extractor.extract("weather in new york tomorrow", "weather").args == {"city": "new york"}
+
+
+def test_free_text_arguments_do_not_make_a_confident_route():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    extractor = make_extractor()
+    for query, intent in [("draw a conclusion from this data", "generate_image"),
+                          ("google how to do taxes", "google_search")]:
+        extraction = extractor.extract(query, intent)
+        assert router.match(query, explained=extraction.spans).confidence < router.min_confidence
+
+    extraction = extractor.extract("weather in paris", "weather")
+    assert router.route("weather in paris") is None
+    assert router.match("weather in paris", explained=extraction.spans).confidence == 1.0
+
+
+def test_residual_removes_whole_words_only():
+    extraction = make_extractor().extract("weather in rome", "weather")
+    assert extraction.residual("weather in rome near romeo") == "weather in near romeo"
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.features import fake_llm
+from app.features.fake_llm import FakeClient, FakeLLM, FakeProviderError
+
+RULES = [
+    {"match": r"weather in (\w+)", "response": r"Sunny in \1."},
+    {"match": r".*", "response": "You asked: $query"},
+]
+
+
+def text_of(chunks):
+    return "".join(chunk.choices[0].delta.content for chunk in chunks)
+
+
+def test_scripted_rules_and_templates():
+    llm = FakeLLM(rules=RULES, ttft=0, tokens_per_second=0)
+    assert text_of(llm.stream("system: be nice\nuser: weather in Paris")) == "Sunny in Paris."
+    assert text_of(llm.stream("system: be nice\nuser: hello there")) == "You asked: hello there"
+
+
+def test_default_rules_answer_the_planner_with_an_empty_plan():
+    llm = FakeLLM(ttft=0, tokens_per_second=0)
+    assert text_of(llm.stream("You are an intelligent planner for an AI assistant named Jenny.")) == "[]"
+
+
+def test_same_seed_gives_the_same_timings():
+    prompts = ["user: one", "user: two"]
+    delays = []
+    for order in (prompts, prompts[::-1]):
+        llm = FakeLLM(ttft=0.1, jitter=0.5, seed=7)
+        delays.append({p: llm._delay(llm._rng(p), 1.0) for p in order})
+    assert delays[0] == delays[1]
+
+
+def test_streams_with_the_configured_latency():
+    llm = FakeLLM(rules=[{"match": ".*", "response": "one two three four five"}], ttft=0.05, tokens_per_second=100, jitter=0)
+    start = time.perf_counter()
+    chunks = list(llm.stream("user: hi"))
+    elapsed = time.perf_counter() - start
+
+    assert len(chunks) == 5
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_failure_rate_fails_and_retries_can_succeed():
+    llm = FakeLLM(ttft=0, failure_rate=1.0)
+    with pytest.raises(FakeProviderError):
+        llm.stream("user: hi")
+
+    llm = FakeLLM(ttft=0, tokens_per_second=0, failure_rate=0.5, seed=3)
+    outcomes = []
+    for _ in range(20):
+        try:
+            llm.stream("user: hi")
+            outcomes.append(True)
+        except FakeProviderError:
+            outcomes.append(False)
+    assert True in outcomes and False in outcomes
+
+
+def test_call_counts_are_bounded(monkeypatch):
+    monkeypatch.setattr(fake_llm, "MAX_TRACKED_PROMPTS", 10)
+    llm = FakeLLM(ttft=0, tokens_per_second=0)
+    llm.stream("user: kept")
+    for i in range(50):
+        llm.stream(f"user: question {i}")
+        llm.stream("user: kept")
+
+    assert len(llm._attempts) == 10
+    assert list(llm._attempts.values())[-1] == 51
+
+
+def test_client_interface():
+    client = FakeClient(FakeLLM(rules=RULES, ttft=0, tokens_per_second=0))
+    stream = client.chat.completions.create(model="any", messages=[{"role": "user", "content": "user: weather in Rome"}], stream=True)
+    assert text_of(stream) == "Sunny in Rome."
+    response = client.chat.completions.create(model="any", messages=[{"role": "user", "content": "user: hi"}])
+    assert response.choices[0].message.content == "You asked: hi"
+
+
+def test_get_ai_response_runs_offline_with_the_fake_provider():
+    pytest.importorskip("numpy")
+    script = (
+        "import asyncio\n"
+        "from app.features.ai import get_ai_response\n"
+        "from app.core.safety import SAFETY_CHECKED\n"
+        "async def main():\n"
+        "    stream = await get_ai_response('What is the capital of France?', [], None, stream=True, safety=SAFETY_CHECKED)\n"
+        "    print(''.join([chunk async for chunk in stream]))\n"
+        "asyncio.run(main())\n"
+    )
+    env = dict(os.environ, JENNY_LLM_PROVIDER="fake", JENNY_FAKE_LLM_TTFT="0.01")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], env=env, cwd=root, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert "This is a scripted answer to: What is the capital of France?" in result.stdout
@@ -1,21 +1,20 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from app.features.g4f_adapter import generate_text, generate_image
+from app.features.g4f_adapter import generate_text, generate_image, _pump_stream
 
 @pytest.mark.asyncio
-@patch('app.features.g4f_adapter.client.chat.completions.create', new_callable=AsyncMock)
-async def test_generate_text_retry(mock_create_async):
+@patch('app.features.g4f_adapter.client.chat.completions.create')
+async def test_generate_text_retry(mock_create):
     """Test that generate_text retries on failure."""
-    # Simulate failure then success
-    async def async_generator():
-        yield "Success"
-
-    mock_create_async.side_effect = [Exception("API Error"), async_generator()]
+    # Simulate failure then success; the blocking stream is consumed in a worker thread
+    mock_create.side_effect = [Exception("API Error"), iter(["Success"])]
     
     chunks = [chunk async for chunk in generate_text("test prompt", retries=2)]
     
     assert "Success" in chunks
-    assert mock_create_async.call_count == 2
+    assert mock_create.call_count == 2
 
 @pytest.mark.asyncio
 @patch('app.features.g4f_adapter.client.images.generate', new_callable=AsyncMock)
@@ -33,15 +32,62 @@ async def test_generate_image_retry(mock_create_async):
     assert mock_create_async.call_count == 2
 
 @pytest.mark.asyncio
-@patch('app.features.g4f_adapter.client.chat.completions.create', new_callable=AsyncMock)
-async def test_generate_text_failure(mock_create_async):
+@patch('app.features.g4f_adapter.client.chat.completions.create')
+async def test_generate_text_failure(mock_create):
     """Test that generate_text returns an error message after all retries fail."""
-    mock_create_async.side_effect = Exception("API Error")
+    mock_create.side_effect = Exception("API Error")
     
     chunks = [chunk async for chunk in generate_text("test prompt", retries=2)]
     
     assert "Error: Unable to generate text after 2 retries." in chunks
-    assert mock_create_async.call_count == 2
+    assert mock_create.call_count == 2
+
+@pytest.mark.asyncio
+async def test_stream_does_not_block_the_event_loop():
+    """A slow provider stream is read in a worker thread while other coroutines keep running."""
+    def slow_stream():
+        time.sleep(0.3)
+        yield "chunk"
+
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    chunks = [chunk async for chunk in _pump_stream(slow_stream, 2, 2)]
+    task.cancel()
+
+    assert chunks == ["chunk"]
+    assert ticks > 10
+
+@pytest.mark.asyncio
+async def test_stream_stops_when_consumer_stops():
+    """Backpressure keeps the worker a bounded distance ahead; closing the consumer closes the stream."""
+    produced = []
+    stream = MagicMock()
+    stream.__iter__.return_value = (produced.append(i) or i for i in range(1000))
+
+    chunks = _pump_stream(lambda: stream, 2, 2, queue_size=4)
+    assert await chunks.__anext__() == 0
+    await chunks.aclose()
+    await asyncio.sleep(0.3)
+
+    assert len(produced) < 10
+    stream.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_chunk_timeout():
+    """A stream that stalls between chunks fails with a timeout."""
+    def stalling_stream():
+        yield "first"
+        time.sleep(1)
+        yield "late"
+
+    with pytest.raises(asyncio.TimeoutError):
+        [chunk async for chunk in _pump_stream(stalling_stream, 2, 0.2)]
 
 @pytest.mark.asyncio
 @patch('app.features.g4f_adapter.client.images.generate', new_callable=AsyncMock)
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core import intent_classifier
+from app.core.intent_classifier import IntentClassifier, plan_label
+
+WORDS = ["time", "weather", "joke", "goals", "reminders"]
+
+
+def fake_embed(texts):
+    vectors = np.array([[float(word in text) for word in WORDS] + [1.0] for text in texts], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_plan_labels():
+    assert plan_label([]) == "__none__"
+    assert plan_label([{"tool_name": "get_time"}]) == "get_time"
+    assert plan_label([{"tool_name": "get_time"}, {"tool_name": "weather"}]) == "__multi__"
+
+
+def test_train_from_logs_reports_heldout_accuracy_and_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "embed", fake_embed)
+    places = ["home", "work", "paris", "tokyo", "lima", "oslo", "cairo", "rome", "delhi", "quito"]
+    decisions = [(template.format(place), label) for place in places for template, label in
+                 [("what is the time in {}", "get_time"), ("tell me a joke about {}", "__none__"),
+                  ("show my goals for {}", "show_goals"), ("list reminders at {}", "show_reminders")]]
+    path = str(tmp_path / "intent.npz")
+
+    classifier = intent_classifier.train_from_logs(decisions, holdout=0.25, min_samples=10, path=path)
+
+    assert classifier.heldout_accuracy == 1.0
+    assert classifier.ready
+    loaded = IntentClassifier.load(path)
+    label, confidence = loaded.predict(fake_embed(["the time please"]))[0]
+    assert label == "get_time"
+    assert confidence > 0.5
+
+
+def test_repeated_queries_never_land_on_both_sides_of_the_split(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "embed", fake_embed)
+    seen = {}
+    split_holdout = intent_classifier.split_holdout
+
+    def record_split(queries, labels, holdout=0.2, seed=0):
+        split = split_holdout(queries, labels, holdout, seed)
+        seen["train"], seen["test"] = split[0], split[2]
+        return split
+
+    monkeypatch.setattr(intent_classifier, "split_holdout", record_split)
+    decisions = [("What is the time?", "get_time"), ("what is the  time", "get_time"),
+                 ("tell me a joke", "__none__"), ("show my goals", "show_goals")] * 20
+
+    intent_classifier.train_from_logs(decisions, holdout=0.25, min_samples=3, path=str(tmp_path / "intent.npz"))
+
+    train = {intent_classifier.normalise_query(q) for q in seen["train"]}
+    test = {intent_classifier.normalise_query(q) for q in seen["test"]}
+    assert len(seen["train"]) + len(seen["test"]) == 3
+    assert not train & test
+
+
+def test_deduplicate_keeps_the_latest_label():
+    decisions = [("Set a reminder", "__none__"), ("set a reminder!", "add_reminder"), ("hi", "__none__")]
+    assert intent_classifier.deduplicate(decisions) == [("set a reminder!", "add_reminder"), ("hi", "__none__")]
+
+
+def test_retrained_model_is_picked_up_without_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "embed", fake_embed)
+    path = str(tmp_path / "intent.npz")
+    monkeypatch.setattr(intent_classifier, "INTENT_MODEL_PATH", path)
+    registry = intent_classifier.models
+    monkeypatch.setitem(registry._models, "intent_classifier", intent_classifier._load_intent_classifier())
+    assert not intent_classifier.current_classifier().ready
+
+    decisions = [(f"what is the time in {place}", "get_time") for place in "abcdefgh"] + \
+                [(f"tell me a joke about {place}", "__none__") for place in "abcdefgh"]
+    intent_classifier.train_from_logs(decisions, holdout=0.25, min_samples=10, path=path)
+
+    classifier = intent_classifier.current_classifier()
+    assert classifier.ready
+    assert classifier.classify("the time please")[0] == "get_time"
+
+
+def test_too_few_decisions_are_not_trained(tmp_path):
+    assert intent_classifier.train_from_logs([("hi", "__none__")], path=str(tmp_path / "x.npz")) is None
+    assert not IntentClassifier().ready
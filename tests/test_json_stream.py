@@ -0,0 +1,50 @@
+from app.features.json_stream import JSONItemStream
+
+ITINERARY = (
+    'Here is your plan:\n```json\n'
+    '{"itinerary": [\n'
+    '  {"day": 1, "morning": "Walk {old town}", "afternoon": "Museum", "evening": "Dinner, \\"Chez Marie\\"",},\n'
+    '  {"day": 2, "morning": "Hike", "afternoon": "Lake", "evening": "Rest", "tags": [{"kind": "outdoor"}]},\n'
+    ']}\n```'
+)
+
+
+def feed_in_pieces(text, size):
+    parser = JSONItemStream()
+    arrivals = []
+    for i in range(0, len(text), size):
+        for item in parser.feed(text[i:i + size]):
+            arrivals.append((i + size, item))
+    return parser, arrivals
+
+
+def test_each_item_is_emitted_when_its_closing_brace_arrives():
+    parser, arrivals = feed_in_pieces(ITINERARY, 1)
+
+    assert [item["day"] for _, item in arrivals] == [1, 2]
+    first_end = ITINERARY.index("},") + 1
+    assert arrivals[0][0] == first_end
+    assert arrivals[0][1]["evening"] == 'Dinner, "Chez Marie"'
+    assert arrivals[1][1]["tags"] == [{"kind": "outdoor"}]
+    assert parser.finished
+
+
+def test_chunk_boundaries_do_not_matter():
+    expected = [item for _, item in feed_in_pieces(ITINERARY, 1)[1]]
+    for size in (2, 7, 64, len(ITINERARY)):
+        assert [item for _, item in feed_in_pieces(ITINERARY, size)[1]] == expected
+
+
+def test_items_of_a_bare_array_and_arrays_of_strings_are_skipped():
+    parser = JSONItemStream()
+    items = parser.feed('{"notes": ["a ] b", "c"], "days": [{"day": 1}, {"day": 2}]}')
+    assert items == [{"day": 1}, {"day": 2}]
+
+    parser = JSONItemStream()
+    assert parser.feed('[{"day": 1}]') == [{"day": 1}]
+
+
+def test_malformed_item_is_skipped():
+    parser = JSONItemStream()
+    items = parser.feed('{"itinerary": [{"day": 1, "morning": oops}, {"day": 2}]}')
+    assert items == [{"day": 2}]
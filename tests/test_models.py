@@ -0,0 +1,32 @@
+import threading
+
+from app.core.models import ModelRegistry
+
+
+def test_models_load_lazily_and_only_once():
+    registry = ModelRegistry()
+    calls = []
+    registry.register("slow", lambda: calls.append(1) or object())
+
+    assert calls == []
+    assert not registry.is_loaded("slow")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("slow"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(model is results[0] for model in results)
+
+
+def test_warm_up_loads_in_priority_order():
+    registry = ModelRegistry()
+    order = []
+    registry.register("late", lambda: order.append("late") or "late", priority=50)
+    registry.register("early", lambda: order.append("early") or "early", priority=10)
+
+    registry.warm_up().join()
+    assert order == ["early", "late"]
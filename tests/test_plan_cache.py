@@ -0,0 +1,44 @@
+import time
+
+from app.core.plan_cache import PlanCache
+
+
+def test_slots_are_refilled_from_a_new_query():
+    cache = PlanCache()
+    assert cache.put("Weather in London?", [{"tool_name": "weather", "args": {"city": "London"}}])
+
+    assert cache.get("weather in New York") == [{"tool_name": "weather", "args": {"city": "New York"}}]
+    assert cache.get("news in London") is None
+
+
+def test_plans_with_arguments_not_in_the_query_are_not_cached():
+    cache = PlanCache()
+    plan = [{"tool_name": "set_reminder", "args": {"message": "dentist", "time": "2026-10-19 09:00:00"}}]
+    assert not cache.put("remind me about the dentist tomorrow morning", plan)
+    assert not cache.put("do it again", [])
+
+
+def test_slots_do_not_swallow_filler_words():
+    cache = PlanCache()
+    cache.put("london weather", [{"tool_name": "weather", "args": {"city": "london"}}])
+
+    assert cache.get("what is the weather") is None
+    assert cache.get("paris weather")[0]["args"] == {"city": "paris"}
+
+
+def test_ttl_lru_and_invalidation():
+    cache = PlanCache(max_size=2, ttl=0.05)
+    cache.check_fingerprint("v1")
+    cache.put("show my goals", [{"tool_name": "show_goals", "args": {}}])
+    cache.put("tell me a joke", [])
+    cache.put("what can you do", [])
+    assert len(cache) == 2
+    assert cache.get("show my goals") is None
+
+    assert cache.get("tell me a joke") == []
+    cache.check_fingerprint("v2")
+    assert cache.get("tell me a joke") is None
+
+    cache.put("tell me a joke", [])
+    time.sleep(0.06)
+    assert cache.get("tell me a joke") is None
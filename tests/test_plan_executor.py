@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from app.core.plan_executor import PlanExecutor, resolve_dependencies
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, block=True, timeout=None):
+        self.items.append(item)
+
+
+def slow_sync(delay, text):
+    def handler(args, session):
+        time.sleep(delay)
+        return text
+    return handler
+
+
+def run(plan, routes):
+    queue = ListQueue()
+    start = time.perf_counter()
+    asyncio.run(PlanExecutor(routes, queue, session=None).run(plan))
+    return queue.items, time.perf_counter() - start
+
+
+def test_independent_steps_run_concurrently():
+    routes = {name: {"handler": slow_sync(0.2, name)} for name in ("weather", "news", "stock")}
+    items, elapsed = run([{"tool_name": name, "args": {}} for name in routes], routes)
+
+    assert elapsed < 0.5
+    assert sorted(item for item in items if item != "\n") == ["news", "stock", "weather"]
+
+
+def test_dependencies_are_respected():
+    order = []
+
+    def record(name, delay=0):
+        def handler(args, session):
+            time.sleep(delay)
+            order.append(name)
+        return handler
+
+    routes = {"first": {"handler": record("first", 0.1)}, "second": {"handler": record("second")}}
+    run([{"tool_name": "second", "args": {}, "depends_on": [1]}, {"tool_name": "first", "args": {}}], routes)
+
+    assert order == ["first", "second"]
+
+
+def test_streamed_output_is_not_interleaved():
+    async def stream(args, queue, session):
+        for word in args["words"]:
+            queue.put(word)
+            await asyncio.sleep(0.01)
+        queue.put(None)  # ignored; the planner ends the response
+
+    routes = {"stream": {"handler": stream, "streaming": True}, "quick": {"handler": slow_sync(0.005, "quick")}}
+    items, _ = run([
+        {"tool_name": "stream", "args": {"words": ["a", "b", "c"]}},
+        {"tool_name": "quick", "args": {}},
+    ], routes)
+
+    assert items == ["a", "b", "c", "\n", "quick"]
+
+
+def test_unknown_tools_and_cycles():
+    assert resolve_dependencies([{"depends_on": [1]}, {"depends_on": [0]}]) == {0: set(), 1: {0}}
+    items, _ = run([{"tool_name": "nope", "args": {}}], {})
+    assert items == ["Sorry, I found an unknown tool in my plan: nope"]
@@ -0,0 +1,84 @@
+import asyncio
+import types
+
+import pytest
+
+planner = pytest.importorskip("app.core.planner")
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, block=True, timeout=None):
+        self.items.append(item)
+
+
+def make_planner(monkeypatch, answers):
+    """A PlanningEngine with an empty plan whose direct answers are played from `answers`."""
+    monkeypatch.setattr(planner, "detect", lambda query: "en")
+    monkeypatch.setattr(planner, "SPECULATIVE_EXECUTION", False)
+    engine = planner.PlanningEngine.__new__(planner.PlanningEngine)
+    engine.agent = types.SimpleNamespace(intent_routes={})
+    engine.route_locally = lambda query: []
+    engine.answered = []
+
+    async def answer_directly(query, response_queue, session):
+        engine.answered.append(query)
+        await answers.pop(0)(response_queue)
+
+    engine.answer_directly = answer_directly
+    return engine
+
+
+async def fail_at_once(queue):
+    raise RuntimeError("provider down")
+
+
+async def fail_midway(queue):
+    queue.put("Hel")
+    raise RuntimeError("provider down")
+
+
+async def stream_hello(queue):
+    queue.put("Hel")
+    queue.put("lo")
+    queue.put(None)
+
+
+def execute(engine):
+    queue = ListQueue()
+    asyncio.run(engine.execute_plan("hi", queue, types.SimpleNamespace(conversation_context=None)))
+    return queue.items
+
+
+def test_failure_before_any_output_falls_back_to_a_direct_answer(monkeypatch):
+    engine = make_planner(monkeypatch, [fail_at_once, stream_hello])
+
+    assert execute(engine) == ["Hel", "lo", None]
+    assert engine.answered == ["hi", "hi"]
+
+
+def test_failure_after_output_ends_the_response_without_a_second_answer(monkeypatch):
+    engine = make_planner(monkeypatch, [fail_midway, stream_hello])
+
+    assert execute(engine) == ["Hel", planner.PLAN_ERROR_MESSAGE, None]
+    assert engine.answered == ["hi"]
+
+
+def test_answer_to_the_destination_question_plans_the_trip(monkeypatch):
+    engine = make_planner(monkeypatch, [])
+    planned = []
+
+    async def plan_trip(args, response_queue, session):
+        planned.append(args)
+        response_queue.put("itinerary")
+
+    engine.agent.intent_routes["plan_trip"] = {"handler": plan_trip, "streaming": True}
+    session = types.SimpleNamespace(conversation_context="AWAITING_TRIP_DESTINATION")
+    queue = ListQueue()
+    asyncio.run(engine.execute_plan("Lisbon", queue, session))
+
+    assert planned == [{"destination": "Lisbon"}]
+    assert queue.items == ["itinerary", None]
+    assert session.conversation_context is None
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from app.core.provider_pool import ProviderPool, hedged_stream
+
+
+def fake_provider(first_delay, chunks=("a", "b"), error=None, opened=None, closed=None):
+    async def stream():
+        if opened is not None:
+            opened.append(1)
+        try:
+            await asyncio.sleep(first_delay)
+            if error is not None:
+                raise error
+            for chunk in chunks:
+                yield chunk
+        finally:
+            if closed is not None:
+                closed.append(1)
+    return stream
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_ranked_prefers_fast_and_healthy_providers():
+    pool = ProviderPool(["slow", "fast", "flaky"])
+    for _ in range(5):
+        pool.record_success("slow", 3.0)
+        pool.record_success("fast", 0.5)
+        pool.record_success("flaky", 0.4)
+    pool.record_failure("flaky")
+    pool.record_failure("flaky")
+
+    assert pool.ranked() == ["fast", "flaky", "slow"]
+
+
+def test_circuit_opens_after_consecutive_failures_and_recovers():
+    pool = ProviderPool(["a", "b"], failure_threshold=2, cooldown=0.05)
+    pool.record_failure("a")
+    assert "a" in pool.ranked()
+    pool.record_failure("a")
+    assert pool.ranked() == ["b"]
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert "a" in pool.ranked()
+    pool.record_failure("a")  # failed again right after the cooldown
+    assert pool.ranked() == ["b"]
+
+
+def test_all_circuits_open_still_returns_providers():
+    pool = ProviderPool(["a", "b"], failure_threshold=1)
+    pool.record_failure("a")
+    pool.record_failure("b")
+    assert sorted(pool.ranked()) == ["a", "b"]
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    pool = ProviderPool(["a"], min_hedge_delay=0.1, max_hedge_delay=5.0)
+    assert pool.hedge_delay("a") == 5.0  # no samples yet
+    for latency in (0.2, 0.3, 0.3, 0.4, 2.0):
+        pool.record_success("a", latency)
+    assert pool.hedge_delay("a") == 2.0
+    for _ in range(50):  # the old samples leave the window
+        pool.record_success("a", 0.01)
+    assert pool.hedge_delay("a") == 0.1
+
+
+def test_slow_provider_is_hedged_and_cancelled():
+    pool = ProviderPool(["stuck", "quick"], max_hedge_delay=0.05)
+    closed = []
+    providers = {
+        "stuck": fake_provider(5, chunks=("late",), closed=closed),
+        "quick": fake_provider(0.01),
+    }
+
+    chunks = asyncio.run(collect(hedged_stream(pool, lambda name: providers[name](), 2, 10)))
+
+    assert chunks == ["a", "b"]
+    assert closed == [1]  # the stuck stream was closed
+    assert pool.stats("quick").outcomes[-1] is True
+
+
+def test_provider_that_stops_answering_loses_its_rank():
+    pool = ProviderPool(["stuck", "quick"], min_hedge_delay=0.05, max_hedge_delay=0.05)
+    for _ in range(10):
+        pool.record_success("stuck", 0.01)
+        pool.record_success("quick", 0.02)
+    assert pool.ranked()[0] == "stuck"
+    providers = {"stuck": fake_provider(5), "quick": fake_provider(0.01)}
+
+    async def requests():
+        for _ in range(15):
+            assert await collect(hedged_stream(pool, lambda name: providers[name](), 2, 10)) == ["a", "b"]
+            if pool.ranked()[0] == "quick":
+                break
+
+    asyncio.run(requests())
+    assert pool.ranked()[0] == "quick"
+    assert pool.stats("stuck").latency() >= 0.05
+
+
+def test_failed_provider_is_replaced_immediately():
+    pool = ProviderPool(["broken", "good"])
+    providers = {
+        "broken": fake_provider(0, error=RuntimeError("down")),
+        "good": fake_provider(0),
+    }
+
+    chunks = asyncio.run(asyncio.wait_for(collect(hedged_stream(pool, lambda name: providers[name](), 2, 10)), 1))
+
+    assert chunks == ["a", "b"]
+    assert pool.stats("broken").consecutive_failures == 1
+
+
+def test_attempts_are_bounded_and_last_error_is_raised():
+    pool = ProviderPool(["a", "b"])
+    opened = []
+    provider = fake_provider(0, error=RuntimeError("down"), opened=opened)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect(hedged_stream(pool, lambda name: provider(), 3, 10)))
+    assert len(opened) == 3
+
+
+def test_first_chunk_timeout():
+    pool = ProviderPool(["a"], max_hedge_delay=5.0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect(hedged_stream(pool, lambda name: fake_provider(1)(), 1, 0.05)))
+    assert pool.stats("a").consecutive_failures == 1
@@ -0,0 +1,45 @@
+from app.core.keywords import KEYWORD_TO_INTENT
+from app.core.router import KeywordRouter
+
+
+def test_routes_simple_commands_with_full_confidence():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    assert router.route("What time is it?").intent == "get_time"
+    assert router.route("please stop talking").intent == "stop_speech"
+    assert router.route("clear chat").intent == "reset_chat"
+    assert router.route("show my reminders").intent == "show_reminders"
+    assert router.route("list my tasks").intent == "show_tasks"
+
+
+def test_longest_phrase_wins():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    assert router.route("delete reminder").intent == "delete_reminder"
+    assert router.route("show goals").intent == "show_goals"
+
+
+def test_unconfident_queries_fall_back_to_planner():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    assert router.route("how much time does a flight to tokyo take") is None
+    assert router.route("tell me a joke") is None
+    # Two intents in one query are ambiguous.
+    match = router.match("clear chat and show goals")
+    assert match.confidence < router.min_confidence
+
+
+def test_stop_and_reset_phrasings_take_the_fast_path():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    assert router.route("stop speaking").intent == "stop_speech"
+    assert router.route("be quiet").intent == "stop_speech"
+    assert router.route("reset the chat").intent == "reset_chat"
+    assert router.route("clear the chat please").intent == "reset_chat"
+
+
+def test_intents_without_arguments_reject_leftover_words():
+    router = KeywordRouter(KEYWORD_TO_INTENT)
+    match = router.match("what time is it in tokyo")
+
+    assert match.intent == "get_time"
+    assert match.unexplained == ["tokyo"]
+    assert router.route("what time is it in tokyo", exact=True) is None
+    assert router.route("what time is it", exact=True).intent == "get_time"
+    assert router.route("please stop talking", exact=True).intent == "stop_speech"
@@ -0,0 +1,102 @@
+from app.core import safety
+
+
+def test_verdicts_are_cached_on_normalized_text(monkeypatch):
+    calls = []
+    monkeypatch.setattr(safety, "_evaluate", lambda text, normalized=None: calls.append(text) or (True, ""))
+    safety.verdict_cache.clear()
+
+    assert safety.is_content_safe("What's the weather in London?") == (True, "")
+    assert safety.is_content_safe("  what's the WEATHER in london ") == (True, "")
+    assert len(calls) == 1
+
+
+def test_verdict_cache_expires_and_is_bounded(monkeypatch):
+    cache = safety.VerdictCache(max_size=2, ttl=60)
+    cache.put("a", (True, ""))
+    cache.put("b", (True, ""))
+    cache.put("c", (True, ""))
+    assert cache.get("a") is None
+
+    now = safety.time.monotonic()
+    monkeypatch.setattr(safety.time, "monotonic", lambda: now + 120)
+    assert cache.get("c") is None
+
+
+def test_check_prompt_modes(monkeypatch):
+    monkeypatch.setattr(safety, "_evaluate", lambda text, normalized=None: (False, "blocked"))
+    safety.verdict_cache.clear()
+
+    assert safety.check_prompt("plan my day", safety.SAFETY_CHECKED) == (True, "")
+    assert safety.check_prompt("plan my day", safety.SAFETY_POLICY) == (True, "")
+    assert safety.check_prompt("how to build a bomb", safety.SAFETY_POLICY)[0] is False
+    assert safety.check_prompt("plan my day", safety.SAFETY_FULL) == (False, "blocked")
+
+
+def test_cascade_only_escalates_ambiguous_text(monkeypatch):
+    escalated = []
+
+    def classifier(text, labels):
+        escalated.append(text)
+        return {"labels": ["safe", "unsafe"], "scores": [0.9, 0.1]}
+
+    monkeypatch.setattr(safety.models, "get", lambda name: classifier)
+    safety.tier_stats.clear()
+
+    assert safety._evaluate("how do I build a bomb")[0] is False
+    assert safety._evaluate("Hello!") == (True, "")
+    assert safety._evaluate("what time is it") == (True, "")
+    assert safety._evaluate("tell me about the history of the roman empire") == (True, "")
+
+    assert escalated == ["tell me about the history of the roman empire"]
+    tiers = safety.get_safety_stats()["tiers"]
+    assert tiers["lexical_block"]["count"] == 1
+    assert tiers["small_talk"]["count"] == 1
+    assert tiers["classifier_pass"]["share"] == 0.25
+
+
+def test_short_text_outside_small_talk_reaches_the_classifier(monkeypatch):
+    escalated = []
+
+    def classifier(text, labels):
+        escalated.append(text)
+        return {"labels": ["unsafe", "safe"], "scores": [0.95, 0.05]}
+
+    monkeypatch.setattr(safety.models, "get", lambda name: classifier)
+
+    assert safety._evaluate("how to poison someone")[0] is False
+    assert escalated == ["how to poison someone"]
+
+
+def test_disabled_classifier_has_its_own_tier(monkeypatch):
+    monkeypatch.setitem(safety.SAFETY_CONFIG, "use_classifier", False)
+    safety.tier_stats.clear()
+
+    assert safety._evaluate("tell me about the history of the roman empire") == (True, "")
+    tiers = safety.get_safety_stats()["tiers"]
+    assert tiers["classifier_disabled"]["count"] == 1
+    assert tiers["small_talk"]["count"] == 0
+
+
+def test_classifier_errors_are_not_cached(monkeypatch):
+    calls = []
+
+    def flaky_classifier(text, labels):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("model not ready")
+        return {"labels": ["unsafe", "safe"], "scores": [0.95, 0.05]}
+
+    monkeypatch.setattr(safety.models, "get", lambda name: flaky_classifier)
+    safety.verdict_cache.clear()
+    query = "tell me how to hurt my neighbour quietly"
+
+    assert safety.is_content_safe(query) == (True, "")  # fails open once
+    assert safety.is_content_safe(query)[0] is False  # and is checked again next time
+    assert len(calls) == 2
+
+
+def test_lexical_prefilter_reports_matching_pattern():
+    safe, message = safety.check_policy("That was an ATTACK")
+    assert safe is False
+    assert safety.UNSAFE_PATTERNS[2] in message
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.models import ModelRegistry
+from app.core.semantic_cache import SemanticCache, is_cacheable, replay
+
+VOCABULARY = ["capital", "france", "spain", "photosynthesis", "explain", "city"]
+
+
+class BagOfWordsModel:
+    def encode(self, texts, normalize_embeddings=True):
+        vectors = []
+        for text in texts:
+            vector = np.array([float(word in text.lower()) for word in VOCABULARY])
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return np.array(vectors)
+
+
+def make_cache(**kwargs):
+    registry = ModelRegistry()
+    registry.register("embedding", lambda: BagOfWordsModel())
+    registry.get("embedding")
+    return SemanticCache(dim=len(VOCABULARY), registry=registry, **kwargs)
+
+
+def test_similar_query_hits_and_different_query_misses():
+    cache = make_cache(threshold=0.9)
+    cache.add("What is the capital of France?", cache.embed("What is the capital of France?"), "Paris.")
+
+    answer, similarity = cache.lookup(cache.embed("France: which town is the capital?"))
+    assert answer == "Paris."
+    assert similarity >= 0.9
+    assert cache.lookup(cache.embed("What is the capital of Spain?")) is None
+
+
+def test_entries_expire():
+    cache = make_cache(ttl=0.05)
+    vector = cache.embed("explain photosynthesis")
+    cache.add("explain photosynthesis", vector, "Plants make sugar from light.")
+    time.sleep(0.1)
+
+    assert cache.lookup(vector) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_size=2)
+    france, spain, photo = (cache.embed(q) for q in ("capital france", "capital spain", "explain photosynthesis"))
+    cache.add("capital france", france, "Paris.")
+    cache.add("capital spain", spain, "Madrid.")
+    cache.lookup(france)
+    cache.add("explain photosynthesis", photo, "Light to sugar.")
+
+    assert cache.lookup(france)[0] == "Paris."
+    assert cache.lookup(spain) is None
+    assert len(cache) == 2
+
+
+def test_no_embedding_until_the_model_is_loaded():
+    registry = ModelRegistry()
+    registry.register("embedding", lambda: BagOfWordsModel())
+    assert SemanticCache(dim=len(VOCABULARY), registry=registry).embed("capital france") is None
+
+
+def test_personal_follow_up_and_time_sensitive_queries_are_not_cacheable():
+    assert is_cacheable("What is the capital of France?")
+    assert not is_cacheable("What is my name?")
+    assert not is_cacheable("And what about Spain?")
+    assert not is_cacheable("Tell me more about it")
+    assert not is_cacheable("What's the latest news today?")
+
+
+def test_replay_streams_the_whole_answer():
+    async def collect():
+        return [chunk async for chunk in replay("Paris is the capital of France.", chunk_chars=8)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Paris is the capital of France."
@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+server = pytest.importorskip("app.core.server")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.core.session import SessionStore
+
+
+class FakeAgent:
+    """Streams canned chunks; `chunks=None` streams until cancelled."""
+    def __init__(self, chunks=None, delay=0.01):
+        self.sessions = SessionStore()
+        self.chunks = chunks
+        self.delay = delay
+        self.cancelled = False
+
+    def get_session(self, session_id, host=None):
+        return self.sessions.get_or_create(session_id, host=host)
+
+    async def process_query(self, query, response_queue, session=None, safety_checked=False):
+        try:
+            i = 0
+            while self.chunks is None or i < len(self.chunks):
+                await asyncio.sleep(self.delay)
+                response_queue.put(self.chunks[i] if self.chunks else f"chunk {i} ")
+                i += 1
+            response_queue.put(None)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.fixture(autouse=True)
+def skip_input_checks(monkeypatch):
+    monkeypatch.setattr(server, "process_input", lambda query: (query, None))
+
+
+def with_client(agent, scenario):
+    async def run():
+        async with TestClient(TestServer(server.create_app(agent))) as client:
+            return await scenario(client)
+    return asyncio.run(run())
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_session_chunks_and_done():
+    agent = FakeAgent(["Hel", "lo"])
+
+    async def scenario(client):
+        response = await client.post("/api/chat/stream", json={"message": "hi", "session_id": "s1"})
+        assert response.headers["Content-Type"] == "text/event-stream"
+        return await response.text()
+
+    events = parse_events(with_client(agent, scenario))
+
+    assert events == [("session", {"session_id": "s1"}), ("chunk", {"text": "Hel"}),
+                      ("chunk", {"text": "lo"}), ("done", {})]
+    assert agent.sessions.get("s1").message_history == [
+        {"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello"}]
+
+
+def test_client_disconnect_cancels_the_agent_work():
+    agent = FakeAgent()
+
+    async def scenario(client):
+        response = await client.post("/api/chat/stream", json={"message": "hi", "session_id": "s1"})
+        while b"chunk" not in await response.content.readline():
+            pass
+        response.close()
+        for _ in range(100):
+            if agent.cancelled:
+                break
+            await asyncio.sleep(0.01)
+        return agent.sessions.get("s1").host
+
+    host = with_client(agent, scenario)
+
+    assert agent.cancelled
+    assert host.channel is None
+    assert not host.lock.locked()
+
+
+def test_unknown_session_id_starts_a_new_session():
+    agent = FakeAgent(["ok"])
+
+    async def scenario(client):
+        response = await client.post("/api/chat", json={"message": "hi", "session_id": "never-seen"})
+        return response.status, await response.json()
+
+    status, body = with_client(agent, scenario)
+
+    assert status == 200
+    assert body == {"session_id": "never-seen", "response": "ok"}
+    assert isinstance(agent.sessions.get("never-seen").host, server.HeadlessHost)
+
+
+@pytest.mark.parametrize("data", ['{"session_id": "s1"}', "not json", '["hi"]'])
+def test_bad_requests_are_rejected(data):
+    agent = FakeAgent(["ok"])
+
+    async def scenario(client):
+        response = await client.post("/api/chat/stream", data=data, headers={"Content-Type": "application/json"})
+        return response.status
+
+    assert with_client(agent, scenario) == 400
+    assert len(agent.sessions) == 0
+
+
+class ForgetfulAgent(FakeAgent):
+    """Ends without the end marker, or fails before answering."""
+    def __init__(self, error=None):
+        super().__init__(["partial"])
+        self.error = error
+
+    async def process_query(self, query, response_queue, session=None, safety_checked=False):
+        response_queue.put("partial")
+        if self.error:
+            raise self.error
+
+
+@pytest.mark.parametrize("error", [None, RuntimeError("handler bug")])
+def test_request_ends_when_the_agent_forgets_the_end_marker(error):
+    agent = ForgetfulAgent(error)
+
+    async def scenario(client):
+        response = await asyncio.wait_for(client.post("/api/chat", json={"message": "hi", "session_id": "s1"}), 2)
+        return await response.json(), agent.sessions.get("s1").host
+
+    body, host = with_client(agent, scenario)
+
+    assert body["response"] == "partial"
+    assert not host.lock.locked()
+
+
+def test_slow_requests_time_out(monkeypatch):
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT", 0.1)
+    agent = FakeAgent()
+
+    async def scenario(client):
+        response = await asyncio.wait_for(client.post("/api/chat", json={"message": "hi", "session_id": "s1"}), 2)
+        return await response.json()
+
+    body = with_client(agent, scenario)
+
+    assert body["response"].endswith("took too long and was stopped.")
+    assert agent.cancelled
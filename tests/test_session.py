@@ -0,0 +1,60 @@
+from app.core.session import SessionState, SessionStore
+
+
+def test_sessions_are_isolated():
+    store = SessionStore()
+    first = store.get_or_create("a")
+    second = store.get_or_create("b")
+    first.trip_plan_details["destination"] = "Paris"
+    first.message_history.append({"role": "user", "content": "hi"})
+
+    assert second.trip_plan_details == {}
+    assert second.message_history == []
+    assert store.get_or_create("a") is first
+
+
+def test_store_is_bounded_and_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get("a")
+    store.get_or_create("c")
+
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+def test_idle_sessions_are_evicted():
+    store = SessionStore(idle_timeout=60)
+    session = store.get_or_create("a")
+    session.last_active -= 120
+    store.evict_idle()
+    assert store.get("a") is None
+
+
+def test_pinned_session_survives_idle_and_lru_eviction():
+    store = SessionStore(max_sessions=2, idle_timeout=60)
+    desktop = store.add(SessionState("desktop"), pinned=True)
+    desktop.last_active -= 120
+    for session_id in "abc":
+        store.get_or_create(session_id)
+    store.evict_idle()
+
+    assert store.get("desktop") is desktop
+    assert store.get_or_create("desktop") is desktop
+    assert store.get("a") is None
+    assert len(store) == 3
+
+
+def test_replacing_the_history_drops_the_old_summary():
+    session = SessionStore().get_or_create("a")
+    session.message_history = [{"role": "user", "content": f"turn {i}"} for i in range(40)]
+    session.context.summary = "The user talked about Paris."
+    session.context.summarized_upto = 30
+
+    session.replace_history([])
+
+    assert session.message_history == []
+    assert session.context.summary == ""
+    assert session.context.summarized_upto == 0
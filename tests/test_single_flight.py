@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight, StreamCancelled, prompt_key
+
+
+def counting_stream(calls, chunks, delay=0.01):
+    async def open_stream():
+        calls.append(1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+    return open_stream
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_identical_concurrent_requests_share_one_upstream_stream():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+        open_stream = counting_stream(calls, ["a", "b", "c"])
+        results = await asyncio.gather(*(collect(flight.stream("k", open_stream)) for _ in range(3)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [["a", "b", "c"]] * 3
+    assert flight.coalesced == 2
+    assert len(flight) == 0
+
+
+def test_late_subscriber_gets_chunks_already_sent():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+        open_stream = counting_stream(calls, ["a", "b", "c"], delay=0.05)
+        first = asyncio.create_task(collect(flight.stream("k", open_stream)))
+        await asyncio.sleep(0.08)
+        second = await collect(flight.stream("k", open_stream))
+        return calls, await first, second
+
+    calls, first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first == second == ["a", "b", "c"]
+
+
+def test_finished_stream_is_not_reused():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+        open_stream = counting_stream(calls, ["a"])
+        await collect(flight.stream("k", open_stream))
+        await collect(flight.stream("k", open_stream))
+        return calls
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_errors_reach_every_subscriber():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+        yield
+
+    async def scenario():
+        flight = SingleFlight()
+        return await asyncio.gather(*(collect(flight.stream("k", failing)) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_upstream_is_cancelled_only_when_every_subscriber_leaves():
+    produced = []
+
+    async def endless():
+        i = 0
+        while True:
+            await asyncio.sleep(0.01)
+            produced.append(i)
+            yield i
+            i += 1
+
+    async def scenario():
+        flight = SingleFlight()
+        first = flight.stream("k", endless)
+        second = flight.stream("k", endless)
+        await first.__anext__()
+        await first.aclose()
+        await second.__anext__()
+        await second.__anext__()
+        await second.aclose()
+        count = len(produced)
+        await asyncio.sleep(0.1)
+        return count, flight
+
+    count, flight = asyncio.run(scenario())
+    assert count >= 2
+    assert len(produced) <= count + 1
+    assert len(flight) == 0
+
+
+def test_request_right_after_a_cancel_gets_a_fresh_stream():
+    calls = []
+
+    async def slow_close():
+        calls.append(1)
+        try:
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield f"c{i}"
+        finally:
+            # Upstream cleanup that takes several loop turns.
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+    async def scenario():
+        flight = SingleFlight()
+        first = flight.stream("k", slow_close)
+        assert await first.__anext__() == "c0"
+        await first.aclose()
+        second = await collect(flight.stream("k", slow_close))
+        return calls, second
+
+    calls, second = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert second == ["c0", "c1", "c2"]
+
+
+def test_subscriber_of_a_cancelled_stream_raises():
+    async def endless():
+        while True:
+            await asyncio.sleep(0.01)
+            yield "x"
+
+    async def scenario():
+        flight = SingleFlight()
+        first = flight.stream("k", endless)
+        await first.__anext__()
+        shared = next(iter(flight._in_flight.values()))
+        await first.aclose()
+        late = shared.subscribe()
+        with pytest.raises(StreamCancelled):
+            await collect(late)
+
+    asyncio.run(scenario())
+
+
+def test_prompt_key_is_stable():
+    assert prompt_key("hello") == prompt_key("hello")
+    assert prompt_key("hello") != prompt_key("hello ")
@@ -0,0 +1,98 @@
+import asyncio
+import types
+
+import pytest
+
+from app.core.speculation import SpeculativeBuffer
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, block=True, timeout=None):
+        self.items.append(item)
+
+
+def test_commit_flushes_buffer_and_forwards_later_chunks():
+    buffer = SpeculativeBuffer()
+    buffer.put("Hel")
+    buffer.put("lo")
+    target = ListQueue()
+    buffer.commit(target)
+    buffer.put("!")
+    buffer.put(None)
+
+    assert target.items == ["Hel", "lo", "!", None]
+
+
+def test_discarded_answer_never_reaches_the_user():
+    buffer = SpeculativeBuffer()
+    buffer.put("tentative")
+    buffer.discard()
+    buffer.put("late chunk")
+
+    assert not buffer.committed
+    assert buffer._chunks == []
+
+
+def speculating_planner(plan, answer):
+    """A PlanningEngine whose planner returns `plan` while `answer` streams the direct answer."""
+    planner = pytest.importorskip("app.core.planner")
+
+    engine = planner.PlanningEngine.__new__(planner.PlanningEngine)
+    engine.agent = types.SimpleNamespace(intent_routes={"get_time": {"handler": lambda args, session: "12:00"}})
+    engine.answered = []
+
+    async def get_plan(query, session):
+        await asyncio.sleep(0.02)
+        return plan
+
+    async def answer_directly(query, response_queue, session):
+        engine.answered.append(query)
+        await answer(response_queue)
+
+    engine.get_plan = get_plan
+    engine.answer_directly = answer_directly
+    return engine
+
+
+async def stream_hello(queue):
+    for chunk in ["Hel", "lo"]:
+        await asyncio.sleep(0.01)
+        queue.put(chunk)
+    queue.put(None)
+
+
+def speculate(engine):
+    queue = ListQueue()
+    asyncio.run(engine.execute_speculatively("hi", queue, session=None))
+    return queue.items
+
+
+def test_answer_is_committed_when_no_tool_is_needed():
+    engine = speculating_planner([], stream_hello)
+
+    assert speculate(engine) == ["Hel", "lo", None]
+    assert engine.answered == ["hi"]
+
+
+def test_answer_is_discarded_when_the_plan_uses_a_tool():
+    engine = speculating_planner([{"tool_name": "get_time", "args": {}}], stream_hello)
+
+    assert speculate(engine) == ["12:00", None]
+
+
+def test_failed_committed_answer_ends_the_response_once():
+    async def fail_midway(queue):
+        queue.put("Hel")
+        await asyncio.sleep(0.05)
+        raise RuntimeError("provider down")
+
+    engine = speculating_planner([], fail_midway)
+    items = speculate(engine)
+
+    assert items[0] == "Hel"
+    assert items[-1] is None and items.count(None) == 1
+    assert "error" in items[1]
+    assert engine.answered == ["hi"]
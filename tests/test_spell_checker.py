@@ -0,0 +1,39 @@
+from app.core.spell_checker import correct_spelling
+from app.core.symspell import SymSpell, damerau_levenshtein
+
+WORDS = {"hello": 500, "world": 400, "weather": 300, "whether": 50, "london": 200, "the": 1000, "in": 900, "what": 800, "is": 850}
+
+
+def make_index():
+    return SymSpell().build(WORDS)
+
+
+def test_lookup_finds_closest_most_frequent_word():
+    index = make_index()
+    assert index.lookup("helo") == "hello"
+    assert index.lookup("wether") == "weather"
+    assert index.lookup("wrold") == "world"  # transposition
+    assert index.lookup("xyzzyq") is None
+
+
+def test_correct_spelling_keeps_case_punctuation_and_special_tokens():
+    index = make_index()
+    text = "Helo wrold! whats teh wether in London? see https://exmaple.com or mail me@exmaple.com run my_func() 42"
+    corrected = correct_spelling(text, index=index)
+    assert corrected.startswith("Hello world! ")
+    assert "weather in London?" in corrected
+    assert "https://exmaple.com" in corrected
+    assert "me@exmaple.com" in corrected
+    assert "my_func()" in corrected
+    assert corrected.endswith(" 42")
+
+
+def test_index_round_trips_through_pickle(tmp_path):
+    path = tmp_path / "index.pkl"
+    make_index().save(path)
+    assert SymSpell.load(path).lookup("londn") == "london"
+
+
+def test_damerau_levenshtein_limit():
+    assert damerau_levenshtein("abcd", "abdc", 2) == 1
+    assert damerau_levenshtein("kitten", "sitting", 2) == 3
@@ -0,0 +1,83 @@
+from app.core.stream_renderer import ResponseChannel, StreamRenderer
+
+
+class FakeWidget:
+    """Minimal stand-in for a Tk widget: records scheduled callbacks instead of running a loop."""
+    def __init__(self):
+        self.bindings = {}
+        self.scheduled = []
+        self.events = 0
+
+    def bind(self, event, callback, add=None):
+        self.bindings[event] = callback
+
+    def event_generate(self, event, when=None):
+        self.events += 1
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+
+def make_renderer():
+    widget = FakeWidget()
+    channel = ResponseChannel()
+    calls = {"start": 0, "text": [], "complete": []}
+    renderer = StreamRenderer(
+        widget,
+        on_start=lambda: calls.__setitem__("start", calls["start"] + 1),
+        on_text=calls["text"].append,
+        on_complete=lambda text, channel: calls["complete"].append(text),
+    )
+    renderer.attach(channel)
+    return widget, channel, renderer, calls
+
+
+def test_renderer_coalesces_queued_chunks_into_one_insert():
+    widget, channel, renderer, calls = make_renderer()
+    for i in range(400):
+        channel.put(f"t{i} ")
+    channel.put(None)
+
+    # Many puts, but only one wake-up event until the renderer runs.
+    assert widget.events == 1
+
+    renderer._on_wake()
+
+    assert calls["start"] == 1
+    assert len(calls["text"]) == 1
+    assert calls["complete"] == ["".join(f"t{i} " for i in range(400)).strip()]
+
+
+def test_renderer_continues_next_frame_when_budget_is_exhausted():
+    widget, channel, renderer, calls = make_renderer()
+    renderer.frame_budget = 0
+    channel.put("hello")
+    channel.put(None)
+
+    renderer._on_wake()
+    assert calls["text"] == []
+    assert len(widget.scheduled) == 1
+
+
+def test_renderer_accepts_dict_chunks():
+    widget, channel, renderer, calls = make_renderer()
+    channel.put({"text": "blocked"})
+    channel.put(None)
+    renderer._on_wake()
+    assert calls["complete"] == ["blocked"]
+
+
+def test_renderer_paints_attached_channels_in_order():
+    widget, first, renderer, calls = make_renderer()
+    second = ResponseChannel()
+    renderer.attach(second)
+    second.put("second")
+    second.put(None)
+    first.put("first")
+    first.put(None)
+
+    renderer._on_wake()
+    assert calls["complete"] == ["first"]
+    # The second response was already queued, so the next frame is scheduled straight away.
+    widget.scheduled.pop()()
+    assert calls["complete"] == ["first", "second"]
@@ -0,0 +1,56 @@
+from app.core.models import ModelRegistry
+from app.core.tool_retriever import ToolRetriever
+
+VOCABULARY = ["weather", "reminder", "image", "file", "goal", "news", "stock", "email"]
+
+
+class BagOfWordsModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = [float(word in text.lower()) for word in VOCABULARY]
+            norm = sum(x * x for x in vector) ** 0.5 or 1.0
+            vectors.append([x / norm for x in vector])
+        return vectors
+
+
+TOOLS = [{"name": f"{word}_tool", "description": f"Handles {word} requests.", "args": {}} for word in VOCABULARY]
+TOOLS.append({"name": "file_query", "description": "Answers questions about documents.", "args": {"query": "The question."}})
+
+
+def make_retriever(top_k=2):
+    model = BagOfWordsModel()
+    registry = ModelRegistry()
+    registry.register("embedding", lambda: model)
+    return ToolRetriever(top_k=top_k, registry=registry), model
+
+
+def test_selects_most_relevant_tools_and_always_includes_file_query():
+    retriever, _ = make_retriever()
+    names = [tool["name"] for tool in retriever.select("what's the weather like", TOOLS, "v1")]
+
+    assert "weather_tool" in names
+    assert "file_query" in names
+    assert len(names) <= 3
+
+
+def test_tool_embeddings_are_computed_once_per_fingerprint():
+    retriever, model = make_retriever()
+    retriever.select("weather", TOOLS, "v1")
+    retriever.select("image", TOOLS, "v1")
+    assert model.calls == 3  # one catalogue embedding + one per query
+
+    retriever.select("image", TOOLS, "v2")
+    assert model.calls == 5
+
+
+def test_compact_schema_is_cached():
+    retriever, _ = make_retriever()
+    schema = retriever.schema(TOOLS[-1:], "v1")
+
+    assert schema == "- file_query(query: The question.): Answers questions about documents."
+    assert retriever.schema(TOOLS[-1:], "v1") is schema
@@ -0,0 +1,30 @@
+import pytest
+
+from app.core import tracing
+
+
+@pytest.fixture(autouse=True)
+def no_trace_file(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", False)
+    tracing.stats.clear()
+
+
+def test_summary_reports_percentiles():
+    for ms in range(1, 101):
+        tracing.record("stage", float(ms))
+
+    summary = tracing.summary()["stage"]
+    assert summary["count"] == 100
+    assert summary["p50"] == 50
+    assert summary["p95"] == 95
+    assert summary["p99"] == 99
+
+
+def test_span_records_errors_and_trace_sets_an_id():
+    with tracing.trace("request"):
+        assert tracing.current_trace_id() is not None
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+    assert tracing.current_trace_id() is None
+    assert set(tracing.summary()) == {"request", "failing"}
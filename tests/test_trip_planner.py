@@ -0,0 +1,102 @@
+import asyncio
+import collections
+import time
+
+import pytest
+
+from app.features import trip_planner
+from app.features.trip_planner import gather_trip_context
+
+
+class FakeRAG:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+
+    def retrieve_context(self, query):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [f"Notes about {query}"]
+
+
+@pytest.fixture
+def slow_sources(monkeypatch):
+    calls = {"weather": 0, "search": 0, "pages": 0}
+
+    def fetch_weather(city):
+        calls["weather"] += 1
+        time.sleep(0.2)
+        return f"Sunny in {city}"
+
+    def search_urls(query):
+        calls["search"] += 1
+        time.sleep(0.1)
+        return [f"https://site{i}.example/page" for i in range(5)]
+
+    def fetch_snippet(url):
+        calls["pages"] += 1
+        time.sleep(0.1)
+        return f"About {url}"
+
+    monkeypatch.setattr(trip_planner, "fetch_weather", fetch_weather)
+    monkeypatch.setattr(trip_planner, "search_urls", search_urls)
+    monkeypatch.setattr(trip_planner, "fetch_snippet", fetch_snippet)
+    monkeypatch.setattr(trip_planner, "_context_cache", collections.OrderedDict())
+    return calls
+
+
+def test_sources_are_fetched_concurrently(slow_sources):
+    start = time.perf_counter()
+    context = asyncio.run(gather_trip_context("Rome", FakeRAG()))
+    elapsed = time.perf_counter() - start
+
+    assert context["weather"] == "Sunny in Rome"
+    assert len(context["search"]["results"]) == 5
+    assert context["notes"] == ["Notes about Rome"]
+    # Sequentially this would take 0.2 + 0.1 + 5 * 0.1 + 0.2 seconds.
+    assert elapsed < 0.6
+
+
+def test_replanning_the_same_destination_uses_the_cache(slow_sources):
+    rag = FakeRAG()
+    asyncio.run(gather_trip_context("Rome", rag))
+    start = time.perf_counter()
+    context = asyncio.run(gather_trip_context(" rome ", rag))
+
+    assert time.perf_counter() - start < 0.05
+    assert context["weather"] == "Sunny in Rome"
+    assert slow_sources == {"weather": 1, "search": 1, "pages": 5}
+    assert rag.calls == 1
+
+
+def test_deadline_keeps_what_finished_and_does_not_cache_the_rest(slow_sources, monkeypatch):
+    monkeypatch.setattr(trip_planner, "SEARCH_MARGIN", 0.05)
+    context = asyncio.run(gather_trip_context("Rome", FakeRAG(delay=1), deadline=0.3))
+
+    assert context["weather"] == "Sunny in Rome"
+    assert "notes" not in context
+    assert ("notes", "rome") not in trip_planner._context_cache
+
+
+def test_failed_weather_is_not_cached(slow_sources, monkeypatch):
+    monkeypatch.setattr(trip_planner, "fetch_weather", lambda city: "⚠️ Weather error: offline")
+    context = asyncio.run(gather_trip_context("Rome"))
+
+    assert context["weather"].startswith("⚠️")
+    assert ("weather", "rome") not in trip_planner._context_cache
+    assert ("search", "rome") in trip_planner._context_cache
+
+
+def test_cache_is_bounded_and_expired_entries_are_dropped(slow_sources, monkeypatch):
+    monkeypatch.setattr(trip_planner, "MAX_CONTEXT_ENTRIES", 2)
+    monkeypatch.setattr(trip_planner, "fetch_weather", lambda city: f"Sunny in {city}")
+    monkeypatch.setattr(trip_planner, "search_urls", lambda query: [])
+    for city in ["Rome", "Oslo", "Lima"]:
+        asyncio.run(gather_trip_context(city))
+
+    # Empty search results are not cached; only the last two cities' weather is kept.
+    assert list(trip_planner._context_cache) == [("weather", "oslo"), ("weather", "lima")]
+
+    trip_planner._context_cache[("weather", "lima")] = (0, "Sunny in Lima")
+    assert trip_planner._cached_context("weather", "lima", time.monotonic()) is None
+    assert ("weather", "lima") not in trip_planner._context_cache